@@ -0,0 +1,205 @@
+"""Statistics and legality checks over batches of decklists, with NumPy.
+
+Each distinct card is reduced once to a feature vector holding its slot in
+the mana curve, its colored pips and its card types, and each decklist's
+statistics are then sums of its cards' vectors weighted by quantity. This
+computes the same statistics as Decklist.stats for thousands of decklists
+with a few array operations instead of a Python loop per card per deck.
+Likewise, legal_in tests every card's set bitset against a format's sets
+as one array operation. Requires NumPy.
+
+    Typical usage example:
+
+    stats = analytics.batch_stats(decklists)
+    stats.land_ratio.mean()
+    stats.deck(0) == decklists[0].stats()
+
+"""
+
+from collections import Counter, namedtuple
+import numpy as np
+from mtg import CARD_TYPES, CURVE_MAX, Color, ColorSet, DeckStats, Set
+
+
+# Slices of the columns of CardFeatures.matrix.
+CURVE = slice(0, CURVE_MAX + 1)
+PIPS = slice(CURVE.stop, CURVE.stop + len(Color))
+TYPES = slice(PIPS.stop, PIPS.stop + len(CARD_TYPES))
+
+
+class CardFeatures(object):
+    """Array-backed feature vectors of cards.
+
+    Vectors are computed the first time a card is seen, so a CardFeatures
+    can be passed to several calls of batch_stats and legal_in to reuse
+    them.
+
+    Attributes:
+        index (Dict[Card, int]): Row of each card in the arrays.
+
+    """
+
+    def __init__(self):
+        self.index = {}
+        self._rows = []
+        self._identities = []
+        self._set_bits = []
+        self._matrix = None
+
+    def row(self, card):
+        """Returns the row of card, computing its features if new."""
+        row = self.index.get(card)
+        if row is None:
+            row = self.index[card] = len(self._rows)
+            self._rows.append(self._features(card))
+            self._identities.append(card.color_identity.mask)
+            self._set_bits.append(card.set_bits or 0)
+            self._matrix = None
+        return row
+
+    @property
+    def matrix(self):
+        """numpy.ndarray: One row of counts per card, with columns for each
+        mana curve slot, color of pip and card type (see CURVE, PIPS and
+        TYPES)."""
+        if self._matrix is None:
+            self._matrix = np.array(self._rows, dtype=np.int32)\
+                .reshape(len(self._rows), TYPES.stop)
+        return self._matrix
+
+    @property
+    def identities(self):
+        """numpy.ndarray: Color identity bitmask of each card."""
+        return np.array(self._identities, dtype=np.uint8)
+
+    def set_bit_words(self, words):
+        """Returns the lowest words 64-bit words of each card's set_bits,
+        as an array with one row per card."""
+        return np.array([_words(bits, words) for bits in self._set_bits],
+                        dtype=np.uint64).reshape(len(self._set_bits), words)
+
+    @staticmethod
+    def _features(card):
+        features = [0] * TYPES.stop
+        card_types = card.card_types()
+        if 'Land' not in card_types:
+            features[min(int(card.cmc or 0), CURVE_MAX)] = 1
+        pips = card.pips()
+        for i, color in enumerate(Color):
+            features[PIPS.start + i] = pips[color]
+        for i, card_type in enumerate(CARD_TYPES):
+            features[TYPES.start + i] = card_type in card_types
+        return features
+
+
+class BatchStats(namedtuple('BatchStats', ['curve', 'pips', 'types',
+                                           'color_identity', 'land_ratio'])):
+    """Statistics of a batch of decklists, one row per decklist.
+
+    Attributes:
+        curve (numpy.ndarray): Number of nonland cards of each mana value,
+            with CURVE_MAX + 1 columns.
+        pips (numpy.ndarray): Number of colored mana symbols of each color,
+            with columns in WUBRG order.
+        types (numpy.ndarray): Number of cards of each of CARD_TYPES.
+        color_identity (numpy.ndarray): Color identity bitmask.
+        land_ratio (numpy.ndarray): Fraction of the mainboard that is lands.
+
+    """
+
+    def deck(self, i):
+        """Returns the statistics of the i-th decklist as a DeckStats."""
+        return DeckStats(
+            Counter({cmc: int(n) for cmc, n in enumerate(self.curve[i]) if n}),
+            Counter({color: int(n) for color, n in zip(Color, self.pips[i])
+                     if n}),
+            Counter({card_type: int(n) for card_type, n
+                     in zip(CARD_TYPES, self.types[i]) if n}),
+            ColorSet(int(self.color_identity[i])),
+            float(self.land_ratio[i]))
+
+
+def batch_stats(decklists, features=None):
+    """Computes the statistics of Decklist.stats for many decklists.
+
+    Args:
+        decklists (Iterable[Decklist]): Decklists to compute statistics of.
+        features (CardFeatures): Feature vectors to reuse and extend.
+            Defaults to a new CardFeatures.
+
+    Returns:
+        BatchStats: The statistics, with one row per decklist.
+
+    """
+    features = features if features is not None else CardFeatures()
+    # Sideboard cards are entries of quantity 0: they only count towards
+    # the color identity.
+    starts, cards, quantities = [], [], []
+    for decklist in decklists:
+        starts.append(len(cards))
+        for card, quantity in decklist.mainboard.items():
+            cards.append(features.row(card))
+            quantities.append(quantity)
+        for card in decklist.sideboard:
+            cards.append(features.row(card))
+            quantities.append(0)
+    starts = np.array(starts, dtype=np.int64)
+    cards = np.array(cards, dtype=np.int64)
+    quantities = np.array(quantities, dtype=np.int64)
+
+    totals = np.zeros((len(starts), TYPES.stop), dtype=np.int64)
+    identity = np.zeros(len(starts), dtype=np.uint8)
+    deck_sizes = np.zeros(len(starts), dtype=np.int64)
+    nonempty = starts < np.append(starts[1:], len(cards))
+    if len(cards):
+        offsets = starts[nonempty]
+        totals[nonempty] = np.add.reduceat(
+            features.matrix[cards] * quantities[:, None], offsets)
+        identity[nonempty] = np.bitwise_or.reduceat(
+            features.identities[cards], offsets)
+        deck_sizes[nonempty] = np.add.reduceat(quantities, offsets)
+    lands = totals[:, TYPES.start + CARD_TYPES.index('Land')]
+    land_ratio = np.divide(lands, deck_sizes, out=np.zeros(len(starts)),
+                           where=deck_sizes > 0)
+    return BatchStats(totals[:, CURVE], totals[:, PIPS], totals[:, TYPES],
+                      identity, land_ratio)
+
+
+def legal_in(decklists, set_codes, features=None, session=None):
+    """Tests many decklists for legality in a set-restricted format.
+
+    Args:
+        decklists (Iterable[Decklist]): Decklists to test.
+        set_codes (Iterable[str]): Codes of the allowed sets.
+        features (CardFeatures): Feature vectors to reuse and extend.
+            Defaults to a new CardFeatures.
+        session (Session): Session to look the sets up with. Defaults to
+            Set.session.
+
+    Returns:
+        numpy.ndarray: Boolean array, true for each decklist that
+            Decklist.legal_in would find legal.
+
+    """
+    features = features if features is not None else CardFeatures()
+    mask = Set.bitmask(set_codes, session=session)
+    starts, cards = [], []
+    for decklist in decklists:
+        starts.append(len(cards))
+        cards.extend(features.row(card) for card in
+                     decklist.mainboard.keys() | decklist.sideboard.keys())
+    starts = np.array(starts, dtype=np.int64)
+    cards = np.array(cards, dtype=np.int64)
+    legal = np.ones(len(starts), dtype=bool)
+    if len(cards):
+        words = max(1, -(-mask.bit_length() // 64))
+        mask_words = np.array(_words(mask, words), dtype=np.uint64)
+        card_legal = (features.set_bit_words(words) & mask_words).any(axis=1)
+        nonempty = starts < np.append(starts[1:], len(cards))
+        legal[nonempty] = np.logical_and.reduceat(card_legal[cards],
+                                                  starts[nonempty])
+    return legal
+
+
+def _words(bits, words):
+    return [(bits >> (64 * i)) & 0xFFFFFFFFFFFFFFFF for i in range(words)]
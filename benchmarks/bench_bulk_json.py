@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""Benchmark of bulk data parsing on a synthetic Scryfall-shaped file.
+
+Compares the old line-oriented parser, which relied on Scryfall writing one
+object per line, against util.iter_json_array with and without mmap and
+field projection.
+
+    python benchmarks/bench_bulk_json.py --cards 50000
+
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+import util  # noqa: E402
+
+
+def synthetic_card(i):
+    return {"object": "card", "id": f"{i:08d}-0000-0000-0000-000000000000",
+            "oracle_id": f"{i // 3:08d}-0000-0000-0000-000000000000",
+            "name": f"Card Number {i // 3}", "lang": "en",
+            "released_at": "2020-01-01", "layout": "normal",
+            "mana_cost": "{2}{W}{U}", "cmc": 4.0,
+            "type_line": "Creature — Human Wizard",
+            "oracle_text": "Flying\nWhen this enters the battlefield, "
+                           "draw a card.",
+            "power": "2", "toughness": "3", "colors": ["W", "U"],
+            "color_identity": ["W", "U"],
+            "legalities": {f: "legal" for f in ("standard", "pioneer",
+                                                "modern", "legacy",
+                                                "vintage", "commander")},
+            "set": "abc", "collector_number": str(i % 300),
+            "rarity": "common", "artist": "Some Artist",
+            "image_uris": {k: f"https://img.example/{k}/{i}.jpg"
+                           for k in ("small", "normal", "large", "png")},
+            "prices": {"usd": "0.10", "usd_foil": "0.50", "eur": None}}
+
+
+def line_oriented(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line[0] == '{':
+                if line[-1] == ',':
+                    line = line[:-1]
+                yield json.loads(line)
+
+
+def timed(label, generator, count):
+    start = time.perf_counter()
+    n = sum(1 for _ in generator)
+    elapsed = time.perf_counter() - start
+    assert n == count
+    print(f"{label:<32} {elapsed:7.3f}s {n / elapsed:10.0f} objects/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", type=int, default=50000)
+    args = parser.parse_args()
+    fields = ["object", "id", "oracle_id", "name", "cmc", "mana_cost",
+              "colors", "color_identity", "set", "collector_number"]
+    fd, path = tempfile.mkstemp(suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("[\n")
+            f.write(",\n".join(json.dumps(synthetic_card(i))
+                               for i in range(args.cards)))
+            f.write("\n]\n")
+        print(f"{args.cards} objects, {os.path.getsize(path) / 2 ** 20:.1f} MB")
+        timed("line-oriented json.loads", line_oriented(path), args.cards)
+        timed("iter_json_array", util.iter_json_array(path), args.cards)
+        timed("iter_json_array (mmap)",
+              util.iter_json_array(path, use_mmap=True), args.cards)
+        timed("iter_json_array (fields)",
+              util.iter_json_array(path, fields=fields), args.cards)
+    finally:
+        os.remove(path)
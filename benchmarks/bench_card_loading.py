@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""Benchmark of query counts and latency for each Card loading profile.
+
+Runs Card.named, Card.representative and Decklist.import_arena against the
+configured card database under every profile in Card.LOAD_PROFILES, plus the
+old joined eager load of printings for comparison. Run it from the
+repository root after 'mtg.py initialize' and 'mtg.py update'.
+
+    python benchmarks/bench_card_loading.py --cards 60
+
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+import database  # noqa: E402
+from mtg import Card, Decklist  # noqa: E402
+
+
+class QueryCounter(object):
+
+    def __init__(self):
+        self.count = 0
+        event.listen(database.engine, "before_cursor_execute", self.count_one)
+
+    def count_one(self, *args):
+        self.count += 1
+
+
+def measure(counter, label, function, repeat):
+    Card.session.expire_all()
+    counter.count = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        Card.session.expunge_all()
+        function()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<40} {counter.count / repeat:8.1f} queries "
+          f"{elapsed * 1000:9.2f} ms")
+
+
+def named_joined(names):
+    q = Card.session.query(Card).options(joinedload(Card.printings))
+    return [q.filter(Card.name == name).first() for name in names]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    names = random.sample(Card.name_index().names, args.cards)
+    arena = "Deck\n" + "\n".join(f"1 {name} (XXX) 1" for name in names[1:]) \
+        + "\n\nSideboard\n" + f"1 {names[0]} (XXX) 1\n"
+    counter = QueryCounter()
+    measure(counter, "named, joined eager load (old default)",
+            lambda: named_joined(names), args.repeat)
+    measure(counter, "representative, joined eager load",
+            lambda: [c.representative() for c in named_joined(names)],
+            args.repeat)
+    for profile in Card.LOAD_PROFILES:
+        measure(counter, f"named, profile={profile}",
+                lambda: [Card.named(n, exact=True, profile=profile)
+                         for n in names], args.repeat)
+        measure(counter, f"named_many, profile={profile}",
+                lambda: Card.named_many(names, exact=True, profile=profile),
+                args.repeat)
+        if profile != 'strict':
+            measure(counter, f"representative, profile={profile}",
+                    lambda: [c.representative() for c in
+                             Card.named_many(names, exact=True,
+                                             profile=profile)],
+                    args.repeat)
+        measure(counter, f"import_arena, profile={profile}",
+                lambda: Decklist.import_arena(arena, profile=profile),
+                args.repeat)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""Load test of card lookup throughput with increasing numbers of threads.
+
+Each thread looks cards up by exact name through its own scoped session, as
+the threads of a web server would, and the total number of lookups per
+second is reported for each thread count. Lookups are run both against
+SQLite directly and through mtg.cache. Run it from the repository root
+after 'mtg.py initialize' and 'mtg.py update'.
+
+    python benchmarks/bench_concurrency.py --lookups 4000 --threads 1 2 4 8
+
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+import database  # noqa: E402
+import mtg  # noqa: E402
+from mtg import Card  # noqa: E402
+
+
+def uncached(names):
+    session = database.ScopedSession()
+    try:
+        for name in names:
+            session.query(Card).filter(Card.name == name).first()
+            session.expunge_all()
+    finally:
+        database.ScopedSession.remove()
+
+
+def cached(names):
+    try:
+        for name in names:
+            Card.named(name, exact=True)
+    finally:
+        database.ScopedSession.remove()
+
+
+def throughput(function, names, threads):
+    batches = [names[i::threads] for i in range(threads)]
+    with ThreadPoolExecutor(threads) as pool:
+        start = time.perf_counter()
+        list(pool.map(function, batches))
+        elapsed = time.perf_counter() - start
+    return len(names) / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lookups", type=int, default=4000)
+    parser.add_argument("--threads", type=int, nargs="+",
+                        default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    names = Card.all_names()
+    names = [random.choice(names) for _ in range(args.lookups)]
+    Card.named_many(names, exact=True)
+    print(f"{'threads':<8} {'SQLite/s':>12} {'cache/s':>12}")
+    for threads in args.threads:
+        print(f"{threads:<8} {throughput(uncached, names, threads):12.0f} "
+              f"{throughput(cached, names, threads):12.0f}")
+    print(mtg.cache.stats()['cards'])
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""Benchmark of NameIndex.fuzzy_match against process.extractOne.
+
+Misspells random card names from the configured card database with one to
+three random edits, keeps the ones NameIndex.match can't resolve (those that
+Card.autocomplete sends to the fuzzy matcher), and times both matchers on
+them, reporting how often they agree. Run it from the repository root after
+'mtg.py initialize' and 'mtg.py update'.
+
+    python benchmarks/bench_fuzzy.py --queries 50
+
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+from fuzzywuzzy import process  # noqa: E402
+from mtg import Card  # noqa: E402
+
+
+def misspell(name):
+    letters = list(name)
+    for _ in range(random.randint(1, 3)):
+        i = random.randrange(len(letters))
+        edit = random.choice(("delete", "insert", "replace", "swap"))
+        if edit == "delete" and len(letters) > 1:
+            del letters[i]
+        elif edit == "insert":
+            letters.insert(i, random.choice(string.ascii_lowercase))
+        elif edit == "replace":
+            letters[i] = random.choice(string.ascii_lowercase)
+        elif i < len(letters) - 1:
+            letters[i], letters[i + 1] = letters[i + 1], letters[i]
+    return "".join(letters)
+
+
+def timed(function, queries):
+    start = time.perf_counter()
+    results = [function(query) for query in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--candidates", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    index = Card.name_index()
+    queries = []
+    while len(queries) < args.queries:
+        query = misspell(random.choice(index.names))
+        if index.match(query) is None:
+            queries.append(query)
+    expected, scan_ms = timed(
+        lambda query: process.extractOne(query, index.names)[0], queries)
+    actual, index_ms = timed(
+        lambda query: index.fuzzy_match(query, args.candidates), queries)
+    agree = sum(a == b for a, b in zip(expected, actual))
+    print(f"{len(index)} names, {len(queries)} misspelled queries")
+    print(f"extractOne:  {scan_ms:10.2f} ms per query")
+    print(f"fuzzy_match: {index_ms:10.2f} ms per query")
+    print(f"same match:  {agree}/{len(queries)}")
+    for query, a, b in zip(queries, expected, actual):
+        if a != b:
+            print(f"  {query!r}: extractOne {a!r}, fuzzy_match {b!r}")
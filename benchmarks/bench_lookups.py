@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""Benchmark of card lookup latency with and without the schema indexes.
+
+Copies the configured card database to a temporary file, drops every
+secondary index from the copy, times a set of lookups, then recreates the
+indexes with database.migrate and times the lookups again. Run it from the
+repository root after 'mtg.py initialize' and 'mtg.py update'.
+
+    python benchmarks/bench_lookups.py --lookups 200
+
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+import database  # noqa: E402
+from mtg import Card, Printing  # noqa: E402
+
+
+def lookups(session, names, printings, n):
+    return {
+        "Card by name": lambda: [
+            session.query(Card).filter(Card.name == name).first()
+            for name in names],
+        "Printing by set and number": lambda: [
+            session.query(Printing).filter(Printing.set_code == s)
+                   .filter(Printing.collector_number == cn).first()
+            for s, cn in printings],
+        "Printings of card": lambda: [
+            session.query(Printing).filter(Printing.oracle_id == oracle_id)
+                   .all()
+            for oracle_id in [o for o, in session.query(Card.oracle_id)
+                              .limit(n)]],
+        "Card by cmc": lambda: [
+            session.query(Card).filter(Card.cmc == i % 16).first()
+            for i in range(n)],
+    }
+
+
+def run(engine, names, printings, n):
+    session = Session(bind=engine)
+    results = {}
+    for label, function in lookups(session, names, printings, n).items():
+        start = time.perf_counter()
+        function()
+        results[label] = (time.perf_counter() - start) / n * 1000
+        session.expunge_all()
+    session.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        source = sqlite3.connect(database.engine.url.database)
+        with sqlite3.connect(path) as copy:
+            source.backup(copy)
+        source.close()
+        engine = create_engine(f"sqlite:///{path}")
+        with engine.begin() as connection:
+            indexes = connection.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'index' "
+                "AND sql IS NOT NULL")).fetchall()
+            for index, in indexes:
+                connection.execute(text(f"DROP INDEX {index}"))
+        session = Session(bind=engine)
+        names = [n for n, in session.query(Card.name)]
+        names = random.sample(names, min(args.lookups, len(names)))
+        printings = session.query(Printing.set_code,
+                                  Printing.collector_number).all()
+        printings = random.sample(printings, min(args.lookups, len(printings)))
+        session.close()
+        before = run(engine, names, printings, len(names))
+        database.engine, engine_ = engine, database.engine
+        try:
+            database.migrate()
+        finally:
+            database.engine = engine_
+        after = run(engine, names, printings, len(names))
+        print(f"{'ms per lookup':<28} {'before':>10} {'after':>10}")
+        for label in before:
+            print(f"{label:<28} {before[label]:10.3f} {after[label]:10.3f}")
+    finally:
+        os.remove(path)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""Command line interface for maintaining the card database.
+
+    Typical usage example:
+
+    python cli.py initialize
+    python cli.py update --workers 4 --incremental
+    python cli.py card --name "Lightning Bolt"
+
+"""
+
+import argparse
+import database
+from mtg import (Card, add_missing_columns, migrate_color_columns,
+                 migrate_mana_symbols, update_cards, update_sets)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("action", help="Action you want to perform")
+    parser.add_argument("-n", "--name", type=str,
+                        help="")
+    parser.add_argument("-d", "--deck", type=str)
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="Number of processes to parse card data with")
+    parser.add_argument("-i", "--incremental", action="store_true",
+                        help="Only write cards that changed since last update")
+    args = parser.parse_args(argv)
+    if args.action in ("initialize", "migrate"):
+        # Defines the tracker tables, so that they are created too.
+        import tracker  # noqa: F401
+    if args.action == "initialize":
+        database.initialize(verbose=True)
+    elif args.action == "migrate":
+        database.migrate(verbose=True)
+        add_missing_columns(verbose=True)
+        migrate_mana_symbols(verbose=True)
+        migrate_color_columns(verbose=True)
+        Card.refresh_printing_summary()
+        Card.rebuild_search_index()
+    elif args.action == "update":
+        update_sets()
+        update_cards(workers=args.workers, incremental=args.incremental)
+    elif args.action == "card":
+        if args.name:
+            result = Card.named(args.name)
+        print(result)
+    elif args.action == "add":
+        pass
+
+
+if __name__ == "__main__":
+    main()
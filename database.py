@@ -1,13 +1,32 @@
 # import scryfall
 import warnings
-from sqlalchemy import exc, create_engine
+from sqlalchemy import exc, create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 
 
 Base = declarative_base()
-engine = create_engine('sqlite:///data/cards_test.db')
+# Pooled connections are handed to whichever thread checks them out, so
+# sqlite3's same-thread check is turned off; each connection is still used
+# by one thread at a time.
+engine = create_engine('sqlite:///data/cards_test.db',
+                       connect_args={'check_same_thread': False},
+                       pool_size=10, max_overflow=20)
 Session = sessionmaker(bind=engine)
+# Registry giving each thread its own session. The models' class-level
+# session attributes are this registry, so Card.session.query(...) runs in
+# the calling thread's session. Call ScopedSession.remove() when a thread
+# is done with it, e.g. at the end of each request in a server.
+ScopedSession = scoped_session(Session)
+
+
+@event.listens_for(engine, "connect")
+def _configure_sqlite(dbapi_connection, connection_record):
+    # WAL lets readers run concurrently with each other and with a writer.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
 
 
 def initialize(verbose=False):
@@ -20,6 +39,26 @@ def initialize(verbose=False):
     # update(verbose)
 
 
+def migrate(verbose=False):
+    """Brings an existing database up to date with the current schema.
+
+    Creates any missing tables, and any indexes missing from existing tables,
+    then refreshes the statistics SQLite's query planner uses to pick them.
+    Card data is left untouched.
+
+    """
+    if verbose:
+        print("Creating missing tables and indexes...", end='', flush=True)
+    Base.metadata.create_all(engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    if verbose:
+        print("done")
+
+
 # def update(verbose=False):
 #     if verbose:
 #         print("Downloading card data...", end='', flush=True)
@@ -0,0 +1,167 @@
+"""Response caches for scryfall.Request.
+
+A cache serves a response from local storage while it is younger than its
+ttl. Once it is stale, the next request for the same URL is made conditional
+on the stored ETag and Last-Modified headers, and a 304 Not Modified answer
+from Scryfall refreshes the stored response instead of downloading it again.
+
+    Typical usage example:
+
+    scryfall.Request.cache = httpcache.MemoryCache(ttl=3600)
+    scryfall.Request('sets')
+    scryfall.Request('sets')  # served from the cache
+
+"""
+
+from abc import ABC, abstractmethod
+from collections import namedtuple
+import os.path
+import sqlite3
+import threading
+import time
+import util
+
+
+CachedResponse = namedtuple('CachedResponse',
+                            ['content', 'etag', 'last_modified', 'stored_at'])
+
+
+class ResponseCache(ABC):
+    """Base class for response caches.
+
+    Subclasses store CachedResponse objects by implementing _load, _save and
+    clear. A cache may be shared by several threads; the counters are
+    updated under a lock.
+
+    Attributes:
+        ttl (float): Number of seconds a response is served without asking
+            Scryfall whether it changed.
+        hits (int): Number of responses served from the cache.
+        revalidations (int): Number of stale responses Scryfall confirmed
+            were unchanged.
+        misses (int): Number of responses downloaded.
+
+    """
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def fetch(self, url, get):
+        """Returns the body of the response to a GET request for url.
+
+        Args:
+            url (str): URL to request.
+            get (Callable[[str, dict], requests.Response]): Function making
+                the request with the given extra headers.
+
+        Returns:
+            bytes: The response body.
+
+        """
+        entry = self._load(url)
+        if entry is not None and time.time() - entry.stored_at <= self.ttl:
+            self._count('hits')
+            return entry.content
+        headers = {}
+        if entry is not None and entry.etag is not None:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified is not None:
+            headers['If-Modified-Since'] = entry.last_modified
+        response = get(url, headers)
+        if entry is not None and response.status_code == 304:
+            self._count('revalidations')
+            self._save(url, entry._replace(stored_at=time.time()))
+            return entry.content
+        self._count('misses')
+        self._save(url, CachedResponse(response.content,
+                                       response.headers.get('ETag'),
+                                       response.headers.get('Last-Modified'),
+                                       time.time()))
+        return response.content
+
+    def stats(self):
+        """Returns the hit, revalidation and miss counters as a dict."""
+        with self._stats_lock:
+            return {'hits': self.hits,
+                    'revalidations': self.revalidations,
+                    'misses': self.misses}
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @abstractmethod
+    def _load(self, url):
+        """Returns the CachedResponse stored for url, or None."""
+
+    @abstractmethod
+    def _save(self, url, entry):
+        """Stores the CachedResponse entry for url."""
+
+    @abstractmethod
+    def clear(self):
+        """Removes every stored response."""
+
+
+class MemoryCache(ResponseCache):
+    """Cache keeping up to maxsize responses in memory."""
+
+    def __init__(self, maxsize=256, ttl=3600):
+        super().__init__(ttl)
+        self._responses = util.LRUCache(maxsize)
+
+    def _load(self, url):
+        return self._responses.get(url)
+
+    def _save(self, url, entry):
+        self._responses[url] = entry
+
+    def clear(self):
+        self._responses.clear()
+
+
+class SQLiteCache(ResponseCache):
+    """Cache keeping up to maxsize responses in an SQLite database file."""
+
+    def __init__(self, path=os.path.join("data", "http_cache.db"),
+                 maxsize=1024, ttl=3600):
+        super().__init__(ttl)
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "url TEXT PRIMARY KEY, content BLOB, etag TEXT, "
+                "last_modified TEXT, stored_at REAL, accessed_at REAL)")
+
+    def _load(self, url):
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT content, etag, last_modified, stored_at "
+                "FROM responses WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE url = ?",
+                (time.time(), url))
+        return CachedResponse(*row)
+
+    def _save(self, url, entry):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (url, entry.content, entry.etag, entry.last_modified,
+                 entry.stored_at, time.time()))
+            self._connection.execute(
+                "DELETE FROM responses WHERE url NOT IN (SELECT url FROM "
+                "responses ORDER BY accessed_at DESC LIMIT ?)",
+                (self.maxsize,))
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
@@ -0,0 +1,99 @@
+"""Parsing of mana costs into counts of mana symbols.
+
+A mana cost such as {2}{W}{U/P} is parsed once into a ManaCost, which packs
+into a single integer for storage in the cards table (see Card.mana_symbols),
+so that pip counts and devotion can be read or queried without parsing the
+string again.
+
+    Typical usage example:
+
+    cost = ManaCost.parse("{2}{W}{U/P}")
+    cost.devotion('U')  # 1
+    ManaCost.unpack(cost.packed) == cost  # True
+
+"""
+
+from collections import namedtuple
+import re
+
+
+_SYMBOL = re.compile(r'\{([^}]+)\}')
+
+COLORS = ('W', 'U', 'B', 'R', 'G')
+
+# Width in bits of each field of a packed ManaCost, from the lowest bits up.
+# Counts too large for their field are stored as the field's maximum.
+WIDTHS = (8,) + (4,) * 10
+
+# Position of the lowest bit of each field of a packed ManaCost.
+SHIFTS = tuple(sum(WIDTHS[:i]) for i in range(len(WIDTHS)))
+
+
+class ManaCost(namedtuple('ManaCost', ['generic', 'w', 'u', 'b', 'r', 'g',
+                                       'hybrid', 'phyrexian', 'x',
+                                       'colorless', 'snow'])):
+    """Counts of the symbols in a mana cost.
+
+    Attributes:
+        generic (int): Amount of generic mana, e.g. 2 for {2}.
+        w, u, b, r, g (int): Number of symbols of each color, counting
+            hybrid and Phyrexian symbols towards each of their colors. This
+            is the card's devotion to the color.
+        hybrid (int): Number of hybrid symbols, such as {W/U} or {2/B}.
+        phyrexian (int): Number of Phyrexian symbols, such as {U/P}.
+        x (int): Number of {X}, {Y} and {Z} symbols.
+        colorless (int): Number of {C} symbols.
+        snow (int): Number of {S} symbols.
+
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def parse(cls, mana_cost):
+        """Parses a mana cost string, such as '{2}{W}{U/P}'.
+
+        Both halves of a split card's cost ('{1}{R} // {1}{U}') are counted.
+        None and '' parse to a cost with every count 0.
+
+        """
+        counts = dict.fromkeys(cls._fields, 0)
+        for symbol in _SYMBOL.findall(mana_cost or ''):
+            parts = symbol.upper().split('/')
+            if symbol.isdigit():
+                counts['generic'] += int(symbol)
+            elif symbol in ('X', 'Y', 'Z'):
+                counts['x'] += 1
+            elif symbol == 'C':
+                counts['colorless'] += 1
+            elif symbol == 'S':
+                counts['snow'] += 1
+            for part in parts:
+                if part in COLORS:
+                    counts[part.lower()] += 1
+            if 'P' in parts[1:]:
+                counts['phyrexian'] += 1
+            if len([p for p in parts if p != 'P']) > 1:
+                counts['hybrid'] += 1
+        return cls(**counts)
+
+    @classmethod
+    def unpack(cls, packed):
+        """Returns the ManaCost stored as the integer packed."""
+        counts = []
+        for width in WIDTHS:
+            counts.append(packed & ((1 << width) - 1))
+            packed >>= width
+        return cls(*counts)
+
+    @property
+    def packed(self):
+        """int: The counts packed into one integer, see WIDTHS."""
+        packed = 0
+        for count, width, shift in zip(self, WIDTHS, SHIFTS):
+            packed |= min(count, (1 << width) - 1) << shift
+        return packed
+
+    def devotion(self, color):
+        """Returns the number of symbols of color, a Color or letter."""
+        return getattr(self, getattr(color, 'value', color).lower())
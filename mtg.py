@@ -1,39 +1,185 @@
 #!/usr/bin/env python
 
 import database
-import argparse
 
 from enum import Enum
-from fuzzywuzzy import process
 from sqlalchemy import (Column, Date, Float, String, UniqueConstraint,
-                        ForeignKey, Integer, exc)
-from database import Base, Session
-from sqlalchemy.orm import relationship
-from sqlalchemy.types import TypeDecorator, Unicode
+                        ForeignKey, Index, Integer, LargeBinary, MetaData,
+                        event, inspect, select)
+from sqlalchemy import DDL, bindparam, text as text_clause
+from database import Base, ScopedSession, Session
+from sqlalchemy.orm import (joinedload, lazyload, object_session,
+                            raiseload, relationship, selectinload,
+                            validates)
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.types import TypeDecorator
 from datetime import date
+from manacost import ManaCost, SHIFTS as _MANA_SHIFTS
+from names import NameIndex
+import hashlib
 import json
 import util
 import scryfall
-import warnings
-from collections import Counter
+import multiprocessing
+import sys
+import threading
+import time
+from collections import Counter, deque, namedtuple
 
+if __name__ == "__main__":
+    # The command line lives in cli, which imports this file as mtg. Hand
+    # over before the models are defined, so they are only defined once.
+    import cli
+    cli.main()
+    sys.exit()
+
+
+# Card types counted by Card.card_types and Decklist.stats.
+CARD_TYPES = ('Artifact', 'Battle', 'Creature', 'Enchantment', 'Instant',
+              'Land', 'Planeswalker', 'Sorcery')
+
+# Highest mana value with its own slot in a mana curve. Costlier cards are
+# counted in this slot.
+CURVE_MAX = 7
+
+
+class ColorSetType(TypeDecorator):
+    """Stores a ColorSet as its integer bitmask.
+
+    Besides the usual comparisons, columns of this type can be filtered with
+    the bitwise set predicates of the comparator, e.g.
+    Card.color_identity.issubset('WUB').
+
+    """
+
+    impl = Integer
+    cache_ok = True
+
+    class comparator_factory(Integer.Comparator):
+
+        def _masked(self, colors):
+            return self.expr.op('&', return_type=Integer)(
+                ColorSet(colors).mask)
+
+        def issubset(self, colors):
+            """True where every color is in colors."""
+            return self._masked(ColorSet.ALL - ColorSet(colors)) == 0
+
+        def issuperset(self, colors):
+            """True where every one of colors is present."""
+            mask = ColorSet(colors).mask
+            return self._masked(colors) == mask
+
+        def isdisjoint(self, colors):
+            """True where none of colors is present."""
+            return self._masked(colors) == 0
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return 0
+        return ColorSet(value).mask
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return ColorSet()
+        if isinstance(value, str):
+            # Databases from before migrate_color_columns store JSON lists.
+            return ColorSet(json.loads(value))
+        return ColorSet(value)
+
+
+class _ManaSymbols(TypeDecorator):
+    """Stores a ManaCost as its packed integer.
+
+    Columns of this type can be filtered on a card's devotion to a color
+    with the comparator, e.g. Card.mana_symbols.devotion('B') >= 3.
+
+    """
+
+    impl = Integer
+    cache_ok = True
+
+    class comparator_factory(Integer.Comparator):
+
+        def devotion(self, color):
+            """The number of mana symbols of color, a Color or letter."""
+            field = ManaCost._fields.index(
+                getattr(color, 'value', color).lower())
+            shifted = self.expr.op('>>', return_type=Integer)(
+                _MANA_SHIFTS[field])
+            return shifted.op('&', return_type=Integer)(0xF)
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, ManaCost):
+            return value.packed
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return ManaCost.unpack(value)
+
+
+class _CodeSet(TypeDecorator):
+    """Stores a set of set codes as comma-separated text.
+
+    NULL is read as None, meaning unknown, and '' as the empty set.
+
+    """
+
+    impl = String
+    cache_ok = True
 
-class _ColorSet(TypeDecorator):
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return ','.join(sorted(value))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return frozenset(value.split(',')) if value else frozenset()
+
+
+class _SetBits(TypeDecorator):
+    """Stores a bitset, held as an int, as little-endian bytes."""
 
-    impl = Unicode
+    impl = LargeBinary
+    cache_ok = True
 
     def process_bind_param(self, value, dialect):
-        if value is not None:
-            return json.dumps(value)
-        return "[]"
+        if value is None:
+            return None
+        return value.to_bytes((value.bit_length() + 7) // 8, 'little')
 
     def process_result_value(self, value, dialect):
-        if value is not None:
-            return set([Color(x) for x in json.loads(value)])
-        return set()
+        if value is None:
+            return None
+        return int.from_bytes(value, 'little')
+
+
+class _ReadOnly(object):
+    """Mixin for models whose instances can be frozen.
+
+    Assigning to an attribute of a frozen instance raises AttributeError.
+    The ORM loads attributes without assignment, so frozen instances can
+    still be loaded and refreshed.
+
+    """
 
+    _frozen = False
 
-class Card(Base):
+    def freeze(self):
+        object.__setattr__(self, '_frozen', True)
+
+    def __setattr__(self, key, value):
+        if self._frozen:
+            raise AttributeError(f"{type(self).__name__} objects from the "
+                                 f"cache are read-only")
+        super().__setattr__(key, value)
+
+
+class Card(_ReadOnly, Base):
     """Class for representing Magic cards.
 
     Each member of the Card class represents an abstract Magic card represented
@@ -50,10 +196,21 @@ class Card(Base):
         cmc (float): Converted mana cost of this card. (Some silver-bordered
             cards have fractional CMCs.)
         mana_cost (str): String representation of the card's mana cost symbols.
-        colors (Set[Color]): Set of the colors of this card as defined by the
+        mana_symbols (ManaCost): Counts of the symbols in the mana cost,
+            parsed when the card is loaded.
+        representative_id (str): Id of the printing returned by
+            representative.
+        first_printed (date): Release date of the card's first set.
+        last_printed (date): Release date of the card's latest set.
+        set_codes (FrozenSet[str]): Codes of the sets the card is printed in.
+        regular_set_codes (FrozenSet[str]): Codes of the regular sets (see
+            Set.is_regular) the card is printed in.
+        set_bits (int): Bitset of the sets the card is printed in, with bit
+            Set.ordinal set for each set (see Set.bitmask).
+        colors (ColorSet): Set of the colors of this card as defined by the
             Magic rules (only colors of symbols in the mana cost or any color
             indicator).
-        color_identity (Set[Color]): Set of the colors in the card's color
+        color_identity (ColorSet): Set of the colors in the card's color
             identity.
         type_line (str): Type line of the card.
         oracle_text (str): The most up-to-date oracle text of the card.
@@ -69,43 +226,125 @@ class Card(Base):
     __table_args__ = (
         UniqueConstraint("oracle_id", sqlite_on_conflict='REPLACE'),
     )
-    session = Session()
+    session = ScopedSession
+    _name_index = None
+    _name_index_lock = threading.Lock()
 
     oracle_id = Column(String, primary_key=True)
-    cmc = Column(Float)
-    name = Column(String, nullable=False)
-    colors = Column(_ColorSet)
-    color_identity = Column(_ColorSet, nullable=False)
+    cmc = Column(Float, index=True)
+    name = Column(String, nullable=False, index=True)
+    colors = Column(ColorSetType)
+    color_identity = Column(ColorSetType, nullable=False)
     oracle_text = Column(String)
     loyalty = Column(String)
     mana_cost = Column(String)
     power = Column(String)
     toughness = Column(String)
     type_line = Column(String, nullable=False)
+    mana_symbols = Column(_ManaSymbols)
+    # Summary of the card's printings, see Card.refresh_printing_summary.
+    representative_id = Column(String)
+    first_printed = Column(Date)
+    last_printed = Column(Date)
+    set_codes = Column(_CodeSet)
+    regular_set_codes = Column(_CodeSet)
+    set_bits = Column(_SetBits)
     # faces = relationship("Face", primaryjoin=f"Face.name.in_({_parse_faces(Card.name)})")
-    printings = relationship("Printing",
-                             lazy='joined', innerjoin=True, backref='card')
+    printings = relationship("Printing", lazy='select', backref='card')
+
+    # Names of the loading profiles accepted by Card.load_options.
+    LOAD_PROFILES = ('card', 'printings', 'strict')
 
     @classmethod
-    def named(cls, name, exact=False, session=session):
+    def load_options(cls, profile='card'):
+        """Returns query options loading cards for an access pattern.
+
+        Args:
+            profile (str): One of Card.LOAD_PROFILES:
+                'card' loads only the cards' own columns, and printings are
+                    loaded the first time they are accessed.
+                'printings' also loads every printing of the cards and the
+                    sets they were printed in, in one query each, as needed
+                    by Card.representative.
+                'strict' loads only the cards' own columns, and accessing
+                    any relationship raises an error instead of querying.
+
+        """
+        if profile == 'card':
+            return [lazyload(cls.printings)]
+        if profile == 'printings':
+            return [selectinload(cls.printings).selectinload(Printing.set)]
+        if profile == 'strict':
+            return [raiseload('*')]
+        raise ValueError(f"Unknown loading profile {profile!r}")
+
+    @classmethod
+    def named(cls, name, exact=False, session=session, profile='card'):
         """Factory method for returning a Card object of the given name.
 
         Args:
             name (str): The name of the card to return.
             exact (bool): Invokes fuzzy matching of name if false.
                 Defaults to false.
+            profile (str): Loading profile, see Card.load_options. With the
+                default session, the card comes from the cache (see
+                CardCache) and is detached, so its printings can only be
+                read with the 'printings' profile.
 
         """
         if not exact:
             name = cls.autocomplete(name)
-        return session.query(cls).filter(cls.name == name).first()
+        if session is cls.session:
+            return cache.cards_named([name], profile)[0]
+        q = session.query(cls).options(*cls.load_options(profile))
+        return q.filter(cls.name == name).first()
+
+    @classmethod
+    def named_many(cls, names, exact=False, session=session,
+                   profile='card'):
+        """Factory method for returning the Card objects of many names.
+
+        Equivalent to calling Card.named on each name, but every name is
+        resolved against the name index up front and all of the cards are
+        fetched with a single query.
+
+        Args:
+            names (Iterable[str]): The names of the cards to return.
+            exact (bool): Invokes fuzzy matching of names if false.
+                Defaults to false.
+            profile (str): Loading profile, see Card.load_options and
+                Card.named.
+
+        Returns:
+            List[Card]: The cards, in the same order as names. Names with no
+                matching card give None.
+
+        """
+        names = list(names)
+        if not exact:
+            resolved = {name: cls.autocomplete(name) for name in set(names)}
+            names = [resolved[name] for name in names]
+        if session is cls.session:
+            return cache.cards_named(names, profile)
+        cards = {}
+        q = session.query(cls).options(*cls.load_options(profile))
+        for card in q.filter(cls.name.in_(set(names))):
+            cards.setdefault(card.name, card)
+        return [cards.get(name) for name in names]
 
     @classmethod
     def from_scryfall(cls, data):
         # data['faces'] = [Face.from_scryfall(face)
         #                  for face in data.get('card_faces')]
+        return Card(**cls.row_from_scryfall(data))
+
+    @classmethod
+    def row_from_scryfall(cls, data):
+        """Returns the column values of the card in a Scryfall card object."""
         col_names = [c.name for c in Card.__table__.columns]
-        return Card(**util.restriction(data, col_names))
+        row = util.restriction(data, col_names)
+        row['mana_symbols'] = ManaCost.parse(data.get('mana_cost')).packed
+        return row
 
     @classmethod
     def all_names(cls):
@@ -113,6 +352,26 @@ class Card(Base):
         q = cls.session.query(cls.__table__.columns['name']).distinct()
         return sorted([name[0] for name in q.all()])
 
+    @classmethod
+    def name_index(cls) -> NameIndex:
+        """Returns the index of all card names, building it if needed.
+
+        The index is built once from the database and kept until
+        Card.invalidate_name_index is called, which update_cards does after
+        loading new card data.
+
+        """
+        if cls._name_index is None:
+            with Card._name_index_lock:
+                if cls._name_index is None:
+                    Card._name_index = NameIndex(cls.all_names())
+        return cls._name_index
+
+    @classmethod
+    def invalidate_name_index(cls):
+        """Discards the name index so it is rebuilt on next use."""
+        Card._name_index = None
+
     @classmethod
     def autocomplete(cls, name: str) -> str:
         """Fuzzy matcher for card names.
@@ -124,15 +383,183 @@ class Card(Base):
             str: The closest actual card name to argument.
 
         """
-        names = cls.all_names()
-        matchers = (util.shortest_exact_match,
-                    util.shortest_starting_match,
-                    util.shortest_token_match)
-        for matcher in matchers:
-            match = matcher(name, names)
-            if match is not None:
-                return match
-        return process.extractOne(name, cls.all_names())[0]
+        index = cls.name_index()
+        match = index.match(name)
+        if match is not None:
+            return match
+        return index.fuzzy_match(name)
+
+    @classmethod
+    def search(cls, text, type_line=None, limit=20, session=session,
+               profile='card'):
+        """Full-text search over card names, type lines and oracle text.
+
+        Matching uses the cards_fts FTS5 table, which update_cards keeps in
+        sync with the cards table. Results are ranked by BM25, with matches
+        in the name weighted above matches in the type line, and those
+        above matches in the oracle text.
+
+        Args:
+            text (str): Phrase to search for, e.g. "draw a card". Case and
+                diacritics are ignored.
+            type_line (str): If given, a phrase the type line must contain,
+                e.g. "Creature".
+            limit (int): Maximum number of cards to return.
+            profile (str): Loading profile, see Card.load_options.
+
+        Returns:
+            List[Card]: The matching cards, best match first.
+
+        """
+        query = _fts_phrase(text)
+        if type_line is not None:
+            query += f" AND type_line : {_fts_phrase(type_line)}"
+        ranked = session.execute(
+            text_clause("SELECT oracle_id FROM cards_fts "
+                        "WHERE cards_fts MATCH :query "
+                        "ORDER BY bm25(cards_fts, 0, 10, 2, 1) LIMIT :limit"),
+            {'query': query, 'limit': limit})
+        oracle_ids = [oracle_id for oracle_id, in ranked]
+        q = session.query(cls).options(*cls.load_options(profile))
+        cards = {card.oracle_id: card for card in
+                 q.filter(cls.oracle_id.in_(oracle_ids))}
+        return [cards[oracle_id] for oracle_id in oracle_ids
+                if oracle_id in cards]
+
+    @staticmethod
+    def rebuild_search_index(bind=None, oracle_ids=None):
+        """Repopulates the cards_fts table from the cards table.
+
+        Args:
+            oracle_ids (Iterable[str]): If given, only the entries of these
+                cards are rewritten, and those of the ones no longer in the
+                cards table removed, as after an incremental update (see
+                sync_rows). Defaults to rewriting every entry.
+
+        """
+        columns = "oracle_id, name, type_line, oracle_text"
+        with (bind or database.engine).begin() as connection:
+            connection.execute(_CARDS_FTS_CREATE)
+            if oracle_ids is None:
+                connection.execute(text_clause("DELETE FROM cards_fts"))
+                connection.execute(text_clause(
+                    f"INSERT INTO cards_fts ({columns}) "
+                    f"SELECT {columns} FROM cards"))
+                return
+            delete = text_clause(
+                "DELETE FROM cards_fts WHERE oracle_id IN :keys")
+            insert = text_clause(
+                f"INSERT INTO cards_fts ({columns}) "
+                f"SELECT {columns} FROM cards WHERE oracle_id IN :keys")
+            for keys in util.chunked(oracle_ids, 500):
+                for statement in (delete, insert):
+                    connection.execute(
+                        statement.bindparams(bindparam('keys',
+                                                       expanding=True)),
+                        {'keys': keys})
+
+    @staticmethod
+    def refresh_printing_summary(bind=None, oracle_ids=None):
+        """Recomputes the columns summarizing each card's printings.
+
+        Fills in representative_id, first_printed, last_printed, set_codes
+        and regular_set_codes from the printings and sets tables in one
+        statement, so that representative and is_in_set don't need to load
+        any printings. Then numbers the sets without a Set.ordinal after the
+        ones that have one, in release order, so that existing ordinals stay
+        valid, and fills in each card's set_bits from those ordinals. Only
+        rows whose values changed are written. update_cards calls this after
+        loading card data.
+
+        Args:
+            oracle_ids (Iterable[str]): If given, only the summaries of these
+                cards are recomputed, as after an incremental update (see
+                sync_rows). Defaults to every card.
+
+        """
+        regular = ', '.join(f"'{set_type}'"
+                            for set_type in Set.REGULAR_SET_TYPES)
+        columns = ('representative_id', 'first_printed', 'last_printed',
+                   'set_codes', 'regular_set_codes')
+
+        def summary(where):
+            # Cards without printings get an empty summary.
+            return text_clause(f"""
+                UPDATE cards SET
+                    {', '.join(f'{c} = summary.{c}' for c in columns)}
+                FROM (
+                    SELECT cards.oracle_id, printed.representative_id,
+                           printed.first_printed, printed.last_printed,
+                           coalesce(printed.set_codes, '') AS set_codes,
+                           coalesce(printed.regular_set_codes, '')
+                               AS regular_set_codes
+                    FROM cards LEFT JOIN (
+                        SELECT oracle_id,
+                               min(release_date) AS first_printed,
+                               max(release_date) AS last_printed,
+                               group_concat(DISTINCT set_code) AS set_codes,
+                               group_concat(DISTINCT CASE WHEN regular
+                                            THEN set_code END)
+                                   AS regular_set_codes,
+                               max(CASE WHEN newest = 1 THEN id END)
+                                   AS representative_id
+                        FROM (
+                            SELECT printings.id, printings.oracle_id,
+                                   printings.set_code, sets.release_date,
+                                   sets.set_type IN ({regular}) AS regular,
+                                   row_number() OVER (
+                                       PARTITION BY printings.oracle_id
+                                       ORDER BY
+                                           sets.set_type IN ({regular}) DESC,
+                                           sets.release_date DESC,
+                                           printings.id) AS newest
+                            FROM printings
+                            LEFT JOIN sets ON sets.code = printings.set_code
+                            {where.format(table='printings')})
+                        GROUP BY oracle_id) AS printed
+                    ON printed.oracle_id = cards.oracle_id
+                    {where.format(table='cards')}) AS summary
+                WHERE cards.oracle_id = summary.oracle_id AND ({' OR '.join(
+                    f'cards.{c} IS NOT summary.{c}' for c in columns)})""")
+
+        with (bind or database.engine).begin() as connection:
+            connection.execute(text_clause(
+                "UPDATE sets SET ordinal = numbered.ordinal FROM ("
+                "SELECT id, (SELECT coalesce(max(ordinal), -1) FROM sets) + "
+                "row_number() OVER (ORDER BY release_date, code) AS ordinal "
+                "FROM sets WHERE ordinal IS NULL) "
+                "AS numbered WHERE sets.id = numbered.id"))
+            if oracle_ids is None:
+                batches = [None]
+            else:
+                batches = util.chunked(oracle_ids, 500)
+            for keys in batches:
+                cards = select(Card.oracle_id, Card.set_bits)
+                printed = select(Printing.oracle_id, Set.ordinal).distinct()\
+                    .join(Set, Set.code == Printing.set_code)
+                if keys is None:
+                    connection.execute(summary(''))
+                else:
+                    connection.execute(
+                        summary('WHERE {table}.oracle_id IN :keys')
+                        .bindparams(bindparam('keys', expanding=True)),
+                        {'keys': keys})
+                    cards = cards.where(Card.oracle_id.in_(keys))
+                    printed = printed.where(Printing.oracle_id.in_(keys))
+                old_bits = dict(connection.execute(cards).all())
+                set_bits = dict.fromkeys(old_bits, 0)
+                for oracle_id, ordinal in connection.execute(printed):
+                    if oracle_id in set_bits:
+                        set_bits[oracle_id] |= 1 << ordinal
+                changed = [{'key': oracle_id, 'set_bits': bits}
+                           for oracle_id, bits in set_bits.items()
+                           if bits != old_bits[oracle_id]]
+                if changed:
+                    connection.execute(
+                        Card.__table__.update()
+                        .where(Card.oracle_id == bindparam('key'))
+                        .values(set_bits=bindparam('set_bits')),
+                        changed)
 
     def is_in_set(self, set_code):
         """Test for if the Card has been printed in a particular set.
@@ -144,10 +571,47 @@ class Card(Base):
             bool: True if Card has been printed in the set.
 
         """
+        if self.set_codes is not None:
+            return set_code in self.set_codes
         return any([p.set_code == set_code for p in self.printings])
 
+    def pips(self):
+        """Counts the colored mana symbols in the card's mana cost.
+
+        Hybrid symbols, such as {W/U}, count towards each of their colors.
+
+        Returns:
+            Counter[Color, int]: Number of symbols of each color.
+
+        """
+        symbols = self.mana_symbols or ManaCost.parse(self.mana_cost)
+        return Counter({color: symbols.devotion(color) for color in Color
+                        if symbols.devotion(color)})
+
+    def card_types(self):
+        """Returns the set of CARD_TYPES on the card's type line."""
+        words = set()
+        for face in self.type_line.split(' // '):
+            words.update(face.split('\u2014')[0].split())
+        return words.intersection(CARD_TYPES)
+
     def representative(self):
-        """Returns the newest 'regular' printing of the card."""
+        """Returns the newest 'regular' printing of the card.
+
+        If the card has no printing in a regular set, returns its newest
+        printing. Printings released on the same day are ordered by id.
+
+        """
+        if self.representative_id is not None:
+            session = object_session(self)
+            if session is None and 'printings' in inspect(self).unloaded:
+                # Detached without its printings, e.g. cached by Card.named.
+                session = Card.session
+            if session is not None:
+                # Served from the identity map if the printing is loaded.
+                return session.get(Printing, self.representative_id)
+            return next(p for p in self.printings
+                        if p.id == self.representative_id)
         sorted_printings = sorted(self.printings,
                                   key=lambda p: p.set.release_date,
                                   reverse=True)
@@ -157,6 +621,44 @@ class Card(Base):
         else:
             return sorted_printings[0]
 
+    @classmethod
+    def representatives(cls, cards, session=None):
+        """Returns the representative printing of each of many cards.
+
+        Equivalent to calling representative on each card, but the
+        printings are loaded with their sets in a single query, so that
+        rendering a whole deck doesn't take a query per card.
+
+        Args:
+            cards (Iterable[Card]): The cards.
+            session (Session): Session to load the printings with. Defaults
+                to Card.session.
+
+        Returns:
+            List[Printing]: The printing of each card, in the same order as
+                cards. Cards without printings give None.
+
+        """
+        cards = list(cards)
+        session = session if session is not None else cls.session
+        printings = {}
+        ids = {card.representative_id for card in cards
+               if card.representative_id is not None}
+        for keys in util.chunked(ids, 500):
+            q = session.query(Printing).options(joinedload(Printing.set))
+            printings.update((printing.id, printing) for printing in
+                             q.filter(Printing.id.in_(keys)))
+        result = []
+        for card in cards:
+            if card.representative_id in printings:
+                result.append(printings[card.representative_id])
+            elif card.set_codes is not None and not card.set_codes:
+                result.append(None)
+            else:
+                # The summary hasn't been computed for this card.
+                result.append(card.representative())
+        return result
+
     def __repr__(self):
         return f"Card.named('{self.name}')"
 
@@ -170,11 +672,40 @@ class Card(Base):
     def __eq__(self, other):
         return self.oracle_id == other.oracle_id
 
+    @validates('colors', 'color_identity')
+    def _validate_colors(self, key, colors):
+        return ColorSet(colors or ())
+
+    @validates('mana_cost')
+    def _validate_mana_cost(self, key, mana_cost):
+        self.mana_symbols = ManaCost.parse(mana_cost)
+        return mana_cost
+
+    @validates('mana_symbols')
+    def _validate_mana_symbols(self, key, symbols):
+        if isinstance(symbols, int):
+            return ManaCost.unpack(symbols)
+        return symbols
+
     @staticmethod
     def _parse_faces(name):
         return name.split(" // ")
 
 
+_CARDS_FTS_CREATE = DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5("
+    "oracle_id UNINDEXED, name, type_line, oracle_text, "
+    "tokenize = 'unicode61 remove_diacritics 2')")
+event.listen(Card.__table__, 'after_create', _CARDS_FTS_CREATE)
+event.listen(Card.__table__, 'before_drop',
+             DDL("DROP TABLE IF EXISTS cards_fts"))
+
+
+def _fts_phrase(text):
+    """Quotes text as a single FTS5 phrase."""
+    return '"' + text.replace('"', '""') + '"'
+
+
 class Face(Base):
 
     __tablename__ = 'faces'
@@ -185,16 +716,25 @@ class Face(Base):
     type_line = Column(String)
     oracle_text = Column(String)
     mana_cost = Column(String)
-    colors = Column(_ColorSet)
-    color_indicator = Column(_ColorSet)
+    colors = Column(ColorSetType)
+    color_indicator = Column(ColorSetType)
     power = Column(String)
     toughness = Column(String)
     flavor_text = Column(String)
 
     @classmethod
     def from_scryfall(self, data):
+        return Face(**Face.row_from_scryfall(data))
+
+    @validates('colors', 'color_indicator')
+    def _validate_colors(self, key, colors):
+        return ColorSet(colors or ())
+
+    @classmethod
+    def row_from_scryfall(cls, data):
+        """Returns the column values of a Scryfall card face object."""
         col_names = [c.name for c in Face.__table__.columns]
-        return Face(**util.restriction(data, col_names))
+        return util.restriction(data, col_names)
 
 
 class MultifacedCard(Card):
@@ -205,7 +745,7 @@ class Token(Card):
     pass
 
 
-class Printing(Base):
+class Printing(_ReadOnly, Base):
     """Class representing an actual, physical (or digital) printing of a card.
 
     Owing to their link to physical copies of cards, each Printing can be
@@ -217,9 +757,11 @@ class Printing(Base):
     __tablename__ = 'printings'
     __table_args__ = (
         UniqueConstraint('id', sqlite_on_conflict='IGNORE'),
+        Index('ix_printings_set_code_collector_number',
+              'set_code', 'collector_number'),
     )
     id = Column(String, primary_key=True)
-    oracle_id = Column(String, ForeignKey("cards.oracle_id"))
+    oracle_id = Column(String, ForeignKey("cards.oracle_id"), index=True)
     collector_number = Column(String)
     set_code = Column(String, ForeignKey('sets.code'))
     set = relationship('Set')
@@ -231,17 +773,56 @@ class Printing(Base):
 
     @classmethod
     def get(cls, set_code: str, number: str):
-        session = Session()
-        q = session.query(cls).filter(cls.set == set_code)\
-                              .filter(cls.collector_number == number)
-        printing_obj = q.first()
-        session.close()
-        return printing_obj
+        return cache.get_printing(set_code, number)
 
     @classmethod
     def from_scryfall(cls, data):
+        printing_data = cls.row_from_scryfall(data)
+        printing_data['card'] = Card.from_scryfall(data)
+        return Printing(**printing_data)
+
+    @classmethod
+    def fetch_many(cls, identifiers):
+        """Fetches printings from Scryfall in batches.
+
+        Useful for filling in cards missing from the local database, since
+        up to 75 printings are fetched per request.
+
+        Args:
+            identifiers (Iterable): Scryfall ids, card names,
+                (set code, collector number) pairs or identifier dicts, as
+                accepted by scryfall.card_identifier.
+
+        Returns:
+            List[Printing]: The printings found, with printings of the same
+                card sharing one Card object. Identifiers matching no card
+                are skipped.
+
+        """
+        data, _ = scryfall.collection(identifiers)
+        cards = {}
+        printings = []
+        for d in data:
+            printing = Printing(**cls.row_from_scryfall(d))
+            # Reversible cards only have an oracle_id on their faces.
+            faces = d.get('card_faces') or [{}]
+            oracle_id = d.get('oracle_id') or faces[0].get('oracle_id')
+            card = cards.get(oracle_id) if oracle_id is not None else None
+            if card is None:
+                card = Card.from_scryfall(d)
+                card.oracle_id = oracle_id
+                if oracle_id is not None:
+                    cards[oracle_id] = card
+            printing.card = card
+            printings.append(printing)
+        return printings
+
+    @classmethod
+    def row_from_scryfall(cls, data):
+        """Returns the column values of the printing in a Scryfall card
+        object."""
         printing_col_names = [c.name for c in Printing.__table__.columns]
-        printing_data = util.convert(data, {'set': 'set_code'})
+        printing_data = util.convert(dict(data), {'set': 'set_code'})
         try:
             if 'image_uris' in printing_data:
                 printing_data['image_uri'] = printing_data['image_uris']['normal']
@@ -250,21 +831,19 @@ class Printing(Base):
         except KeyError:
             print(printing_data)
             raise
-        printing_data = util.restriction(data, printing_col_names)
-        printing_data['card'] = Card.from_scryfall(data)
-        return Printing(**printing_data)
+        return util.restriction(printing_data, printing_col_names)
 
     def __repr__(self):
         return f"Printing.get({self.set_code}, {self.collector_number})"
 
 
-class Set(Base):
+class Set(_ReadOnly, Base):
 
     __tablename__ = 'sets'
     __table_args__ = (
         UniqueConstraint('id', sqlite_on_conflict='IGNORE'),
     )
-    session = Session()
+    session = ScopedSession
 
     id = Column(String, primary_key=True)
     code = Column(String, unique=True)
@@ -272,12 +851,24 @@ class Set(Base):
     release_date = Column(Date, nullable=True)
     card_count = Column(Integer)
     set_type = Column(String)
+    # Position of the set in release order, see Card.set_bits.
+    ordinal = Column(Integer)
     printings = relationship('Printing', back_populates='set')
 
     @classmethod
     def from_code(cls, code):
-        q = cls.session.query(cls).filter(cls.code == code)
-        return q.first()
+        return cache.set_from_code(code)
+
+    @classmethod
+    def bitmask(cls, set_codes, session=None):
+        """Returns the bitset of the given sets, to test against
+        Card.set_bits. Unknown codes are ignored."""
+        session = session if session is not None else cls.session
+        q = session.query(cls.ordinal).filter(cls.code.in_(set(set_codes)))
+        mask = 0
+        for ordinal, in q.filter(cls.ordinal.isnot(None)):
+            mask |= 1 << ordinal
+        return mask
 
     @classmethod
     def from_scryfall(cls, data):
@@ -287,12 +878,171 @@ class Set(Base):
         col_names = [c.name for c in Set.__table__.columns]
         return Set(**util.restriction(data, col_names))
 
+    # Set types whose printings Card.representative prefers.
+    REGULAR_SET_TYPES = ('core',
+                         'expansion',
+                         'masters',
+                         'draft_innovation')
+
     def is_regular(self) -> bool:
-        regular_set_types = ('core',
-                             'expansion',
-                             'masters',
-                             'draft_innovation')
-        return self.set_type in regular_set_types
+        return self.set_type in Set.REGULAR_SET_TYPES
+
+
+class Digest(Base):
+    """Content hash of a row loaded from Scryfall bulk data.
+
+    Digests let update_cards(incremental=True) tell which cards and
+    printings changed since the last load without comparing every column.
+
+    """
+
+    __tablename__ = 'digests'
+
+    table = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    digest = Column(String, nullable=False)
+
+    @staticmethod
+    def of(*rows):
+        """Returns the hex digest of the given column values."""
+        content = json.dumps(rows, sort_keys=True, default=str)
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+class CardCache(object):
+    """Bounded cache of read-only Card, Set and Printing objects.
+
+    Card.named and Card.named_many (when called with the default session),
+    Set.from_code and Printing.get look objects up here before querying the
+    database. Objects are loaded in a session of their own which is closed
+    straight away, so cached objects are detached from every session and
+    the class-level sessions' identity maps don't grow with them. Cards are
+    cached separately for each loading profile (see Card.load_options) and
+    loaded with it. Only the 'printings' profile loads printings and sets,
+    and reading the printings of a card cached with another profile raises
+    DetachedInstanceError, so pass profile='printings' or query through a
+    session of your own to get them. Printings are cached with their set,
+    their card and its printings. Cached objects are frozen: assigning to
+    their attributes raises AttributeError.
+
+    update_sets and update_cards clear the module's cache. To change its
+    size or ttl, replace it, e.g. mtg.cache = mtg.CardCache(maxsize=10000).
+
+    Args:
+        maxsize (int): Number of objects of each kind to keep.
+        ttl (float): Number of seconds after which an object is loaded
+            again, or None to keep objects until they are evicted.
+
+    """
+
+    def __init__(self, maxsize=4096, ttl=None):
+        self.cards = util.LRUCache(maxsize, ttl)
+        self.sets = util.LRUCache(maxsize, ttl)
+        self.printings = util.LRUCache(maxsize, ttl)
+        self._card_ids = util.LRUCache(maxsize, ttl)
+
+    def cards_named(self, names, profile='printings'):
+        """Returns the cards with the given exact names, None where there
+        is no such card, loading the ones not cached in one query with the
+        loading profile profile."""
+        found = {}
+        for name in set(names):
+            card = self.cards.get((profile, self._card_ids.get(name)))
+            if card is not None:
+                found[name] = card
+        missing = set(names) - found.keys()
+        if missing:
+            session = Session()
+            try:
+                q = session.query(Card)\
+                           .options(*Card.load_options(profile))
+                cards = q.filter(Card.name.in_(missing)).all()
+                if profile == 'printings':
+                    for card in cards:
+                        for printing in card.printings:
+                            # Resolved from the identity map, without a
+                            # query.
+                            printing.card
+            finally:
+                session.close()
+            for card in cards:
+                if profile == 'printings':
+                    self._freeze(*card.printings, *{printing.set for printing
+                                                    in card.printings})
+                self._freeze(card)
+                self.cards[(profile, card.oracle_id)] = card
+                self._card_ids[card.name] = card.oracle_id
+                found.setdefault(card.name, card)
+        return [found.get(name) for name in names]
+
+    def set_from_code(self, code):
+        """Returns the set with the given code, or None."""
+        card_set = self.sets.get(code)
+        if card_set is None:
+            session = Session()
+            try:
+                card_set = session.query(Set).filter(Set.code == code)\
+                                  .first()
+            finally:
+                session.close()
+            if card_set is not None:
+                self._freeze(card_set)
+                self.sets[code] = card_set
+        return card_set
+
+    def get_printing(self, set_code, number):
+        """Returns the printing with the given set code and collector
+        number, or None."""
+        key = (set_code, number)
+        printing = self.printings.get(key)
+        if printing is None:
+            session = Session()
+            try:
+                q = session.query(Printing)\
+                           .options(selectinload(Printing.card)
+                                    .options(*Card.load_options('printings')),
+                                    selectinload(Printing.set))\
+                           .filter(Printing.set_code == set_code)\
+                           .filter(Printing.collector_number == number)
+                printing = q.first()
+                if printing is not None and printing.card is not None:
+                    for other in printing.card.printings:
+                        # Resolved from the identity map, without a query.
+                        other.card
+            finally:
+                session.close()
+            if printing is not None:
+                card = printing.card
+                printings = card.printings if card is not None else []
+                self._freeze(printing, card, printing.set, *printings,
+                             *{other.set for other in printings})
+                self.printings[key] = printing
+        return printing
+
+    @staticmethod
+    def _freeze(*objects):
+        for obj in objects:
+            if obj is not None:
+                obj.freeze()
+
+    def clear(self):
+        for lru in (self.cards, self.sets, self.printings, self._card_ids):
+            lru.clear()
+
+    def stats(self):
+        """Returns the size, hits, misses and hit rate of the card, set
+        and printing caches, as a dict of dicts."""
+        return {name: {'size': len(lru), 'hits': lru.hits,
+                       'misses': lru.misses, 'hit_rate': lru.hit_rate}
+                for name, lru in (('cards', self.cards), ('sets', self.sets),
+                                  ('printings', self.printings))}
+
+
+cache = CardCache()
+
+
+DeckStats = namedtuple('DeckStats', ['curve', 'pips', 'types',
+                                     'color_identity', 'land_ratio'])
 
 
 class Decklist(object):
@@ -311,15 +1061,111 @@ class Decklist(object):
         card = Card.named(card_name)
         self.sideboard.update({card: quantity})
 
+    def add_many(self, main=(), side=(), profile='card'):
+        """Add many cards at once, looking up all of their names together.
+
+        Args:
+            main (Iterable[Tuple[str, int]]): Pairs of card name and quantity
+                to add to the mainboard.
+            side (Iterable[Tuple[str, int]]): Pairs of card name and quantity
+                to add to the sideboard.
+            profile (str): Loading profile for the cards, see
+                Card.load_options.
+
+        """
+        main, side = list(main), list(side)
+        cards = Card.named_many([name for name, _ in main + side],
+                                profile=profile)
+        for card, (_, quantity) in zip(cards, main):
+            self.mainboard.update({card: quantity})
+        for card, (_, quantity) in zip(cards[len(main):], side):
+            self.sideboard.update({card: quantity})
+
     def colors(self):
-        colors = set()
-        for card in self.mainboard + self.sideboard:
+        colors = ColorSet()
+        for card in self.mainboard.keys() | self.sideboard.keys():
             colors |= card.colors
         return colors
 
     def creatures(self):
         return [card for card in self.mainboard if "Creature" in card.type_line]
 
+    def image_uris(self, session=None):
+        """Returns the image URI of the representative printing of each
+        card of the deck, loading all of the printings in one query (see
+        Card.representatives).
+
+        Returns:
+            Dict[Card, str]: Image URI of each card, or None for cards
+                without printings.
+
+        """
+        cards = list(self.mainboard.keys() | self.sideboard.keys())
+        printings = Card.representatives(cards, session)
+        return {card: printing.image_uri if printing is not None else None
+                for card, printing in zip(cards, printings)}
+
+    def legal_in(self, set_codes, session=None):
+        """Test for if every card of the deck is printed in one of the sets.
+
+        This is the legality check of set-restricted formats, such as
+        Standard, Pioneer or a cube's set list. Each card is tested with
+        one bitwise and of its set_bits. See analytics.legal_in for
+        checking many decklists at once.
+
+        Args:
+            set_codes (Iterable[str]): Codes of the allowed sets.
+            session (Session): Session to look the sets up with. Defaults
+                to Set.session.
+
+        Returns:
+            bool: True if every card in the mainboard and sideboard has a
+                printing in one of the sets.
+
+        """
+        mask = Set.bitmask(set_codes, session=session)
+        return all((card.set_bits or 0) & mask
+                   for card in self.mainboard.keys() | self.sideboard.keys())
+
+    def stats(self):
+        """Computes statistics of the deck in one pass over its cards.
+
+        The curve, pips, types and land ratio cover the mainboard, and the
+        color identity covers the mainboard and sideboard. Every count is
+        multiplied by the quantity of the card. See analytics.batch_stats
+        for computing the statistics of many decklists at once.
+
+        Returns:
+            DeckStats: Tuple of
+                curve (Counter[int, int]): Number of nonland cards of each
+                    mana value, rounded down and capped at CURVE_MAX.
+                pips (Counter[Color, int]): Number of colored mana symbols of
+                    each color, see Card.pips.
+                types (Counter[str, int]): Number of cards of each of
+                    CARD_TYPES.
+                color_identity (ColorSet): Union of the cards' color
+                    identities.
+                land_ratio (float): Fraction of the mainboard that is lands.
+
+        """
+        curve, pips, types = Counter(), Counter(), Counter()
+        identity = 0
+        total = 0
+        for card, quantity in self.mainboard.items():
+            card_types = card.card_types()
+            if 'Land' not in card_types:
+                curve[min(int(card.cmc or 0), CURVE_MAX)] += quantity
+            for color, count in card.pips().items():
+                pips[color] += count * quantity
+            for card_type in card_types:
+                types[card_type] += quantity
+            identity |= card.color_identity.mask
+            total += quantity
+        for card in self.sideboard:
+            identity |= card.color_identity.mask
+        land_ratio = types['Land'] / total if total else 0.0
+        return DeckStats(curve, pips, types, ColorSet(identity), land_ratio)
+
     def lands(self):
         return [card for card in self.mainboard if "Land" in card.type_line]
 
@@ -332,22 +1178,100 @@ class Decklist(object):
         return json.dumps(self.as_dict())
 
     @classmethod
-    def import_arena(cls, txt):
+    def from_dicts(cls, dicts, batch_size=1000, profile='card'):
+        """Build decklists from dictionaries in the format of as_dict.
+
+        Works as a generator: dicts are consumed batch_size at a time, and
+        the card names of each batch are looked up together with
+        Card.named_many, so memory use doesn't grow with the number of
+        decklists.
+
+        Args:
+            dicts (Iterable[dict]): Dictionaries with 'mainboard' and
+                'sideboard' mappings of card names to quantities.
+            batch_size (int): Number of decklists to look up names for at
+                once.
+            profile (str): Loading profile for the cards, see
+                Card.load_options.
+
+        Yields:
+            Decklist: The decklist of each dictionary, in order.
+
+        Raises:
+            ValueError: If a card name matches no card.
+
+        """
+        for batch in util.chunked(dicts, batch_size):
+            names = list({name for d in batch
+                          for board in ('mainboard', 'sideboard')
+                          for name in d.get(board, ())})
+            cards = dict(zip(names, Card.named_many(names, exact=True,
+                                                    profile=profile)))
+            for name, card in cards.items():
+                if card is None:
+                    raise ValueError(f"Unknown card name {name!r}")
+            for d in batch:
+                yield cls({cards[name]: quantity for name, quantity
+                           in d.get('mainboard', {}).items()},
+                          {cards[name]: quantity for name, quantity
+                           in d.get('sideboard', {}).items()})
+
+    @classmethod
+    def read_ndjson(cls, path, batch_size=1000, profile='card'):
+        """Read decklists from a newline-delimited JSON file.
+
+        Each line holds the as_dict of one decklist, as written by
+        write_ndjson. The file is read and the decklists built lazily, see
+        from_dicts and util.iter_ndjson.
+
+        Args:
+            path (str): Path to the file, optionally compressed with gzip
+                (.gz) or Zstandard (.zst).
+            batch_size (int): Number of decklists to look up names for at
+                once.
+            profile (str): Loading profile for the cards, see
+                Card.load_options.
+
+        Yields:
+            Decklist: The decklists of the file, in order.
+
+        """
+        return cls.from_dicts(util.iter_ndjson(path), batch_size, profile)
+
+    @staticmethod
+    def write_ndjson(path, decklists):
+        """Write decklists to a newline-delimited JSON file, one per line.
+
+        Args:
+            path (str): Path to the file, compressed with gzip or Zstandard
+                if it ends in .gz or .zst.
+            decklists (Iterable[Decklist]): Decklists to write, consumed one
+                at a time.
+
+        Returns:
+            int: Number of decklists written.
+
+        """
+        return util.write_ndjson(path, (decklist.as_dict()
+                                        for decklist in decklists))
+
+    @classmethod
+    def import_arena(cls, txt, profile='card'):
         dl = Decklist()
         txt = txt.strip()
         mb, sb = [l.split("\n")[1:] for l in txt.split("\n\n")]
-        for elem in mb:
-            elem_split = elem.split(' ')
-            name = ' '.join(elem_split[1:-2])
-            quantity = int(elem_split[0])
-            dl.add(name, quantity)
-        for elem in sb:
-            elem_split = elem.split(' ')
-            name = ' '.join(elem_split[1:-2])
-            quantity = int(elem_split[0])
-            dl.add_sideboard(name, quantity)
+        dl.add_many(main=[cls._parse_arena_line(elem) for elem in mb],
+                    side=[cls._parse_arena_line(elem) for elem in sb],
+                    profile=profile)
         return dl
 
+    @staticmethod
+    def _parse_arena_line(line):
+        elem_split = line.split(' ')
+        name = ' '.join(elem_split[1:-2])
+        quantity = int(elem_split[0])
+        return name, quantity
+
     def __str__(self):
         result = ""
         mb = sorted(self.mainboard.items(),
@@ -368,6 +1292,229 @@ class Color(Enum):
     GREEN = 'G'
 
 
+class ColorSet(object):
+    """Immutable set of Colors, represented as a 5-bit mask.
+
+    A ColorSet behaves like a frozenset of Colors: it supports membership,
+    iteration (in WUBRG order), len, the set operators |, &, - and ^, and
+    the subset and superset comparisons, all as bitwise operations on the
+    mask. It compares equal to a set or frozenset of the same Colors, and
+    hashes alike. The set operators and methods, such as union and
+    issubset, also accept color letters, e.g. ColorSet('WU') | 'B'; the
+    comparison operators don't, and a ColorSet is never equal to a string.
+
+    Args:
+        colors: A mask, or an iterable of Colors or color letters, such as
+            'WU' or [Color.WHITE, Color.BLUE].
+
+    """
+
+    __slots__ = ('mask',)
+
+    BITS = {}
+
+    def __init__(self, colors=()):
+        if isinstance(colors, ColorSet):
+            mask = colors.mask
+        elif isinstance(colors, int):
+            mask = colors
+        else:
+            mask = 0
+            for color in colors:
+                mask |= ColorSet.BITS[Color(color)]
+        object.__setattr__(self, 'mask', mask)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ColorSet is immutable")
+
+    @property
+    def letters(self):
+        """The color letters of the set in WUBRG order, e.g. 'UR'."""
+        return ''.join(color.value for color in self)
+
+    def __iter__(self):
+        return (color for color, bit in ColorSet.BITS.items()
+                if self.mask & bit)
+
+    def __len__(self):
+        return bin(self.mask).count('1')
+
+    def __bool__(self):
+        return self.mask != 0
+
+    def __contains__(self, color):
+        return bool(self.mask & ColorSet.BITS[Color(color)])
+
+    def __hash__(self):
+        return hash(frozenset(self))
+
+    def __repr__(self):
+        return f"ColorSet('{self.letters}')"
+
+    def __reduce__(self):
+        return (ColorSet, (self.mask,))
+
+    @staticmethod
+    def _coerce(other):
+        if isinstance(other, ColorSet):
+            return other
+        if isinstance(other, (set, frozenset, list, tuple, str)):
+            return ColorSet(other)
+        return None
+
+    @staticmethod
+    def _coerce_set(other):
+        # Only sets of Colors, which hash like ColorSets, are compared.
+        if isinstance(other, ColorSet):
+            return other
+        if isinstance(other, (set, frozenset)) and \
+                all(isinstance(color, Color) for color in other):
+            return ColorSet(other)
+        return None
+
+    def _binary(operation):
+        def method(self, other):
+            other = ColorSet._coerce(other)
+            if other is None:
+                return NotImplemented
+            return ColorSet(operation(self.mask, other.mask))
+        return method
+
+    __or__ = __ror__ = union = _binary(lambda a, b: a | b)
+    __and__ = __rand__ = intersection = _binary(lambda a, b: a & b)
+    __xor__ = __rxor__ = symmetric_difference = _binary(lambda a, b: a ^ b)
+    __sub__ = difference = _binary(lambda a, b: a & ~b)
+    __rsub__ = _binary(lambda a, b: b & ~a)
+
+    def _comparison(operation, operator=True):
+        def method(self, other):
+            if operator:
+                other = ColorSet._coerce_set(other)
+            else:
+                other = ColorSet._coerce(other)
+            if other is None:
+                return NotImplemented
+            return operation(self.mask, other.mask)
+        return method
+
+    __eq__ = _comparison(lambda a, b: a == b)
+    __ne__ = _comparison(lambda a, b: a != b)
+    __le__ = _comparison(lambda a, b: a & ~b == 0)
+    __lt__ = _comparison(lambda a, b: a != b and a & ~b == 0)
+    __ge__ = _comparison(lambda a, b: b & ~a == 0)
+    __gt__ = _comparison(lambda a, b: a != b and b & ~a == 0)
+    issubset = _comparison(lambda a, b: a & ~b == 0, operator=False)
+    issuperset = _comparison(lambda a, b: b & ~a == 0, operator=False)
+    isdisjoint = _comparison(lambda a, b: a & b == 0, operator=False)
+
+    del _binary, _comparison
+
+
+ColorSet.BITS = {color: 1 << i for i, color in enumerate(Color)}
+ColorSet.ALL = ColorSet(Color)
+
+
+def migrate_color_columns(bind=None, verbose=False):
+    """Converts color columns stored as JSON text to integer bitmasks.
+
+    Databases created before colors were stored as bitmasks keep a JSON list
+    of color letters in each color column. Each affected table is rebuilt
+    with integer color columns, converting the JSON lists in SQL, and its
+    indexes are recreated. Tables that are already converted are skipped.
+
+    """
+    bind = bind or database.engine
+    for table in (Card.__table__, Face.__table__):
+        color_columns = [c.name for c in table.columns
+                         if isinstance(c.type, ColorSetType)]
+        with bind.begin() as connection:
+            declared = {row[1]: row[2].upper() for row in connection.execute(
+                text_clause(f"PRAGMA table_info({table.name})"))}
+            if not declared or all(declared[name] == 'INTEGER'
+                                   for name in color_columns):
+                continue
+            if verbose:
+                print(f"Converting colors in {table.name}...", end='',
+                      flush=True)
+            new_table = table.to_metadata(MetaData(),
+                                          name=f"{table.name}_new")
+            connection.execute(CreateTable(new_table))
+            columns = ', '.join(c.name for c in table.columns)
+            values = ', '.join(_json_colors_to_mask(c.name)
+                               if c.name in color_columns else c.name
+                               for c in table.columns)
+            connection.execute(text_clause(
+                f"INSERT INTO {new_table.name} ({columns}) "
+                f"SELECT {values} FROM {table.name}"))
+            connection.execute(text_clause(f"DROP TABLE {table.name}"))
+            connection.execute(text_clause(
+                f"ALTER TABLE {new_table.name} RENAME TO {table.name}"))
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+            if verbose:
+                print("done")
+
+
+def _json_colors_to_mask(column):
+    bits = ' + '.join(f"(instr({column}, '\"{color.value}\"') > 0) * {bit}"
+                      for color, bit in ColorSet.BITS.items())
+    return f"coalesce({bits}, 0)"
+
+
+def add_missing_columns(bind=None, verbose=False):
+    """Adds columns declared by the models but missing from the database.
+
+    The new columns are NULL in existing rows; the migrate functions for
+    each column fill them in.
+
+    """
+    bind = bind or database.engine
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            declared = {row[1] for row in connection.execute(
+                text_clause(f"PRAGMA table_info({table.name})"))}
+            if not declared:
+                continue
+            for column in table.columns:
+                if column.name in declared:
+                    continue
+                if verbose:
+                    print(f"Adding column {table.name}.{column.name}")
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(text_clause(
+                    f"ALTER TABLE {table.name} "
+                    f"ADD COLUMN {column.name} {column_type}"))
+
+
+def migrate_mana_symbols(bind=None, verbose=False):
+    """Adds the mana_symbols column to the cards table and fills it in.
+
+    Databases created before mana costs were parsed at load time lack the
+    column. It is added if missing, along with any other missing column
+    (see add_missing_columns), and computed from mana_cost for every card
+    where it is null.
+
+    """
+    add_missing_columns(bind)
+    bind = bind or database.engine
+    with bind.begin() as connection:
+        rows = connection.execute(
+            select(Card.oracle_id, Card.mana_cost)
+            .where(Card.mana_symbols.is_(None))).all()
+        if not rows:
+            return
+        if verbose:
+            print(f"Parsing {len(rows)} mana costs...", end='', flush=True)
+        connection.execute(
+            text_clause("UPDATE cards SET mana_symbols = :mana_symbols "
+                        "WHERE oracle_id = :oracle_id"),
+            [{'oracle_id': oracle_id,
+              'mana_symbols': ManaCost.parse(mana_cost).packed}
+             for oracle_id, mana_cost in rows])
+        if verbose:
+            print("done")
+
+
 def update_sets(verbose=True):
     sets = scryfall.Request("sets").data
     session = Session()
@@ -379,35 +1526,287 @@ def update_sets(verbose=True):
                 print(f"New set: {s['name']} ({s['code']} [{s['card_count']} cards])")
     session.commit()
     session.close()
+    cache.clear()
 
 
-def update_cards(verbose=True):
-    session = Session()
-    bulk_data_uri = scryfall.get_bulk_data()
-    bulk_data = scryfall.bulk_data_generator(bulk_data_uri)
-    printings = (Printing.from_scryfall(p) for p in bulk_data)
-    session.add_all(printings)
-    with warnings.catch_warnings():
-        warnings.simplefilter('ignore', category=exc.SAWarning)
-        session.commit()
-    session.close()
+# Keys of Scryfall card objects read by the row_from_scryfall methods.
+SCRYFALL_FIELDS = frozenset(
+    [c.name for c in Card.__table__.columns] +
+    [c.name for c in Printing.__table__.columns] +
+    ['set', 'image_uris', 'card_faces'])
 
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument("action", help="Action you want to perform")
-    parser.add_argument("-n", "--name", type=str,
-                        help="")
-    parser.add_argument("-d", "--deck", type=str)
-    args = parser.parse_args()
-    if args.action == "initialize":
-        database.initialize(verbose=True)
-    elif args.action == "update":
-        update_sets()
-        update_cards()
-    elif args.action == "card":
-        if args.name:
-            result = Card.named(args.name)
-        print(result)
-    elif args.action == "add":
+def update_cards(verbose=True, chunk_size=5000, workers=1,
+                 incremental=False):
+    bulk_data_uri = scryfall.get_bulk_data()
+    if workers > 1:
+        result = load_cards_parallel(bulk_data_uri, workers,
+                                     chunk_size=chunk_size, verbose=verbose,
+                                     incremental=incremental)
+    else:
+        bulk_data = scryfall.bulk_data_generator(bulk_data_uri,
+                                                 fields=SCRYFALL_FIELDS)
+        result = load_cards(bulk_data, chunk_size=chunk_size,
+                            verbose=verbose, incremental=incremental)
+    # After an incremental load, only the cards it touched are refreshed.
+    oracle_ids = result['oracle_ids'] if incremental else None
+    Card.invalidate_name_index()
+    Card.refresh_printing_summary(oracle_ids=oracle_ids)
+    Card.rebuild_search_index(oracle_ids=oracle_ids)
+    cache.clear()
+    try:
+        import snapshot
+    except ImportError:  # NumPy is optional
         pass
+    else:
+        snapshot.build()
+    return result
+
+
+def load_cards(bulk_data, chunk_size=5000, verbose=True, incremental=False):
+    """Writes Scryfall card objects to the cards, printings and faces tables.
+
+    Args:
+        bulk_data (Iterable[dict]): Scryfall card objects, one per printing.
+        chunk_size (int): Number of printings to write per transaction.
+        verbose (bool): Report progress and throughput if true.
+        incremental (bool): Only write the rows that changed since the last
+            load, using sync_rows, rather than writing every row.
+
+    Returns:
+        The result of write_rows or sync_rows.
+
+    """
+    rows = (scryfall_rows(data) for data in bulk_data)
+    writer = sync_rows if incremental else write_rows
+    return writer(rows, chunk_size=chunk_size, verbose=verbose)
+
+
+def load_cards_parallel(path, workers, chunk_size=5000, verbose=True,
+                        incremental=False, range_size=2 ** 23):
+    """Loads a Scryfall bulk data file using a pool of worker processes.
+
+    The file is split into byte ranges of about range_size bytes at card
+    object boundaries. Workers decode their ranges and turn each card object
+    into plain rows with scryfall_rows, and the rows are written by this
+    process with write_rows. At most two ranges per worker are in flight at a
+    time, so memory use is bounded however far the writer falls behind.
+
+    Args:
+        path (str): Path to the bulk data file.
+        workers (int): Number of worker processes.
+        chunk_size (int): Number of printings to write per transaction.
+        verbose (bool): Report progress and throughput if true.
+        incremental (bool): Write the rows with sync_rows rather than
+            write_rows.
+        range_size (int): Approximate number of bytes per worker task.
+
+    Returns:
+        The result of write_rows or sync_rows.
+
+    """
+    ranges = util.json_array_ranges(path, range_size,
+                                    scryfall.CARD_BOUNDARY)
+    tasks = deque((path, start, end) for start, end in ranges)
+    with multiprocessing.Pool(workers) as pool:
+        def results():
+            pending = deque()
+            while tasks or pending:
+                while tasks and len(pending) < 2 * workers:
+                    pending.append(pool.apply_async(_rows_from_range,
+                                                    (tasks.popleft(),)))
+                yield from pending.popleft().get()
+        writer = sync_rows if incremental else write_rows
+        return writer(results(), chunk_size=chunk_size, verbose=verbose)
+
+
+def _rows_from_range(task):
+    path, start, end = task
+    return [scryfall_rows(data) for data in
+            util.iter_json_range(path, start, end, fields=SCRYFALL_FIELDS)]
+
+
+def scryfall_rows(data):
+    """Returns the rows to write for a Scryfall card object.
+
+    Returns:
+        Tuple[str, dict, dict, List[dict]]: The card's oracle_id, and the
+            column values of its printing, of its card and of its faces.
+
+    """
+    faces = [Face.row_from_scryfall(face)
+             for face in data.get('card_faces', [])]
+    return (data.get('oracle_id'),
+            Printing.row_from_scryfall(data),
+            Card.row_from_scryfall(data),
+            faces)
+
+
+def write_rows(rows, chunk_size=5000, verbose=True):
+    """Writes rows from scryfall_rows to the database.
+
+    The rows are consumed in chunks of chunk_size, and each chunk is written
+    with one executemany insert per table in its own transaction, so memory
+    use does not grow with the size of the bulk data. Cards are deduplicated
+    by oracle_id as they are seen. The digests of the rows are written in
+    the same transactions, so that a later sync_rows compares against this
+    load.
+
+    Returns:
+        int: The number of printings written.
+
+    """
+    Digest.__table__.create(database.engine, checkfirst=True)
+    statements = _insert_statements(printings='OR IGNORE')
+    # Digests are kept or replaced as the rows they describe are.
+    statements['card_digests'] = \
+        Digest.__table__.insert().prefix_with('OR REPLACE')
+    statements['printing_digests'] = \
+        Digest.__table__.insert().prefix_with('OR IGNORE')
+    seen_oracle_ids = set()
+    total = 0
+    start = time.perf_counter()
+    for chunk in util.chunked(rows, chunk_size):
+        table_rows = {table: [] for table in statements}
+        for oracle_id, printing, card, faces in chunk:
+            table_rows['printings'].append(printing)
+            table_rows['printing_digests'].append(
+                {'table': 'printings', 'key': printing['id'],
+                 'digest': Digest.of(printing)})
+            if oracle_id is None or oracle_id in seen_oracle_ids:
+                continue
+            seen_oracle_ids.add(oracle_id)
+            table_rows['cards'].append(card)
+            table_rows['faces'].extend(faces)
+            table_rows['card_digests'].append(
+                {'table': 'cards', 'key': oracle_id,
+                 'digest': Digest.of(card, faces)})
+        _execute_inserts(statements, table_rows)
+        total += len(chunk)
+        if verbose:
+            _report_progress(total, start)
+    if verbose:
+        print()
+    return total
+
+
+def sync_rows(rows, chunk_size=5000, verbose=True):
+    """Brings the database in line with rows from scryfall_rows.
+
+    Rows are compared against the content hashes stored in the digests table
+    by the previous sync, and only new or changed cards and printings are
+    written. Cards and printings that are no longer in the rows are deleted,
+    so rows must cover the complete bulk data.
+
+    Returns:
+        dict: For each of 'cards' and 'printings', a Counter of the number
+            of rows 'inserted', 'updated', 'deleted' and 'unchanged', and
+            under 'oracle_ids' the set of oracle_ids of the cards that were
+            written or deleted or whose printings were, for refreshing what
+            is derived from them.
+
+    """
+    Digest.__table__.create(database.engine, checkfirst=True)
+    statements = _insert_statements(printings='OR REPLACE')
+    statements['digests'] = \
+        Digest.__table__.insert().prefix_with('OR REPLACE')
+    known = {'cards': {}, 'printings': {}}
+    with database.engine.connect() as connection:
+        for table, key, digest in connection.execute(
+                Digest.__table__.select()):
+            known[table][key] = digest
+    delta = {table: Counter() for table in known}
+    seen = {table: set() for table in known}
+    oracle_ids = set()
+
+    def changed(table, key, *content):
+        """Returns the new digests row if content differs, else None."""
+        seen[table].add(key)
+        digest = Digest.of(*content)
+        old_digest = known[table].get(key)
+        if old_digest == digest:
+            delta[table]['unchanged'] += 1
+            return None
+        delta[table]['inserted' if old_digest is None else 'updated'] += 1
+        return {'table': table, 'key': key, 'digest': digest}
+
+    total = 0
+    start = time.perf_counter()
+    for chunk in util.chunked(rows, chunk_size):
+        table_rows = {table: [] for table in statements}
+        for oracle_id, printing, card, faces in chunk:
+            digest = changed('printings', printing['id'], printing)
+            if digest is not None:
+                table_rows['printings'].append(printing)
+                table_rows['digests'].append(digest)
+                oracle_ids.add(oracle_id)
+            if oracle_id is None or oracle_id in seen['cards']:
+                continue
+            digest = changed('cards', oracle_id, card, faces)
+            if digest is not None:
+                table_rows['cards'].append(card)
+                table_rows['faces'].extend(faces)
+                table_rows['digests'].append(digest)
+                oracle_ids.add(oracle_id)
+        _execute_inserts(statements, table_rows)
+        total += len(chunk)
+        if verbose:
+            _report_progress(total, start)
+    removed = {table: list(known[table].keys() - seen[table])
+               for table in known}
+    with database.engine.begin() as connection:
+        digests = Digest.__table__
+        for keys in util.chunked(removed['cards'], 500):
+            names = connection.execute(
+                select(Card.name).where(Card.oracle_id.in_(keys)))
+            face_names = [face for (name,) in names
+                          for face in Card._parse_faces(name)]
+            connection.execute(
+                Face.__table__.delete().where(Face.name.in_(face_names)))
+            connection.execute(
+                Card.__table__.delete().where(Card.oracle_id.in_(keys)))
+        oracle_ids.update(removed['cards'])
+        for keys in util.chunked(removed['printings'], 500):
+            oracle_ids.update(connection.execute(
+                select(Printing.oracle_id).where(Printing.id.in_(keys)))
+                .scalars())
+            connection.execute(
+                Printing.__table__.delete().where(Printing.id.in_(keys)))
+        for table, keys in removed.items():
+            for chunk in util.chunked(keys, 500):
+                connection.execute(
+                    digests.delete().where(digests.c.table == table)
+                                    .where(digests.c.key.in_(chunk)))
+    for table, keys in removed.items():
+        delta[table]['deleted'] = len(keys)
+    if verbose:
+        print()
+        for table, counts in delta.items():
+            print(f"{table}: {counts['inserted']} inserted, "
+                  f"{counts['updated']} updated, "
+                  f"{counts['deleted']} deleted, "
+                  f"{counts['unchanged']} unchanged")
+    oracle_ids.discard(None)
+    delta['oracle_ids'] = oracle_ids
+    return delta
+
+
+def _insert_statements(printings):
+    return {
+        'cards': Card.__table__.insert().prefix_with('OR REPLACE'),
+        'printings': Printing.__table__.insert().prefix_with(printings),
+        'faces': Face.__table__.insert().prefix_with('OR REPLACE'),
+    }
+
+
+def _execute_inserts(statements, table_rows):
+    with database.engine.begin() as connection:
+        for table, statement in statements.items():
+            if table_rows[table]:
+                connection.execute(statement, table_rows[table])
+
+
+def _report_progress(total, start):
+    rate = total / (time.perf_counter() - start)
+    print(f"\rLoaded {total} printings ({rate:.0f} rows/s)",
+          end='', flush=True)
@@ -0,0 +1,163 @@
+"""In-memory index over the names of every card in the game.
+
+Matching a card name against the full card pool is the hot path of
+Card.named, so rather than scanning a sorted list of names on every call the
+NameIndex precomputes three lookup structures once:
+
+    - a case-folded hash for exact matches,
+    - a sorted list of case-folded names for prefix (starting) matches,
+    - an inverted index from whitespace-delimited words to names for token
+      matches.
+
+The matchers return exactly what util.shortest_exact_match,
+util.shortest_starting_match and util.shortest_token_match return when given
+the sorted list of names: the shortest matching name, ties going to the name
+that sorts first.
+
+For input none of them match, such as misspelled names, fuzzy_match scores
+names with fuzzywuzzy's WRatio as process.extractOne does, but only the few
+names sharing the most character trigrams with the input, found with a
+fourth, inverted index from trigrams to names.
+
+    Typical usage example:
+
+    index = NameIndex(Card.all_names())
+    index.match("lightning bo")
+
+"""
+
+from bisect import bisect_left
+from collections import Counter, defaultdict
+import heapq
+from fuzzywuzzy import process, utils
+
+
+def _trigrams(s):
+    """Return the set of character trigrams of s, padded with spaces."""
+    padded = f"  {s} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _best(names):
+    """Return the shortest of names, ties broken alphabetically."""
+    return min(names, key=lambda name: (len(name), name), default=None)
+
+
+class NameIndex(object):
+    """Lookup structures for matching user input against card names.
+
+    Args:
+        names (Iterable[str]): Names of every card in the game.
+
+    """
+
+    def __init__(self, names):
+        self.names = sorted(set(names))
+        self._exact = defaultdict(list)
+        self._words = defaultdict(set)
+        self._trigrams = defaultdict(list)
+        self._trigram_counts = []
+        for i, name in enumerate(self.names):
+            folded = name.casefold()
+            self._exact[folded].append(name)
+            for word in folded.split():
+                self._words[word].add(name)
+            trigrams = _trigrams(utils.full_process(name))
+            for trigram in trigrams:
+                self._trigrams[trigram].append(i)
+            self._trigram_counts.append(len(trigrams))
+        self._prefixes = sorted((name.casefold(), name) for name in self.names)
+        self._folded = [folded for folded, _ in self._prefixes]
+        self._vocabulary = sorted(self._words)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name.casefold() in self._exact
+
+    def exact_match(self, s):
+        """Return the shortest name equal to s up to case, if any."""
+        return _best(self._exact.get(s.casefold(), ()))
+
+    def starting_match(self, s):
+        """Return the shortest name starting with s up to case, if any."""
+        prefix = s.casefold()
+        start = bisect_left(self._folded, prefix)
+        matches = []
+        for folded, name in self._prefixes[start:]:
+            if not folded.startswith(prefix):
+                break
+            matches.append(name)
+        return _best(matches)
+
+    def token_match(self, s):
+        """Return the shortest name containing every token of s, if any.
+
+        As with util.shortest_token_match, a token only has to occur as a
+        substring of the name. Since tokens contain no whitespace, each one
+        must occur inside a single word of the name, so the candidates are
+        the names indexed under any word containing the token.
+
+        """
+        tokens = s.casefold().split()
+        if not tokens:
+            return _best(self.names)
+        candidates = None
+        for token in sorted(tokens, key=len, reverse=True):
+            names = set()
+            for word in self._vocabulary:
+                if token in word:
+                    names |= self._words[word]
+            candidates = names if candidates is None else candidates & names
+            if not candidates:
+                return None
+        return _best(candidates)
+
+    def match(self, s):
+        """Return the closest name to s using the exact, starting and token
+        matchers in turn, or None if none of them match."""
+        for matcher in (self.exact_match,
+                        self.starting_match,
+                        self.token_match):
+            name = matcher(s)
+            if name is not None:
+                return name
+        return None
+
+    def fuzzy_match(self, s, candidates=64):
+        """Return the name most similar to s by fuzzywuzzy's WRatio.
+
+        Gives the same result as process.extractOne(s, self.names) on
+        misspelled names, but only scores the candidates names sharing the
+        most trigrams with s (after WRatio's own preprocessing), rather
+        than every name. If s shares no trigram with any name, every name
+        is scored.
+
+        Args:
+            s (str): String to match.
+            candidates (int): Number of names to score.
+
+        Returns:
+            str: The best matching name, or None if there are no names.
+
+        """
+        trigrams = _trigrams(utils.full_process(s))
+        shared = Counter()
+        for trigram in trigrams:
+            shared.update(self._trigrams.get(trigram, ()))
+        if shared:
+            # WRatio also rewards either string occurring inside the other,
+            # so names are ranked by the fraction of the shorter string's
+            # trigrams they share. The candidates are then scored in the
+            # order of self.names, as extractOne would score them.
+            def overlap(item):
+                i, count = item
+                smaller = min(len(trigrams), self._trigram_counts[i])
+                return (-count / smaller, -count, i)
+            best = heapq.nsmallest(candidates, shared.items(), key=overlap)
+            choices = [self.names[i] for i in sorted(i for i, _ in best)]
+        else:
+            choices = self.names
+        match = process.extractOne(s, choices)
+        return match[0] if match is not None else None
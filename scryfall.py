@@ -6,39 +6,177 @@ For more information about Scryfall's API, see https://scryfall.com/docs/api
 
     scryfall.Request('/cards/search?color=U&cmc=3')
 
+For asyncio code, AsyncRequest and fetch_many make the same requests
+without blocking the event loop.
+
 """
 
 # from mtg import Card, Printing, Set
 from collections import deque
+import asyncio
 from datetime import datetime, timezone, date
+import json
 import os.path
+import re
 import requests
+import threading
 import time
 import urllib.parse
 import util
-import json
 
 
-# TODO: cache data
+class RateLimiter(object):
+    """Thread-safe token bucket rate limiter.
 
-class Request(object):
+    Tokens accumulate at rate per second up to burst. Each acquire call takes
+    one token, sleeping until one is available. Callers that arrive while
+    the bucket is empty reserve future tokens in turn, so waiting threads
+    are released one every 1/rate seconds.
 
-    last_request = datetime.fromordinal(1)
+    """
 
-    def __init__(self, uri):
-        api_url = 'https://api.scryfall.com'
-        self.url = urllib.parse.urljoin(api_url, uri)
-        timedelta = datetime.now() - Request.last_request
-        if timedelta.seconds < 0.1:
-            time.sleep(0.1 - timedelta.seconds)
+    def __init__(self, rate=10, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Client(object):
+    """HTTP client for the Scryfall API.
+
+    A client reuses pooled keep-alive connections through one
+    requests.Session, and every request it makes, from any thread, draws on
+    the same RateLimiter. Responses with a status in RETRY_STATUSES, and
+    connection errors, are retried up to retries times. The delay is the
+    response's Retry-After header if it has one, and otherwise doubles
+    from backoff seconds on each attempt.
+
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, rate=10, burst=1, retries=3, backoff=0.5,
+                 pool_size=10, timeout=30):
+        self.limiter = RateLimiter(rate, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size,
+                                                pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, headers=None):
+        """Makes a GET request, returning the requests.Response."""
+        return self.request('GET', url, headers=headers)
+
+    def request(self, method, url, **kwargs):
+        """Makes a request, retrying it if needed.
+
+        Raises:
+            Exception: With Scryfall's error details if the final response
+                is an error.
+
+        """
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            try:
+                response = self.session.request(method, url,
+                                                timeout=self.timeout,
+                                                **kwargs)
+            except requests.exceptions.ConnectionError:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            if response.status_code not in self.RETRY_STATUSES or \
+                    attempt == self.retries:
+                break
+            time.sleep(self._retry_delay(response, attempt))
         try:
-            self.request = requests.get(self.url)
-            self.request.raise_for_status()
+            response.raise_for_status()
         except requests.exceptions.HTTPError:
-            raise Exception(self.request.json()['details'])
-        finally:
-            Request.last_request = datetime.now()
-        self.data = parse(self.request.json())
+            try:
+                details = response.json()['details']
+            except (ValueError, KeyError):
+                details = f"{response.status_code} {response.reason}"
+            raise Exception(details)
+        return response
+
+    def _retry_delay(self, response, attempt):
+        try:
+            return float(response.headers['Retry-After'])
+        except (KeyError, ValueError):
+            return self.backoff * 2 ** attempt
+
+
+API_URL = 'https://api.scryfall.com'
+
+
+class Request(object):
+    """A GET request to the Scryfall API.
+
+    Requests are made through Request.client, which is shared by every
+    request. Set Request.cache to an httpcache.ResponseCache to serve
+    repeated requests from the cache.
+
+    """
+
+    client = Client()
+    cache = None
+
+    def __init__(self, uri):
+        self.url = urllib.parse.urljoin(API_URL, uri)
+        self.data = parse(json.loads(self.fetch(self.url)))
+
+    @classmethod
+    def fetch(cls, url):
+        """Returns the body of the response to a GET request for url."""
+        if cls.cache is not None:
+            return cls.cache.fetch(url, cls.client.get)
+        return cls.client.get(url).content
+
+
+class AsyncRequest(object):
+    """A GET request to the Scryfall API for use with asyncio.
+
+    Awaiting an AsyncRequest returns its data, with list objects returned as
+    AsyncPaginatedList. The request is made in the event loop's default
+    executor through Request.fetch, so it shares Request.client's rate
+    limit and Request.cache with synchronous requests.
+
+        Typical usage example:
+
+        cards = await scryfall.AsyncRequest('/cards/search?q=c:ur')
+        async for card in cards:
+            ...
+
+    """
+
+    def __init__(self, uri):
+        self.url = urllib.parse.urljoin(API_URL, uri)
+        self.data = None
+
+    def __await__(self):
+        return self._fetch().__await__()
+
+    async def _fetch(self):
+        self.data = async_parse(await _fetch_json(self.url))
+        return self.data
 
 
 class PaginatedList(object):
@@ -55,19 +193,142 @@ class PaginatedList(object):
     def __next__(self):
         if len(self.data) == 0:
             if self.has_more:
-                next_page_request = Request(self.next_page).data
-                self.__init__(next_page_request)
+                next_page = json.loads(Request.fetch(self.next_page))
+                self.__init__(next_page)
             else:
                 raise StopIteration
         return self.data.popleft()
 
 
+class AsyncPaginatedList(PaginatedList):
+    """Asynchronous iterator for list objects returned by Scryfall.
+
+    The next page is requested as soon as iteration starts on the current
+    one, so it downloads while the current page is consumed.
+
+    """
+
+    def __init__(self, scryfall_data):
+        super().__init__(scryfall_data)
+        self._next_page_task = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.has_more and self._next_page_task is None:
+            self._next_page_task = asyncio.ensure_future(
+                _fetch_json(self.next_page))
+        if len(self.data) == 0:
+            if self._next_page_task is None:
+                raise StopAsyncIteration
+            next_page = await self._next_page_task
+            self.__init__(next_page)
+            return await self.__anext__()
+        return self.data.popleft()
+
+    async def to_list(self):
+        """Returns every remaining element of the list."""
+        return [element async for element in self]
+
+
 def parse(data):
     if data["object"] == 'list':
         return PaginatedList(data)
     return data
 
 
+def async_parse(data):
+    if data["object"] == 'list':
+        return AsyncPaginatedList(data)
+    return data
+
+
+async def _fetch_json(url):
+    loop = asyncio.get_running_loop()
+    return json.loads(await loop.run_in_executor(None, Request.fetch, url))
+
+
+async def fetch_many(uris, concurrency=8):
+    """Requests many URIs concurrently.
+
+    At most concurrency requests are in flight at once, and all of them share
+    Request.client's rate limit.
+
+    Args:
+        uris (Iterable[str]): URIs to request.
+        concurrency (int): Maximum number of simultaneous requests.
+
+    Returns:
+        list: The data of each request, in the same order as uris.
+
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(uri):
+        async with semaphore:
+            return await AsyncRequest(uri)
+
+    return await asyncio.gather(*(fetch(uri) for uri in uris))
+
+
+async def fetch_cards(ids, concurrency=8):
+    """Requests the Scryfall card objects with the given Scryfall ids."""
+    return await fetch_many([f'cards/{id}' for id in ids], concurrency)
+
+
+# Most identifiers a single /cards/collection request may contain.
+COLLECTION_BATCH_SIZE = 75
+
+_UUID = re.compile(r'^[0-9a-f]{8}-([0-9a-f]{4}-){3}[0-9a-f]{12}$', re.I)
+
+
+def card_identifier(value):
+    """Converts value to a card identifier for /cards/collection.
+
+    Args:
+        value: A Scryfall id, a card name, a (set code, collector number)
+            pair, or an identifier dict, which is returned unchanged.
+
+    """
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, tuple):
+        set_code, collector_number = value
+        return {'set': set_code, 'collector_number': collector_number}
+    if _UUID.match(value):
+        return {'id': value}
+    return {'name': value}
+
+
+def collection(identifiers):
+    """Fetches many cards with the /cards/collection endpoint.
+
+    The identifiers are sent in batches of COLLECTION_BATCH_SIZE, so
+    fetching n cards takes n / 75 requests instead of n.
+
+    Args:
+        identifiers (Iterable): Values accepted by card_identifier.
+
+    Returns:
+        Tuple[List[dict], List[dict]]: The Scryfall card objects found and
+            the identifiers that matched no card.
+
+    """
+    url = urllib.parse.urljoin(API_URL, 'cards/collection')
+    cards = []
+    not_found = []
+    batches = util.chunked(map(card_identifier, identifiers),
+                           COLLECTION_BATCH_SIZE)
+    for batch in batches:
+        response = Request.client.request('POST', url,
+                                          json={'identifiers': batch})
+        data = response.json()
+        cards.extend(data['data'])
+        not_found.extend(data.get('not_found', []))
+    return cards, not_found
+
+
 def fetch_set_data(file_uri="data/sets.json"):
     sets = Request('sets').data
     pass
@@ -80,9 +341,10 @@ def get_bulk_data(data_type='default_cards', dest_uri="data"):
     # Check if bulk data has any changes from last download
     uri = data_to_get['permalink_uri']
     dest = os.path.join(dest_uri, uri.split('/')[-1])
-    last_dl = datetime.fromtimestamp(os.path.getmtime(dest), timezone.utc)
     last_update = datetime.fromisoformat(data_to_get['updated_at'])
-    if last_dl < last_update:
+    if not os.path.exists(dest) or \
+            datetime.fromtimestamp(os.path.getmtime(dest),
+                                   timezone.utc) < last_update:
         util.download(uri, dest_uri)
     return dest
 
@@ -124,15 +386,22 @@ def get_bulk_data(data_type='default_cards', dest_uri="data"):
 #     return util.restriction(data, col_names)
 
 
-def bulk_data_generator(path):
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line[0] == '{':
-                if line[-1] == ',':
-                    line = line[:-1]
-                try:
-                    yield parse(json.loads(line))
-                except json.decoder.JSONDecodeError:
-                    print(line)
-                    raise
+# Matches the comma between two card objects in a bulk data file. Scryfall
+# always writes the "object" key first, and this sequence cannot occur
+# inside a JSON string since its quotes are not escaped.
+CARD_BOUNDARY = re.compile(rb',\s*(?=\{\s*"object"\s*:\s*"card"\s*[,}])')
+
+
+def bulk_data_generator(path, fields=None):
+    """Yield the parsed objects of a Scryfall bulk data file.
+
+    Args:
+        path (str): Path to the bulk data file.
+        fields (Iterable[str]): If given, the only keys of each object to
+            keep. The 'object' key is always kept.
+
+    """
+    if fields is not None:
+        fields = set(fields) | {'object'}
+    for data in util.iter_json_array(path, fields=fields):
+        yield parse(data)
@@ -0,0 +1,328 @@
+"""Offline card search using Scryfall's search syntax.
+
+Queries are parsed into SQLAlchemy expressions over the cards, printings and
+sets tables, so they run against the local database instead of Scryfall's
+API. The supported subset of the syntax is:
+
+    - bare words and "quoted phrases", matched against the card name;
+    - keyword terms, such as c:ur, t:instant, o:"draw a card", cmc<=3 or
+      devotion:{B}{B}{B}
+      (see KEYWORDS for every keyword and its aliases);
+    - where the cards_fts index exists, bare words and the name, t and o
+      terms are matched against it as whole words, the last of which may
+      be the start of a longer word. Values with symbols such as {T}, or
+      without the index, match any text containing the value;
+    - negation with a leading -, e.g. -t:creature;
+    - "or" between terms, and parentheses for grouping. Terms next to each
+      other must all match, and bind tighter than "or".
+
+    Typical usage example:
+
+    for card in search.search('c:ur cmc<=3 t:instant o:"draw"'):
+        print(card.name)
+
+"""
+
+from collections import deque
+import re
+from sqlalchemy import (and_, cast, column, func, inspect, literal_column,
+                        not_, or_, select, table, Integer)
+from manacost import COLORS, ManaCost
+from mtg import Card, ColorSet, Printing, Set
+
+
+_TOKEN = re.compile(r'''
+    \s*(?:
+        (?P<open>\() |
+        (?P<close>\)) |
+        (?P<negate>-)(?=\S) |
+        (?P<keyword>[a-z]+)(?P<op>:|<=|>=|!=|=|<|>)
+            (?P<value>"[^"]*"|[^\s()]+) |
+        (?P<word>"[^"]*"|[^\s()]+)
+    )''', re.VERBOSE | re.IGNORECASE)
+
+_COMPARISONS = {
+    '=': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+}
+
+_RARITIES = {'c': 'common', 'u': 'uncommon', 'r': 'rare', 'm': 'mythic'}
+
+_CARDS_FTS = table('cards_fts', column('oracle_id'))
+
+# Columns of cards_fts searched by the text keywords.
+_FTS_COLUMNS = {'name': 'name', 't': 'type_line', 'o': 'oracle_text'}
+
+# Text values the index can match: words and the punctuation between them.
+# Symbols such as {T} or %, which its tokenizer drops, are left to LIKE.
+_FTS_VALUE = re.compile(r"[\s',.-]*(?:[^\W_][\s',.-]*)+")
+
+
+def _colors(value):
+    value = value.lower()
+    if value in ('c', 'colorless'):
+        return ColorSet()
+    try:
+        return ColorSet(value.upper())
+    except ValueError:
+        raise ValueError(f"Unknown colors {value!r}") from None
+
+
+def _color_term(column, value, op):
+    colors = _colors(value)
+    if op == ':':
+        op = '>='
+    if op == '>=' and not colors:
+        # Every card has a superset of no colors; c:c means colorless.
+        op = '='
+    return {'=': column == colors,
+            '!=': column != colors,
+            '>=': column.issuperset(colors),
+            '>': and_(column.issuperset(colors), column != colors),
+            '<=': column.issubset(colors),
+            '<': and_(column.issubset(colors), column != colors)}[op]
+
+
+def _numeric_term(column):
+    def term(value, op):
+        if op == ':':
+            op = '='
+        return _COMPARISONS[op](column, float(value))
+    return term
+
+
+def _text_term(column):
+    def term(value, op):
+        if op not in (':', '='):
+            raise ValueError(f"Can't compare text with {op}")
+        escaped = re.sub(r'([\\%_])', r'\\\1', value)
+        return column.like(f'%{escaped}%', escape='\\')
+    return term
+
+
+def _fts_term(fts_column, value, op):
+    if op not in (':', '='):
+        raise ValueError(f"Can't compare text with {op}")
+    phrase = '"' + value.replace('"', '""') + '"'
+    match = literal_column('cards_fts').op('MATCH')(
+        f'{fts_column} : {phrase}*')
+    return Card.oracle_id.in_(
+        select(_CARDS_FTS.c.oracle_id).where(match))
+
+
+def _printing_term(condition):
+    def term(value, op):
+        if op not in (':', '='):
+            raise ValueError(f"Can't compare with {op}")
+        return Card.printings.any(condition(value))
+    return term
+
+
+def _devotion_term(value, op):
+    if op == ':':
+        op = '>='
+    cost = ManaCost.parse(value)
+    clauses = [_COMPARISONS[op](Card.mana_symbols.devotion(color),
+                                cost.devotion(color))
+               for color in COLORS if cost.devotion(color)]
+    if not clauses:
+        raise ValueError(f"No colored mana symbols in {value!r}")
+    return and_(*clauses)
+
+
+def _year_term(value, op):
+    if op == ':':
+        op = '='
+    year = func.strftime('%Y', Set.release_date)
+    return Card.printings.any(
+        Printing.set.has(_COMPARISONS[op](year, str(int(value)))))
+
+
+# Maps each keyword to a function from the term's value and operator to a
+# SQLAlchemy expression over Card.
+KEYWORDS = {
+    'c': lambda value, op: _color_term(Card.colors, value, op),
+    'id': lambda value, op: _color_term(Card.color_identity, value,
+                                        '<=' if op == ':' else op),
+    'cmc': _numeric_term(Card.cmc),
+    'pow': _numeric_term(cast(Card.power, Integer)),
+    'tou': _numeric_term(cast(Card.toughness, Integer)),
+    'loy': _numeric_term(cast(Card.loyalty, Integer)),
+    't': _text_term(Card.type_line),
+    'o': _text_term(Card.oracle_text),
+    'name': _text_term(Card.name),
+    's': _printing_term(lambda v: Printing.set_code == v.lower()),
+    'r': _printing_term(lambda v: Printing.rarity ==
+                        _RARITIES.get(v.lower(), v.lower())),
+    'a': _printing_term(lambda v: Printing.artist.like(f'%{v}%')),
+    'st': _printing_term(lambda v: Printing.set.has(set_type=v.lower())),
+    'year': _year_term,
+    'devotion': _devotion_term,
+}
+
+ALIASES = {
+    'color': 'c', 'identity': 'id', 'ci': 'id', 'mv': 'cmc',
+    'manavalue': 'cmc', 'power': 'pow', 'toughness': 'tou',
+    'loyalty': 'loy', 'type': 't', 'oracle': 'o', 'set': 's', 'e': 's',
+    'edition': 's', 'rarity': 'r', 'artist': 'a', 'settype': 'st',
+}
+
+
+def fts_available(session):
+    """Returns whether the database of session has the cards_fts table."""
+    return inspect(session.connection()).has_table('cards_fts')
+
+
+def compile_query(query, fts=False):
+    """Compiles a Scryfall search query to a SQLAlchemy filter on Card.
+
+    Args:
+        query (str): Query in Scryfall's search syntax.
+        fts (bool): Whether to match text terms with the cards_fts index,
+            see fts_available. Defaults to matching them with LIKE.
+
+    Raises:
+        ValueError: If the query is malformed or uses an unsupported keyword.
+
+    """
+    tokens = deque(_tokenize(query))
+    if not tokens:
+        raise ValueError("Empty query")
+    expression = _parse_or(tokens, fts)
+    if tokens:
+        raise ValueError(f"Unexpected {tokens[0][1]!r} in query")
+    return expression
+
+
+def _tokenize(query):
+    pos = 0
+    query = query.strip()
+    while pos < len(query):
+        match = _TOKEN.match(query, pos)
+        pos = match.end()
+        if match['open']:
+            yield ('open', '(')
+        elif match['close']:
+            yield ('close', ')')
+        elif match['negate']:
+            yield ('negate', '-')
+        elif match['keyword']:
+            yield ('term', (match['keyword'].lower(), match['op'],
+                            match['value'].strip('"')))
+        elif match['word'].lower() == 'or':
+            yield ('or', 'or')
+        else:
+            yield ('term', ('name', ':', match['word'].strip('"')))
+
+
+def _parse_or(tokens, fts):
+    clauses = [_parse_and(tokens, fts)]
+    while tokens and tokens[0][0] == 'or':
+        tokens.popleft()
+        clauses.append(_parse_and(tokens, fts))
+    return or_(*clauses) if len(clauses) > 1 else clauses[0]
+
+
+def _parse_and(tokens, fts):
+    clauses = []
+    while tokens and tokens[0][0] not in ('or', 'close'):
+        clauses.append(_parse_unary(tokens, fts))
+    if not clauses:
+        raise ValueError("Expected a search term")
+    return and_(*clauses) if len(clauses) > 1 else clauses[0]
+
+
+def _parse_unary(tokens, fts):
+    kind, value = tokens.popleft()
+    if kind == 'negate':
+        return not_(_parse_unary(tokens, fts))
+    if kind == 'open':
+        expression = _parse_or(tokens, fts)
+        if not tokens or tokens.popleft()[0] != 'close':
+            raise ValueError("Unbalanced parentheses in query")
+        return expression
+    if kind == 'term':
+        keyword, op, term_value = value
+        keyword = ALIASES.get(keyword, keyword)
+        if keyword not in KEYWORDS:
+            raise ValueError(f"Unsupported keyword {keyword!r}")
+        if (fts and keyword in _FTS_COLUMNS
+                and _FTS_VALUE.fullmatch(term_value)):
+            return _fts_term(_FTS_COLUMNS[keyword], term_value, op)
+        return KEYWORDS[keyword](term_value, op)
+    raise ValueError(f"Unexpected {value!r} in query")
+
+
+class LocalPaginatedList(object):
+    """Iterator over the cards matching a query, fetched a page at a time.
+
+    Has the same interface as scryfall.PaginatedList. Pages are ordered by
+    card name, and each page is fetched when the previous one has been
+    consumed.
+
+    """
+
+    def __init__(self, expression, page_size=175, session=None,
+                 profile='card'):
+        self.expression = expression
+        self.page_size = page_size
+        self.session = session if session is not None else Card.session
+        self.profile = profile
+        self.data = deque()
+        self.has_more = True
+        self.next_page = None
+        self._fetch_page()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if len(self.data) == 0:
+            if self.has_more:
+                self._fetch_page()
+            if len(self.data) == 0:
+                raise StopIteration
+        return self.data.popleft()
+
+    def _fetch_page(self):
+        q = self.session.query(Card)\
+                        .options(*Card.load_options(self.profile))\
+                        .filter(self.expression)
+        if self.next_page is not None:
+            name, oracle_id = self.next_page
+            q = q.filter(or_(Card.name > name,
+                             and_(Card.name == name,
+                                  Card.oracle_id > oracle_id)))
+        cards = q.order_by(Card.name, Card.oracle_id)\
+                 .limit(self.page_size + 1).all()
+        self.has_more = len(cards) > self.page_size
+        cards = cards[:self.page_size]
+        self.data = deque(cards)
+        if cards:
+            self.next_page = (cards[-1].name, cards[-1].oracle_id)
+
+
+def search(query, page_size=175, session=None, profile='card', fts=None):
+    """Searches the local database with a Scryfall search query.
+
+    Args:
+        query (str): Query in Scryfall's search syntax.
+        page_size (int): Number of cards fetched per query.
+        session (Session): Session to query with. Defaults to Card.session.
+        profile (str): Loading profile, see Card.load_options.
+        fts (bool): Whether to match text terms with the cards_fts index.
+            Defaults to using it if the database has it.
+
+    Returns:
+        LocalPaginatedList: The matching cards, ordered by name.
+
+    """
+    session = session if session is not None else Card.session
+    if fts is None:
+        fts = fts_available(session)
+    return LocalPaginatedList(compile_query(query, fts), page_size=page_size,
+                              session=session, profile=profile)
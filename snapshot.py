@@ -0,0 +1,256 @@
+"""Read-only columnar snapshot of the card database for analytics.
+
+The cards, printings and sets tables are materialized as one NumPy array
+per column and saved as .npy files, which Snapshot.load memory-maps rather
+than reads, so loading is zero-copy and whole-pool aggregations run on
+arrays instead of ORM objects. Requires NumPy.
+
+Numeric columns are stored as numbers, colors and mana costs as their
+ColorSet bitmasks and packed ManaCosts, unique strings (ids and names) as
+fixed-width string arrays and repetitive strings (type lines, rarities, set
+types) dictionary-encoded: an array of integer codes indexing into a
+vocabulary list.
+
+    Typical usage example:
+
+    snap = snapshot.Snapshot.load()
+    creatures = snap.type_contains("Creature")
+    snap.cmc_curve(creatures)
+
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from sqlalchemy import select
+import const
+import database
+import manacost
+from manacost import ManaCost
+from mtg import Card, ColorSet, Printing, Set
+
+
+SNAPSHOT_DIR = os.path.join(const.DATA_DIR, "snapshot")
+
+# Columns of each table in the snapshot, with how each is stored: a NumPy
+# dtype, 'str' for fixed-width strings or 'dict' for dictionary encoding.
+COLUMNS = {
+    'cards': {'oracle_id': 'str', 'name': 'str', 'cmc': np.float32,
+              'colors': np.uint8, 'color_identity': np.uint8,
+              'mana_symbols': np.int64, 'type_line': 'dict'},
+    'printings': {'id': 'str', 'card': np.int32, 'set': np.int32,
+                  'rarity': 'dict'},
+    'sets': {'code': 'str', 'name': 'str', 'release_date': 'datetime64[D]',
+             'set_type': 'dict'},
+}
+
+class Table(object):
+    """Columns of one table of a snapshot.
+
+    Attributes:
+        columns (Dict[str, numpy.ndarray]): The arrays of the table, by
+            column name. Dictionary-encoded columns hold the codes.
+        vocabularies (Dict[str, List[str]]): Values of each
+            dictionary-encoded column, indexed by code.
+
+    """
+
+    def __init__(self, columns, vocabularies):
+        self.columns = columns
+        self.vocabularies = vocabularies
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def __len__(self):
+        return len(next(iter(self.columns.values())))
+
+    def decode(self, column):
+        """Returns a dictionary-encoded column as an array of strings."""
+        vocabulary = np.array(self.vocabularies[column], dtype=str)
+        return vocabulary[self.columns[column]]
+
+    def where(self, column, predicate):
+        """Returns a boolean mask of the rows whose value of a
+        dictionary-encoded column satisfies predicate.
+
+        The predicate runs once per distinct value rather than once per row.
+
+        """
+        matches = np.array([bool(predicate(value))
+                            for value in self.vocabularies[column]])
+        if len(matches) == 0:
+            return np.zeros(len(self), dtype=bool)
+        return matches[self.columns[column]]
+
+
+class Snapshot(object):
+    """Columnar snapshot of the cards, printings and sets tables.
+
+    Printings reference their card and set by row number in the cards and
+    sets tables, in the 'card' and 'set' columns.
+
+    """
+
+    def __init__(self, cards, printings, sets):
+        self.cards = cards
+        self.printings = printings
+        self.sets = sets
+
+    @classmethod
+    def load(cls, path=SNAPSHOT_DIR, mmap=True):
+        """Loads a snapshot written by build, memory-mapping its arrays."""
+        with open(os.path.join(path, "vocabularies.json")) as f:
+            vocabularies = json.load(f)
+        tables = {}
+        for table, columns in COLUMNS.items():
+            arrays = {column: np.load(os.path.join(path,
+                                                   f"{table}.{column}.npy"),
+                                      mmap_mode='r' if mmap else None)
+                      for column in columns}
+            tables[table] = Table(arrays, vocabularies[table])
+        return cls(**tables)
+
+    def type_contains(self, text):
+        """Returns a mask of the cards whose type line contains text."""
+        return self.cards.where('type_line', lambda t: text in t)
+
+    def colors_within(self, colors, identity=False):
+        """Returns a mask of the cards whose colors, or color identity if
+        identity is true, are a subset of colors."""
+        column = self.cards['color_identity' if identity else 'colors']
+        outside = ColorSet.ALL.mask & ~ColorSet(colors).mask
+        return (column & outside) == 0
+
+    def devotion(self, color):
+        """Returns each card's number of mana symbols of color, a Color or
+        letter (see ManaCost)."""
+        field = ManaCost._fields.index(getattr(color, 'value', color).lower())
+        width = manacost.WIDTHS[field]
+        return (self.cards['mana_symbols'] >> manacost.SHIFTS[field]) \
+            & ((1 << width) - 1)
+
+    def cmc_curve(self, mask=None):
+        """Returns the number of cards at each whole cmc, index 0 upwards.
+
+        Args:
+            mask (numpy.ndarray): Boolean mask of the cards to count.
+                Defaults to every card.
+
+        """
+        cmc = self.cards['cmc']
+        if mask is not None:
+            cmc = cmc[mask]
+        return np.bincount(np.nan_to_num(cmc).astype(np.int64))
+
+    def color_counts(self, mask=None, identity=False):
+        """Returns the number of cards including each color.
+
+        Returns:
+            Dict[Color, int]: Count of cards of each color. Multicolored
+                cards count towards each of their colors.
+
+        """
+        column = self.cards['color_identity' if identity else 'colors']
+        if mask is not None:
+            column = column[mask]
+        return {color: int(np.count_nonzero(column & bit))
+                for color, bit in ColorSet.BITS.items()}
+
+    def rarity_by_set(self):
+        """Returns the number of printings of each rarity in each set.
+
+        Returns:
+            numpy.ndarray: Array of shape (number of sets, number of
+                rarities), with rows in the order of the sets table and
+                columns in the order of printings.vocabularies['rarity'].
+
+        """
+        n_rarities = len(self.printings.vocabularies['rarity'])
+        index = self.printings['set'].astype(np.int64) * n_rarities \
+            + self.printings['rarity']
+        counts = np.bincount(index, minlength=len(self.sets) * n_rarities)
+        return counts.reshape(len(self.sets), n_rarities)
+
+
+def build(path=SNAPSHOT_DIR, bind=None):
+    """Writes a snapshot of the database to the directory path.
+
+    The snapshot is written to a temporary directory first and then moved
+    into place, so readers never see a partial snapshot. A previous
+    snapshot at path is renamed aside and only deleted once the new one is
+    in place; arrays already memory-mapped from it stay readable.
+
+    """
+    bind = bind or database.engine
+    with bind.connect() as connection:
+        cards = connection.execute(select(
+            Card.oracle_id, Card.name, Card.cmc, Card.colors,
+            Card.color_identity, Card.mana_symbols, Card.type_line)
+            .order_by(Card.oracle_id)).all()
+        sets = connection.execute(select(
+            Set.code, Set.name, Set.release_date, Set.set_type)
+            .order_by(Set.release_date, Set.code)).all()
+        printings = connection.execute(select(
+            Printing.id, Printing.oracle_id, Printing.set_code,
+            Printing.rarity).order_by(Printing.id)).all()
+    card_rows = {card.oracle_id: i for i, card in enumerate(cards)}
+    set_rows = {s.code: i for i, s in enumerate(sets)}
+    printings = [p for p in printings
+                 if p.oracle_id in card_rows and p.set_code in set_rows]
+    values = {
+        'cards': {'oracle_id': [c.oracle_id for c in cards],
+                  'name': [c.name for c in cards],
+                  'cmc': [c.cmc if c.cmc is not None else np.nan
+                          for c in cards],
+                  'colors': [c.colors.mask for c in cards],
+                  'color_identity': [c.color_identity.mask for c in cards],
+                  'mana_symbols': [c.mana_symbols.packed
+                                   if c.mana_symbols is not None else 0
+                                   for c in cards],
+                  'type_line': [c.type_line for c in cards]},
+        'printings': {'id': [p.id for p in printings],
+                      'card': [card_rows[p.oracle_id] for p in printings],
+                      'set': [set_rows[p.set_code] for p in printings],
+                      'rarity': [p.rarity for p in printings]},
+        'sets': {'code': [s.code for s in sets],
+                 'name': [s.name for s in sets],
+                 'release_date': [s.release_date for s in sets],
+                 'set_type': [s.set_type for s in sets]},
+    }
+    vocabularies = {table: {} for table in COLUMNS}
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent)
+    for table, columns in COLUMNS.items():
+        for column, kind in columns.items():
+            data = values[table][column]
+            if kind == 'dict':
+                array, vocabulary = _dictionary_encode(data)
+                vocabularies[table][column] = vocabulary
+            elif kind == 'str':
+                array = np.array(data, dtype=str)
+            else:
+                array = np.array(data, dtype=kind)
+            np.save(os.path.join(staging, f"{table}.{column}.npy"), array)
+    with open(os.path.join(staging, "vocabularies.json"), "w") as f:
+        json.dump(vocabularies, f)
+    # The old snapshot is moved aside rather than deleted first, so the
+    # path is only missing between two renames.
+    retired = None
+    if os.path.isdir(path):
+        retired = staging + ".old"
+        os.rename(path, retired)
+    os.rename(staging, path)
+    if retired is not None:
+        shutil.rmtree(retired)
+
+
+def _dictionary_encode(data):
+    vocabulary = sorted(set(value or '' for value in data))
+    codes = {value: i for i, value in enumerate(vocabulary)}
+    dtype = np.uint8 if len(vocabulary) <= 256 else np.int32
+    return np.array([codes[value or ''] for value in data],
+                    dtype=dtype), vocabulary
@@ -0,0 +1,45 @@
+import os.path
+import tempfile
+import unittest
+from sqlalchemy import create_engine
+import database
+import mtg
+from database import Base
+from mtg import Card, CardCache
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Test case with an empty database file, with every table created, in
+    self.engine.
+
+    Call use_database in setUp to make the module Session and card cache,
+    which Card.named and the other lookups use by default, read from it.
+    Both are restored after the test.
+
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "cards.db")
+        self.engine = create_engine(f"sqlite:///{self.path}",
+                                    connect_args={'check_same_thread': False})
+        self.addCleanup(self.engine.dispose)
+        Base.metadata.create_all(self.engine)
+
+    def use_database(self, cache=None):
+        """Points database.Session at self.engine and replaces mtg.cache
+        with cache, or an empty CardCache."""
+        saved_cache = mtg.cache
+        database.Session.configure(bind=self.engine)
+        database.ScopedSession.remove()
+        mtg.cache = cache if cache is not None else CardCache()
+        Card.invalidate_name_index()
+        self.addCleanup(self._restore, saved_cache)
+
+    @staticmethod
+    def _restore(saved_cache):
+        database.ScopedSession.remove()
+        database.Session.configure(bind=database.engine)
+        mtg.cache = saved_cache
+        Card.invalidate_name_index()
@@ -0,0 +1,82 @@
+import unittest
+from mtg import Card, Color, ColorSet, Decklist
+
+try:
+    import analytics
+except ImportError:
+    analytics = None
+
+
+def card(oracle_id, name, cmc, mana_cost, identity, type_line):
+    return Card(oracle_id=oracle_id, name=name, cmc=cmc, mana_cost=mana_cost,
+                colors=identity, color_identity=identity,
+                type_line=type_line)
+
+
+BOLT = card("1", "Lightning Bolt", 1, "{R}", "R", "Instant")
+HELIX = card("2", "Lightning Helix", 2, "{R}{W}", "RW", "Instant")
+MOUNTAIN = card("3", "Mountain", 0, "", "", "Basic Land — Mountain")
+KITCHEN = card("4", "Kitchen Finks", 3, "{1}{G/W}{G/W}", "GW",
+               "Creature — Ouphe")
+EMRAKUL = card("5", "Emrakul, the Aeons Torn", 15, "{15}", "",
+               "Legendary Creature — Eldrazi")
+FIRE = card("6", "Fire // Ice", 4, "{1}{R} // {1}{U}", "UR",
+            "Instant // Instant")
+FORGE = card("7", "Dryad Arbor", 0, "", "G", "Land Creature — Forest Dryad")
+
+
+class TestDecklistStats(unittest.TestCase):
+
+    def setUp(self):
+        self.deck = Decklist({BOLT: 4, HELIX: 2, MOUNTAIN: 10, KITCHEN: 3,
+                              EMRAKUL: 1},
+                             {FIRE: 2})
+
+    def test_stats(self):
+        stats = self.deck.stats()
+        self.assertEqual(stats.curve, {1: 4, 2: 2, 3: 3, 7: 1})
+        self.assertEqual(stats.pips, {Color.RED: 6, Color.WHITE: 8,
+                                      Color.GREEN: 6})
+        self.assertEqual(stats.types, {'Instant': 6, 'Land': 10,
+                                       'Creature': 4})
+        self.assertEqual(stats.color_identity, ColorSet("WUBRG") - {"B"})
+        self.assertEqual(stats.land_ratio, 0.5)
+
+    def test_split_and_land_creature(self):
+        self.assertEqual(FIRE.pips(), {Color.RED: 1, Color.BLUE: 1})
+        self.assertEqual(FORGE.card_types(), {'Land', 'Creature'})
+        stats = Decklist({FORGE: 1}).stats()
+        self.assertEqual(stats.curve, {})
+        self.assertEqual(stats.land_ratio, 1.0)
+
+    def test_empty(self):
+        stats = Decklist().stats()
+        self.assertEqual(stats.land_ratio, 0.0)
+        self.assertEqual(stats.color_identity, ColorSet())
+
+
+@unittest.skipIf(analytics is None, "NumPy is not installed")
+class TestBatchStats(unittest.TestCase):
+
+    def test_matches_decklist_stats(self):
+        decklists = [Decklist({BOLT: 4, HELIX: 2, MOUNTAIN: 10, KITCHEN: 3,
+                               EMRAKUL: 1}, {FIRE: 2}),
+                     Decklist(),
+                     Decklist({}, {KITCHEN: 1}),
+                     Decklist({FORGE: 1, FIRE: 3, BOLT: 1})]
+        stats = analytics.batch_stats(decklists)
+        self.assertEqual(stats.curve.shape, (4, 8))
+        for i, decklist in enumerate(decklists):
+            self.assertEqual(stats.deck(i), decklist.stats())
+
+    def test_reuses_features(self):
+        features = analytics.CardFeatures()
+        analytics.batch_stats([Decklist({BOLT: 1})], features)
+        stats = analytics.batch_stats([Decklist({BOLT: 2, HELIX: 1})],
+                                      features)
+        self.assertEqual(len(features.index), 2)
+        self.assertEqual(stats.pips[0].tolist(), [1, 0, 0, 3, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
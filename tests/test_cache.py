@@ -0,0 +1,113 @@
+import unittest
+from datetime import date
+from sqlalchemy import event, select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm.exc import DetachedInstanceError
+import mtg
+from mtg import Card, CardCache, Printing, Set
+from support import DatabaseTestCase
+
+
+class TestCardCache(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.engine.begin() as connection:
+            connection.execute(Card.__table__.insert(), [
+                {"oracle_id": "1", "name": "Opt", "color_identity": ["U"],
+                 "type_line": "Instant"},
+                {"oracle_id": "2", "name": "Shock", "color_identity": ["R"],
+                 "type_line": "Instant"}])
+            connection.execute(Set.__table__.insert(), [
+                {"id": "a", "code": "xln", "name": "Ixalan",
+                 "set_type": "expansion", "release_date": date(2017, 9, 29)},
+                {"id": "b", "code": "m19", "name": "Core Set 2019",
+                 "set_type": "core", "release_date": date(2018, 7, 13)}])
+            connection.execute(Printing.__table__.insert(), [
+                {"id": "p1", "oracle_id": "1", "set_code": "xln",
+                 "collector_number": "65"},
+                {"id": "p2", "oracle_id": "2", "set_code": "m19",
+                 "collector_number": "156"}])
+        self.use_database(CardCache(maxsize=2))
+
+    def test_named_cached(self):
+        opt = Card.named("Opt", exact=True)
+        self.assertIs(Card.named("Opt", exact=True), opt)
+        stats = mtg.cache.stats()['cards']
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']),
+                         (1, 1, 1))
+        self.assertIsNone(Card.named("Black Lotus", exact=True))
+
+    def test_detached_snapshot(self):
+        opt = Card.named("Opt", exact=True, profile='printings')
+        self.assertNotIn(opt, Card.session)
+        self.assertEqual(opt.representative().set.code, "xln")
+        self.assertIs(opt.printings[0].card, opt)
+        with self.assertRaises(AttributeError):
+            opt.name = "Shock"
+        with self.assertRaises(AttributeError):
+            opt.printings[0].set.name = "Rivals of Ixalan"
+
+    def test_profiles(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+        strict = Card.named("Opt", exact=True, profile='strict')
+        self.assertEqual(len(statements), 1)
+        with self.assertRaises(InvalidRequestError):
+            strict.printings
+        opt = Card.named("Opt", exact=True)
+        self.assertEqual(len(statements), 2)
+        self.assertNotIn(opt, Card.session)
+        with self.assertRaises(DetachedInstanceError):
+            opt.printings
+        self.assertIs(Card.named("Opt", exact=True), opt)
+        self.assertIs(Card.named("Opt", exact=True, profile='strict'),
+                      strict)
+        self.assertEqual(len(statements), 2)
+
+    def test_immutable(self):
+        opt = Card.named("Opt", exact=True)
+        with self.assertRaises(AttributeError):
+            opt.oracle_text = "hacked"
+        Card.session.commit()
+        with self.engine.connect() as connection:
+            self.assertIsNone(connection.execute(
+                select(Card.oracle_text).where(Card.oracle_id == "1"))
+                .scalar())
+        self.assertIsNone(Card.named("Opt", exact=True).oracle_text)
+
+    def test_named_many(self):
+        opt = Card.named("Opt", exact=True)
+        cards = Card.named_many(["Shock", "Opt", "Shock"], exact=True)
+        self.assertIs(cards[1], opt)
+        self.assertEqual([card.name for card in cards],
+                         ["Shock", "Opt", "Shock"])
+
+    def test_set_and_printing(self):
+        self.assertIs(Set.from_code("m19"), Set.from_code("m19"))
+        self.assertIsNone(Set.from_code("lea"))
+        shock = Printing.get("m19", "156")
+        self.assertIs(Printing.get("m19", "156"), shock)
+        self.assertEqual((shock.card.name, shock.set.name),
+                         ("Shock", "Core Set 2019"))
+        self.assertEqual([p.set.code for p in shock.card.printings],
+                         ["m19"])
+        with self.assertRaises(AttributeError):
+            shock.card.printings[0].rarity = "rare"
+
+    def test_bounded_and_cleared(self):
+        mtg.cache = CardCache(maxsize=1)
+        Card.named_many(["Opt", "Shock"], exact=True)
+        self.assertEqual(len(mtg.cache.cards), 1)
+        Set.from_code("xln")
+        Set.from_code("xln")
+        Set.from_code("m19")
+        self.assertEqual(mtg.cache.stats()['sets']['hit_rate'], 1 / 3)
+        mtg.cache.clear()
+        self.assertEqual(len(mtg.cache.cards), 0)
+        self.assertEqual(len(mtg.cache.sets), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from mtg import Card, Color
+from mtg import Card, Color, ColorSet
 import datetime
 
 
@@ -71,7 +71,7 @@ class TestCard(unittest.TestCase):
         self.assertEqual(type(self.skyknight.name), str)
         self.assertEqual(type(self.skyknight.cmc), float)
         self.assertEqual(type(self.skyknight.mana_cost), str)
-        self.assertEqual(type(self.skyknight.colors), set)
+        self.assertEqual(type(self.skyknight.colors), ColorSet)
 
 
 unittest.main()
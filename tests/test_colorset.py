@@ -0,0 +1,107 @@
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from database import Base
+from mtg import Card, Color, ColorSet
+
+
+class TestColorSet(unittest.TestCase):
+
+    def test_construction(self):
+        self.assertEqual(ColorSet("WU"), ColorSet([Color.WHITE, Color.BLUE]))
+        self.assertEqual(ColorSet("WU"), ColorSet(0b00011))
+        self.assertEqual(ColorSet(["U", "W"]).letters, "WU")
+        self.assertEqual(ColorSet().mask, 0)
+        with self.assertRaises(ValueError):
+            ColorSet("X")
+
+    def test_set_behaviour(self):
+        izzet = ColorSet("UR")
+        self.assertEqual(izzet, {Color.BLUE, Color.RED})
+        self.assertEqual(len(izzet), 2)
+        self.assertIn(Color.RED, izzet)
+        self.assertIn("U", izzet)
+        self.assertNotIn(Color.GREEN, izzet)
+        self.assertEqual(list(ColorSet("GRUBW")), list(Color))
+        self.assertFalse(ColorSet())
+        self.assertEqual(hash(izzet), hash(frozenset(izzet)))
+
+    def test_algebra(self):
+        a, b = ColorSet("WUB"), ColorSet("BR")
+        self.assertEqual(a | b, ColorSet("WUBR"))
+        self.assertEqual(a & b, ColorSet("B"))
+        self.assertEqual(a - b, ColorSet("WU"))
+        self.assertEqual(a ^ b, ColorSet("WUR"))
+        self.assertEqual(set() | a, a)
+        self.assertEqual({Color.RED} - a, ColorSet("R"))
+        self.assertTrue(ColorSet("WU") <= a)
+        self.assertTrue(ColorSet("WU") < a)
+        self.assertFalse(a < a)
+        self.assertTrue(a >= {Color.BLACK})
+        self.assertTrue(a.isdisjoint("RG"))
+
+    def test_equality(self):
+        self.assertNotEqual(ColorSet(), "hello")
+        self.assertNotEqual(ColorSet("R"), "R")
+        self.assertNotEqual(ColorSet("R"), ["R"])
+        self.assertNotEqual(ColorSet("R"), {"R"})
+        self.assertNotEqual(ColorSet("W"), {"x"})
+        self.assertIn(ColorSet(), ["x", ColorSet()])
+        self.assertNotIn("R", {ColorSet("R")})
+        self.assertIn(frozenset({Color.RED}), {ColorSet("R")})
+        with self.assertRaises(TypeError):
+            ColorSet("W") <= "WU"
+        self.assertTrue(ColorSet("W").issubset("WU"))
+
+    def test_immutable(self):
+        with self.assertRaises(AttributeError):
+            ColorSet("W").mask = 3
+
+    def test_pickle(self):
+        import pickle
+        self.assertEqual(pickle.loads(pickle.dumps(ColorSet("BG"))),
+                         ColorSet("BG"))
+
+
+class TestColorColumns(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        identities = {"1": "W", "2": "WU", "3": "UB", "4": "", "5": "WUBRG"}
+        with self.engine.begin() as connection:
+            connection.execute(Card.__table__.insert(), [
+                {"oracle_id": oracle_id, "name": oracle_id,
+                 "type_line": "Instant", "colors": list(identity),
+                 "color_identity": identity}
+                for oracle_id, identity in identities.items()])
+        self.session = Session(bind=self.engine)
+
+    def tearDown(self):
+        self.session.close()
+
+    def find(self, expression):
+        q = self.session.query(Card.oracle_id).filter(expression)
+        return sorted(oracle_id for oracle_id, in q)
+
+    def test_round_trip(self):
+        card = self.session.get(Card, "2")
+        self.assertEqual(card.color_identity, ColorSet("WU"))
+        self.assertEqual(card.colors, {Color.WHITE, Color.BLUE})
+
+    def test_predicates(self):
+        identity = Card.color_identity
+        self.assertEqual(self.find(identity.issubset("WUB")),
+                         ["1", "2", "3", "4"])
+        self.assertEqual(self.find(identity.issuperset("U")), ["2", "3", "5"])
+        self.assertEqual(self.find(identity.isdisjoint("W")), ["3", "4"])
+        self.assertEqual(self.find(identity == ColorSet("WU")), ["2"])
+
+    def test_validates_assignment(self):
+        card = Card(colors=["R"], color_identity=None)
+        self.assertEqual(card.colors, ColorSet("R"))
+        self.assertEqual(card.color_identity, ColorSet())
+
+
+if __name__ == "__main__":
+    unittest.main()
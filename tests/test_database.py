@@ -0,0 +1,54 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import database
+import mtg
+from mtg import Card, CardCache
+from support import DatabaseTestCase
+
+
+class TestScopedSession(unittest.TestCase):
+
+    def test_session_per_thread(self):
+        sessions = []
+
+        def record():
+            session = database.ScopedSession()
+            if database.ScopedSession() is session:
+                sessions.append(session)
+            database.ScopedSession.remove()
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(map(id, sessions))), 4)
+        self.assertIs(Card.session, database.ScopedSession)
+
+
+class TestConcurrentLookups(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.engine.begin() as connection:
+            connection.execute(Card.__table__.insert(), [
+                {"oracle_id": str(i), "name": f"Card {i}",
+                 "color_identity": [], "type_line": "Artifact"}
+                for i in range(200)])
+        self.use_database(CardCache(maxsize=100))
+
+    def test_threads(self):
+        names = [f"Card {i % 200}" for i in range(2000)]
+
+        def look_up(name):
+            return Card.named(name, exact=True).oracle_id
+
+        with ThreadPoolExecutor(8) as pool:
+            oracle_ids = list(pool.map(look_up, names))
+        self.assertEqual(oracle_ids, [str(i % 200) for i in range(2000)])
+        self.assertLessEqual(len(mtg.cache.cards), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from mtg import Card, Decklist
+from support import DatabaseTestCase
+
+
+ARENA = """Deck
+4 Opt (XLN) 65
+2 Shock (M19) 156
+
+Sideboard
+3 Negate (M19) 69
+"""
+
+
+class DecklistTestCase(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.engine.begin() as connection:
+            connection.execute(Card.__table__.insert(), [
+                {"oracle_id": str(i), "name": name, "color_identity": [],
+                 "type_line": "Instant"}
+                for i, name in enumerate(("Opt", "Shock", "Negate"))])
+        self.use_database()
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda *args: self.statements.append(args[2]))
+
+
+class TestNamedMany(DecklistTestCase):
+
+    def test_one_query(self):
+        with Session(bind=self.engine) as session:
+            cards = Card.named_many(["Shock", "Opt", "Black Lotus", "Opt"],
+                                    exact=True, session=session)
+        self.assertEqual([card and card.name for card in cards],
+                         ["Shock", "Opt", None, "Opt"])
+        self.assertIs(cards[1], cards[3])
+        self.assertEqual(len(self.statements), 1)
+
+    def test_fuzzy(self):
+        Card.name_index()
+        self.statements.clear()
+        cards = Card.named_many(["opt", "Shok"])
+        self.assertEqual([card.name for card in cards], ["Opt", "Shock"])
+        self.assertEqual(len(self.statements), 1)
+
+
+class TestDecklistImport(DecklistTestCase):
+
+    def names(self, board):
+        return {card.name: quantity for card, quantity in board.items()}
+
+    def test_import_arena(self):
+        Card.name_index()
+        self.statements.clear()
+        deck = Decklist.import_arena(ARENA)
+        self.assertEqual(self.names(deck.mainboard), {"Opt": 4, "Shock": 2})
+        self.assertEqual(self.names(deck.sideboard), {"Negate": 3})
+        self.assertEqual(len(self.statements), 1)
+
+    def test_add_many(self):
+        deck = Decklist()
+        deck.add_many(main=[("opt", 4), ("Shock", 1)], side=[("Opt", 1)])
+        deck.add_many(main=[("Shock", 1)])
+        self.assertEqual(self.names(deck.mainboard), {"Opt": 4, "Shock": 2})
+        self.assertEqual(self.names(deck.sideboard), {"Opt": 1})
+        self.assertIs(next(iter(deck.sideboard)), Card.named("Opt"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpcache
+import scryfall
+
+
+class StubScryfall(BaseHTTPRequestHandler):
+    """Serves a fixed list object with an ETag, counting requests."""
+
+    etag = '"v1"'
+    requests = []
+
+    def do_GET(self):
+        StubScryfall.requests.append((self.path,
+                                      self.headers.get('If-None-Match')))
+        if self.headers.get('If-None-Match') == StubScryfall.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps({"object": "list", "has_more": False,
+                           "data": [{"object": "set", "code": "m20"}]})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', StubScryfall.etag)
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+class TestResponseCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubScryfall)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/sets"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubScryfall.requests = []
+        self.addCleanup(setattr, scryfall.Request, 'cache', None)
+
+    def fetch_codes(self):
+        return [s['code'] for s in scryfall.Request(self.url).data]
+
+    def check_cache(self, cache):
+        scryfall.Request.cache = cache
+        self.assertEqual(self.fetch_codes(), ["m20"])
+        self.assertEqual(self.fetch_codes(), ["m20"])
+        self.assertEqual(len(StubScryfall.requests), 1)
+        self.assertEqual(cache.stats(),
+                         {'hits': 1, 'revalidations': 0, 'misses': 1})
+        cache.ttl = 0
+        time.sleep(0.01)
+        self.assertEqual(self.fetch_codes(), ["m20"])
+        self.assertEqual(StubScryfall.requests[-1], ('/sets', '"v1"'))
+        self.assertEqual(cache.revalidations, 1)
+
+    def test_memory_cache(self):
+        self.check_cache(httpcache.MemoryCache())
+
+    def test_sqlite_cache(self):
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        self.check_cache(httpcache.SQLiteCache(path))
+
+    def test_lru_eviction(self):
+        cache = httpcache.MemoryCache(maxsize=1)
+        scryfall.Request.cache = cache
+        self.fetch_codes()
+        scryfall.Request(self.url + "?page=2")
+        self.fetch_codes()
+        self.assertEqual(cache.misses, 3)
+
+    def test_without_cache(self):
+        self.fetch_codes()
+        self.fetch_codes()
+        self.assertEqual(len(StubScryfall.requests), 2)
+
+
+class TestCounters(unittest.TestCase):
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            httpcache.ResponseCache()
+
+    def test_concurrent_hits(self):
+        cache = httpcache.MemoryCache()
+
+        class Response(object):
+            status_code = 200
+            content = b"{}"
+            headers = {}
+
+        cache.fetch("url", lambda url, headers: Response())
+
+        def fetch_many():
+            for _ in range(2000):
+                cache.fetch("url", None)
+
+        threads = [threading.Thread(target=fetch_many) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cache.stats(),
+                         {'hits': 16000, 'revalidations': 0, 'misses': 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import json
+import os.path
+import unittest
+from collections import Counter
+from sqlalchemy import select
+import database
+from database import Base
+from mtg import (Card, Digest, Face, Printing, load_cards,
+                 load_cards_parallel)
+from support import DatabaseTestCase
+
+
+def card_object(id_, oracle_id, name, set_code, faces=None):
+    data = {"object": "card", "id": id_, "oracle_id": oracle_id,
+            "name": name, "set": set_code, "collector_number": id_,
+            "rarity": "common", "type_line": "Instant", "mana_cost": "{R}",
+            "cmc": 1.0, "colors": ["R"], "color_identity": ["R"],
+            "oracle_text": f"{name} rules.",
+            "image_uris": {"normal": f"https://img/{id_}.jpg"}}
+    if faces:
+        data["card_faces"] = [{"object": "card_face", "name": face,
+                               "type_line": "Instant", "mana_cost": "{R}"}
+                              for face in faces]
+    return data
+
+
+def bulk_data():
+    """Two printings each of ten cards, a split card, a printing without
+    an oracle_id and a repeated printing id."""
+    objects = []
+    for i in range(10):
+        for set_code in ("aaa", "bbb"):
+            objects.append(card_object(f"{set_code}-{i}", f"o{i}",
+                                       f"Card {i}", set_code))
+    objects.append(card_object("aaa-fire", "o-fire", "Fire // Ice", "aaa",
+                               faces=["Fire", "Ice"]))
+    objects.append(card_object("aaa-back", None, "Reversible", "aaa"))
+    duplicate = card_object("aaa-0", "o0", "Card 0", "aaa")
+    duplicate["rarity"] = "rare"
+    objects.append(duplicate)
+    return objects
+
+
+class LoadTestCase(DatabaseTestCase):
+    """Points database.engine, which the loaders write through, at the test
+    database."""
+
+    def setUp(self):
+        super().setUp()
+        self.saved_engine = database.engine
+        database.engine = self.engine
+
+    def tearDown(self):
+        database.engine = self.saved_engine
+
+    def clear(self):
+        with self.engine.begin() as connection:
+            for table in reversed(Base.metadata.sorted_tables):
+                connection.execute(table.delete())
+
+    def contents(self):
+        with self.engine.connect() as connection:
+            return {table.name: sorted(tuple(row) for row in
+                                       connection.execute(table.select()))
+                    for table in (Card.__table__, Printing.__table__,
+                                  Face.__table__)}
+
+    def column(self, column):
+        with self.engine.connect() as connection:
+            return sorted(connection.execute(select(column)).scalars())
+
+
+class TestWriteRows(LoadTestCase):
+
+    def test_chunks(self):
+        bulk = bulk_data()
+        for chunk_size in (1, 3, 1000):
+            self.clear()
+            self.assertEqual(load_cards(iter(bulk), chunk_size=chunk_size,
+                                        verbose=False), len(bulk))
+            self.assertEqual(self.column(Card.oracle_id),
+                             sorted([f"o{i}" for i in range(10)]
+                                    + ["o-fire"]))
+            self.assertEqual(len(self.column(Printing.id)), 22)
+            self.assertEqual(self.column(Face.name), ["Fire", "Ice"])
+            with self.engine.connect() as connection:
+                rarity = connection.execute(
+                    select(Printing.rarity)
+                    .where(Printing.id == "aaa-0")).scalar()
+            # The first row of a printing id is kept.
+            self.assertEqual(rarity, "common")
+
+
+class TestLoadCardsParallel(LoadTestCase):
+
+    def test_matches_sequential(self):
+        bulk = bulk_data()
+        path = os.path.join(self.directory.name, "bulk.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(bulk, f, indent=2)
+        load_cards(iter(bulk), chunk_size=4, verbose=False)
+        expected = self.contents()
+        self.clear()
+        self.assertEqual(load_cards_parallel(path, 2, chunk_size=4,
+                                             verbose=False, range_size=500),
+                         len(bulk))
+        self.assertEqual(self.contents(), expected)
+
+
+class TestSyncRows(LoadTestCase):
+
+    def sync(self, bulk):
+        return load_cards(iter(bulk), chunk_size=4, verbose=False,
+                          incremental=True)
+
+    def assertDelta(self, delta, cards, printings):
+        self.assertEqual(delta["cards"], Counter(cards))
+        self.assertEqual(delta["printings"], Counter(printings))
+
+    def test_delta(self):
+        bulk = bulk_data()[:-1]
+        self.assertDelta(self.sync(bulk), {"inserted": 11}, {"inserted": 22})
+        delta = self.sync(bulk)
+        self.assertDelta(delta, {"unchanged": 11}, {"unchanged": 22})
+        self.assertEqual(delta["oracle_ids"], set())
+
+        for data in bulk:
+            if data["oracle_id"] == "o3":
+                data["oracle_text"] = "Errata."
+        bulk = [data for data in bulk
+                if data["id"] not in ("aaa-fire", "bbb-5")]
+        delta = self.sync(bulk)
+        self.assertDelta(delta, {"updated": 1, "unchanged": 9, "deleted": 1},
+                         {"unchanged": 20, "deleted": 2})
+        self.assertEqual(delta["oracle_ids"], {"o3", "o5", "o-fire"})
+        self.assertEqual(self.column(Card.oracle_id),
+                         sorted(f"o{i}" for i in range(10)))
+        printing_ids = self.column(Printing.id)
+        self.assertEqual(len(printing_ids), 20)
+        self.assertNotIn("bbb-5", printing_ids)
+        self.assertNotIn("aaa-fire", printing_ids)
+        self.assertEqual(self.column(Face.name), [])
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.execute(
+                select(Card.oracle_text).where(Card.oracle_id == "o3"))
+                .scalar(), "Errata.")
+        self.assertDelta(self.sync(bulk), {"unchanged": 10},
+                         {"unchanged": 20})
+
+    def test_full_load_then_sync(self):
+        bulk = bulk_data()[:-1]
+        load_cards(iter(bulk), chunk_size=4, verbose=False)
+        self.assertEqual(len(self.column(Digest.key)), 33)
+        delta = self.sync(bulk)
+        self.assertDelta(delta, {"unchanged": 11}, {"unchanged": 22})
+        self.assertEqual(delta["oracle_ids"], set())
+
+        bulk[0]["oracle_text"] = "Errata."
+        load_cards(iter(bulk), chunk_size=4, verbose=False)
+        bulk = [data for data in bulk if data["id"] != "bbb-9"]
+        self.assertDelta(self.sync(bulk), {"unchanged": 11},
+                         {"unchanged": 21, "deleted": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from datetime import date
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import Session
+from mtg import Card, Printing, Set
+from support import DatabaseTestCase
+
+
+class LoadOptionsTestCase(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.engine.begin() as connection:
+            connection.execute(Card.__table__.insert(), [
+                {"oracle_id": str(i), "name": name, "color_identity": [],
+                 "type_line": "Instant"}
+                for i, name in enumerate(("Opt", "Shock", "Negate"))])
+            connection.execute(Set.__table__.insert(), [
+                {"id": "a", "code": "xln", "name": "Ixalan",
+                 "set_type": "expansion", "release_date": date(2017, 9, 29)},
+                {"id": "b", "code": "m19", "name": "Core Set 2019",
+                 "set_type": "core", "release_date": date(2018, 7, 13)}])
+            connection.execute(Printing.__table__.insert(), [
+                {"id": "p0", "oracle_id": "0", "set_code": "xln",
+                 "collector_number": "65"},
+                {"id": "p1", "oracle_id": "0", "set_code": "m19",
+                 "collector_number": "65"},
+                {"id": "p2", "oracle_id": "1", "set_code": "m19",
+                 "collector_number": "156"}])
+        self.session = Session(bind=self.engine)
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda *args: self.statements.append(args[2]))
+
+    def tearDown(self):
+        self.session.close()
+
+
+class TestLoadOptions(LoadOptionsTestCase):
+
+    def named(self, name, profile):
+        return Card.named(name, exact=True, session=self.session,
+                          profile=profile)
+
+    def test_card(self):
+        opt = self.named("Opt", "card")
+        self.assertEqual(len(self.statements), 1)
+        self.assertEqual(len(opt.printings), 2)
+        self.assertEqual(len(self.statements), 2)
+
+    def test_printings(self):
+        opt = self.named("Opt", "printings")
+        queries = len(self.statements)
+        self.assertEqual(sorted(p.set.code for p in opt.printings),
+                         ["m19", "xln"])
+        self.assertEqual(len(self.statements), queries)
+
+    def test_strict(self):
+        opt = self.named("Opt", "strict")
+        with self.assertRaises(InvalidRequestError):
+            opt.printings
+        self.assertEqual(len(self.statements), 1)
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            self.named("Opt", "everything")
+
+
+if __name__ == "__main__":
+    unittest.main()
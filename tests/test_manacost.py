@@ -0,0 +1,99 @@
+import unittest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from database import Base
+from manacost import ManaCost
+from mtg import Card, Color, migrate_mana_symbols
+import search
+
+
+class TestManaCost(unittest.TestCase):
+
+    def test_parse(self):
+        cost = ManaCost.parse("{2}{W}{U/P}")
+        self.assertEqual((cost.generic, cost.w, cost.u, cost.phyrexian,
+                          cost.hybrid), (2, 1, 1, 1, 0))
+        cost = ManaCost.parse("{X}{2/B}{B/G}{C}{S}")
+        self.assertEqual((cost.x, cost.b, cost.g, cost.hybrid,
+                          cost.colorless, cost.snow), (1, 2, 1, 2, 1, 1))
+        self.assertEqual(ManaCost.parse("{1}{R} // {1}{U}").generic, 2)
+        self.assertEqual(ManaCost.parse(None), ManaCost.parse(""))
+        self.assertEqual(sum(ManaCost.parse("")), 0)
+
+    def test_devotion(self):
+        cost = ManaCost.parse("{B}{B}{B/G}")
+        self.assertEqual(cost.devotion('B'), 3)
+        self.assertEqual(cost.devotion(Color.GREEN), 1)
+
+    def test_pack(self):
+        for mana_cost in ("{2}{W}{U/P}", "{X}{X}{G}{G}", "{15}", "",
+                          "{W/U/P}{S}{C}"):
+            cost = ManaCost.parse(mana_cost)
+            self.assertEqual(ManaCost.unpack(cost.packed), cost)
+        self.assertEqual(ManaCost.unpack(
+            ManaCost.parse("{1000000}").packed).generic, 255)
+
+
+def scryfall_card(oracle_id, name, mana_cost, colors):
+    return {"oracle_id": oracle_id, "name": name, "mana_cost": mana_cost,
+            "colors": colors, "color_identity": colors,
+            "type_line": "Creature"}
+
+
+CARDS = [scryfall_card("1", "Gray Merchant of Asphodel", "{3}{B}{B}", ["B"]),
+         scryfall_card("2", "Gifted Aetherborn", "{B}{B}", ["B"]),
+         scryfall_card("3", "Dusk Legion Zealot", "{1}{B}", ["B"]),
+         scryfall_card("4", "Kitchen Finks", "{1}{G/W}{G/W}", ["G", "W"]),
+         scryfall_card("5", "Grim Lavamancer", "{R}", ["R"]),
+         scryfall_card("6", "Thoughtseize", "{B}", ["B"]),
+         scryfall_card("7", "Erebos, God of the Dead", "{3}{B}", ["B"]),
+         scryfall_card("8", "Gixian Puppeteer", "{4}{B}{B}{B}", ["B"])]
+
+
+class TestManaSymbolsColumn(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            connection.execute(Card.__table__.insert(),
+                               [Card.row_from_scryfall(c) for c in CARDS])
+        self.session = Session(bind=self.engine)
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_loaded(self):
+        finks = self.session.get(Card, "4")
+        self.assertEqual(finks.mana_symbols, ManaCost.parse("{1}{G/W}{G/W}"))
+        self.assertEqual(finks.pips(), {Color.GREEN: 2, Color.WHITE: 2})
+
+    def test_devotion_query(self):
+        cards = self.session.query(Card.name)\
+            .filter(Card.mana_symbols.devotion(Color.BLACK) >= 2)\
+            .order_by(Card.name).all()
+        self.assertEqual([name for name, in cards],
+                         ["Gifted Aetherborn", "Gixian Puppeteer",
+                          "Gray Merchant of Asphodel"])
+
+    def test_devotion_search(self):
+        names = [c.name for c in search.search("devotion:{B}{B}{B}",
+                                               session=self.session)]
+        self.assertEqual(names, ["Gixian Puppeteer"])
+        names = [c.name for c in search.search("devotion:{G/W}{G/W}",
+                                               session=self.session)]
+        self.assertEqual(names, ["Kitchen Finks"])
+        with self.assertRaises(ValueError):
+            search.compile_query("devotion:{2}")
+
+    def test_migrate(self):
+        with self.engine.begin() as connection:
+            connection.execute(text("ALTER TABLE cards "
+                                    "DROP COLUMN mana_symbols"))
+        migrate_mana_symbols(self.engine)
+        migrate_mana_symbols(self.engine)
+        self.test_devotion_query()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+from fuzzywuzzy import process
+import util
+from names import NameIndex
+
+
+NAMES = ["Lightning Bolt", "Lightning Helix", "Lightning Axe", "Fire // Ice",
+         "Ice Cage", "Thallid", "Thallid Germinator", "Thalia's Lancers",
+         "Chromium", "Chromium, the Mutable", "Shatter", "Shatterstorm",
+         "Giant Growth", "Jace Beleren", "Ugin, the Ineffable",
+         '"Ach! Hans, Run!"', "Bonecrusher Giant // Stomp", "Price of Fame"]
+
+CARD_POOL = NAMES + [
+    "Llanowar Elves", "Elvish Mystic", "Birds of Paradise", "Dark Ritual",
+    "Counterspell", "Brainstorm", "Ponder", "Preordain",
+    "Swords to Plowshares", "Path to Exile", "Wrath of God", "Damnation",
+    "Thoughtseize", "Tarmogoyf", "Snapcaster Mage",
+    "Delver of Secrets // Insectile Aberration",
+    "Liliana of the Veil", "Jace, the Mind Sculptor", "Force of Will",
+    "Serra Angel", "Shivan Dragon", "Sengir Vampire", "Llanowar Wastes",
+    "Mana Leak", "Remand", "Cryptic Command", "Mulldrifter", "Kitchen Finks",
+    "Siege Rhino", "Baneslayer Angel", "Thragtusk", "Primeval Titan",
+    "Grave Titan", "Sun Titan", "Inferno Titan", "Frost Titan",
+    "Emrakul, the Aeons Torn", "Ulamog, the Infinite Gyre", "Karn Liberated",
+    "Wurmcoil Engine", "Sol Ring", "Mana Crypt", "Black Lotus",
+    "Ancestral Recall", "Time Walk", "Demonic Tutor", "Vampiric Tutor",
+    "Sensei's Divining Top", "Scroll Rack", "Skullclamp", "Goblin Guide",
+    "Monastery Swiftspear", "Eidolon of the Great Revel", "Lava Spike",
+    "Rift Bolt", "Skewer the Critics", "Boros Charm", "Lightning Helix",
+    "Noble Hierarch", "Ignoble Hierarch", "Stoneforge Mystic",
+    "Batterskull", "Sword of Fire and Ice", "Sword of Feast and Famine",
+    "Dark Confidant", "Bloodghast", "Gravecrawler", "Vengevine",
+    "Griselbrand", "Elesh Norn, Grand Cenobite", "Craterhoof Behemoth",
+    "Avenger of Zendikar", "Scapeshift", "Valakut, the Molten Pinnacle",
+    "Urza's Tower", "Urza's Mine", "Urza's Power Plant", "Mox Opal",
+    "Arcbound Ravager", "Cranial Plating", "Ornithopter", "Memnite",
+]
+
+TYPOS = ["Lightnig Blot", "Tarmogyof", "Snapcster Mage", "Liliana of teh Veil",
+         "Jace the Mind Scultpor", "Froce of Will", "Sera Angle",
+         "Shivan Dargon", "Counterspel Mage", "Brainstrom", "Swrods",
+         "Wrath of Gdo", "Thoughtsieze", "Cryptic Comand", "Mulldrfiter",
+         "Kitchin Finks", "Baneslayr", "Primevel Titan", "Emrakul Aeon Torn",
+         "Ulamog Infinite Gyr", "Karn Liberaetd", "Wurmcoil Engin",
+         "Sensei Divining Top", "Goblin Giude", "Monastary Swiftspear",
+         "Eidolon of Great Revel", "Skewr the Critcs", "Nobel Hierarch",
+         "Stonforge Mystic", "Sword of Fire & Ice", "Dark Confidnt",
+         "Griselbrnd", "Elesh Norn Grand Cenobyte", "Craterhof Behemoth",
+         "Valakut Molten Pinacle", "Urzas Tower", "Arcbound Ravger",
+         "Cranial Platng", "Ornithoptor", "Bonecrusher Gaint", "Ach Hans Run",
+         "Chromium Mutable", "Ugin Ineffable", "Fire and Ice", "xyz"]
+
+
+class TestNameIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = NameIndex(NAMES)
+        self.names = sorted(NAMES)
+
+    def assertSameAsScan(self, query):
+        matchers = ((self.index.exact_match, util.shortest_exact_match),
+                    (self.index.starting_match, util.shortest_starting_match),
+                    (self.index.token_match, util.shortest_token_match))
+        for indexed, scan in matchers:
+            self.assertEqual(indexed(query), scan(query, self.names), query)
+
+    def test_agrees_with_linear_scan(self):
+        queries = ["Lightning Bolt", "lightning", "Lightning Bo", "Thal",
+                   "Fire", "Ice", "ice", "giaNT GrOwth", "chromium",
+                   "Ugin,", "the", '"Ach!', "t", "ant row", "zzz", ""]
+        for query in queries:
+            self.assertSameAsScan(query)
+
+    def test_match(self):
+        self.assertEqual(self.index.match("Shatter"), "Shatter")
+        self.assertEqual(self.index.match("Thal"), "Thallid")
+        self.assertEqual(self.index.match("Ice"), "Ice Cage")
+        self.assertEqual(self.index.match("Stomp"),
+                         "Bonecrusher Giant // Stomp")
+        self.assertIsNone(self.index.match("Black Lotus"))
+
+    def test_fuzzy_match_agrees_with_extract_one(self):
+        index = NameIndex(CARD_POOL)
+        for query in TYPOS:
+            self.assertEqual(index.fuzzy_match(query, candidates=16),
+                             process.extractOne(query, index.names)[0],
+                             query)
+
+    def test_fuzzy_match_without_shared_trigrams(self):
+        self.assertIn(self.index.fuzzy_match("?!"), NAMES)
+        self.assertIsNone(NameIndex([]).fuzzy_match("Opt"))
+
+    def test_contains(self):
+        self.assertIn("jace beleren", self.index)
+        self.assertNotIn("jace", self.index)
+
+
+if __name__ == "__main__":
+    unittest.main()
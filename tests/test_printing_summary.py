@@ -0,0 +1,213 @@
+import unittest
+from datetime import date
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from mtg import Card, Decklist, Printing, Set, add_missing_columns
+from support import DatabaseTestCase
+
+try:
+    import analytics
+except ImportError:
+    analytics = None
+
+
+SETS = [("lea", "core", date(1993, 8, 5)),
+        ("m10", "core", date(2009, 7, 17)),
+        ("sld", "box", date(2019, 12, 2)),
+        ("2xm", "masters", date(2020, 8, 7)),
+        ("2x2", "masters", date(2022, 7, 8))]
+
+PRINTINGS = [("bolt-lea", "1", "lea"), ("bolt-m10", "1", "m10"),
+             ("bolt-sld", "1", "sld"), ("bolt-2xm", "1", "2xm"),
+             ("bolt-2x2-b", "1", "2x2"), ("bolt-2x2-a", "1", "2x2"),
+             ("promo-sld", "2", "sld")]
+
+
+class PrintingsTestCase(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.engine.begin() as connection:
+            connection.execute(Card.__table__.insert(), [
+                {"oracle_id": oracle_id, "name": name,
+                 "color_identity": [], "type_line": "Instant"}
+                for oracle_id, name in (("1", "Lightning Bolt"),
+                                        ("2", "Promo Only"),
+                                        ("3", "Unprinted"))])
+            connection.execute(Set.__table__.insert(), [
+                {"id": code, "code": code, "name": code, "set_type": kind,
+                 "release_date": released} for code, kind, released in SETS])
+            connection.execute(Printing.__table__.insert(), [
+                {"id": id_, "oracle_id": oracle_id, "set_code": code,
+                 "image_uri": f"https://img/{id_}.jpg"}
+                for id_, oracle_id, code in PRINTINGS])
+        Card.refresh_printing_summary(self.engine)
+        self.session = Session(bind=self.engine)
+
+    def tearDown(self):
+        self.session.close()
+
+
+class TestPrintingSummary(PrintingsTestCase):
+
+    def test_summary(self):
+        bolt = self.session.get(Card, "1")
+        self.assertEqual(bolt.set_codes, {"lea", "m10", "sld", "2xm", "2x2"})
+        self.assertEqual(bolt.regular_set_codes,
+                         {"lea", "m10", "2xm", "2x2"})
+        self.assertEqual(bolt.first_printed, date(1993, 8, 5))
+        self.assertEqual(bolt.last_printed, date(2022, 7, 8))
+        unprinted = self.session.get(Card, "3")
+        self.assertEqual(unprinted.set_codes, frozenset())
+        self.assertIsNone(unprinted.representative_id)
+
+    def test_representative(self):
+        self.assertEqual(self.session.get(Card, "1").representative().id,
+                         "bolt-2x2-a")
+        self.assertEqual(self.session.get(Card, "2").representative().id,
+                         "promo-sld")
+
+    def test_no_printing_queries(self):
+        bolt = self.session.get(Card, "1")
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+        self.assertTrue(bolt.is_in_set("sld"))
+        self.assertFalse(bolt.is_in_set("m11"))
+        self.assertEqual(statements, [])
+        bolt.representative()
+        self.assertEqual(len(statements), 1)
+
+    def test_representatives(self):
+        cards = [self.session.get(Card, oracle_id)
+                 for oracle_id in ("1", "2", "3", "1")]
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+        printings = Card.representatives(cards, self.session)
+        self.assertEqual([p and p.id for p in printings],
+                         ["bolt-2x2-a", "promo-sld", None, "bolt-2x2-a"])
+        self.assertEqual(printings[0].set.code, "2x2")
+        self.assertEqual(len(statements), 1)
+
+    def test_image_uris(self):
+        bolt, promo = (self.session.get(Card, oracle_id)
+                       for oracle_id in ("1", "2"))
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+        self.assertEqual(Decklist({bolt: 4}, {promo: 1})
+                         .image_uris(self.session),
+                         {bolt: "https://img/bolt-2x2-a.jpg",
+                          promo: "https://img/promo-sld.jpg"})
+        self.assertEqual(len(statements), 1)
+
+    def test_cached_representative(self):
+        self.use_database()
+        bolt = Card.named("Lightning Bolt", exact=True)
+        self.assertEqual(bolt.representative().id, "bolt-2x2-a")
+
+    def test_unrefreshed_falls_back(self):
+        with self.engine.begin() as connection:
+            connection.execute(text("UPDATE cards SET set_codes = NULL, "
+                                    "representative_id = NULL"))
+        bolt = self.session.get(Card, "1")
+        self.assertTrue(bolt.is_in_set("lea"))
+        self.assertEqual(bolt.representative().set_code, "2x2")
+
+    def test_add_missing_columns(self):
+        with self.engine.begin() as connection:
+            connection.execute(text("ALTER TABLE cards "
+                                    "DROP COLUMN regular_set_codes"))
+        add_missing_columns(self.engine)
+        Card.refresh_printing_summary(self.engine)
+        self.assertEqual(self.session.get(Card, "2").regular_set_codes,
+                         frozenset())
+
+    def test_incremental(self):
+        with self.engine.begin() as connection:
+            connection.execute(Set.__table__.insert(), [
+                {"id": "m11", "code": "m11", "name": "m11",
+                 "set_type": "core", "release_date": date(2010, 7, 16)}])
+            connection.execute(Printing.__table__.insert(), [
+                {"id": "unprinted-m11", "oracle_id": "3", "set_code": "m11"}])
+            connection.execute(Printing.__table__.delete()
+                               .where(Printing.id == "promo-sld"))
+        Card.refresh_printing_summary(self.engine, oracle_ids=["2", "3"])
+        # Sets are numbered after the known ones, which keep their bits.
+        self.assertEqual(self.session.get(Set, "m11").ordinal, 5)
+        bolt, promo, unprinted = (self.session.get(Card, oracle_id)
+                                  for oracle_id in ("1", "2", "3"))
+        self.assertEqual(bolt.set_bits, 0b11111)
+        self.assertEqual(promo.set_codes, frozenset())
+        self.assertIsNone(promo.representative_id)
+        self.assertEqual(promo.set_bits, 0)
+        self.assertEqual(unprinted.set_codes, {"m11"})
+        self.assertEqual(unprinted.representative_id, "unprinted-m11")
+        self.assertEqual(unprinted.set_bits, 0b100000)
+
+    def test_unchanged_rows_not_written(self):
+        written = []
+
+        def count(conn, cursor, statement, *args):
+            if statement.lstrip().startswith("UPDATE cards"):
+                written.append(cursor.rowcount)
+        event.listen(self.engine, "after_cursor_execute", count)
+        Card.refresh_printing_summary(self.engine)
+        Card.refresh_printing_summary(self.engine, oracle_ids=["1", "3"])
+        self.assertEqual(sum(written), 0)
+
+
+class TestSetBits(PrintingsTestCase):
+
+    def test_set_bits(self):
+        self.assertEqual([s.ordinal for s in self.session.query(Set)
+                          .order_by(Set.release_date)], [0, 1, 2, 3, 4])
+        self.assertEqual(self.session.get(Card, "1").set_bits, 0b11111)
+        self.assertEqual(self.session.get(Card, "2").set_bits, 0b00100)
+        self.assertEqual(self.session.get(Card, "3").set_bits, 0)
+        self.assertEqual(Set.bitmask(["m10", "2x2", "xyz"], self.session),
+                         0b10010)
+
+    def test_new_set(self):
+        with self.engine.begin() as connection:
+            connection.execute(Set.__table__.insert(), [
+                {"id": "m11", "code": "m11", "name": "m11",
+                 "set_type": "core", "release_date": date(2010, 7, 16)}])
+            connection.execute(Printing.__table__.insert(), [
+                {"id": "unprinted-m11", "oracle_id": "3", "set_code": "m11"}])
+        Card.refresh_printing_summary(self.engine)
+        # Known sets keep their ordinals, so stored set_bits stay valid.
+        self.assertEqual({s.code: s.ordinal for s in self.session.query(Set)},
+                         {"lea": 0, "m10": 1, "sld": 2, "2xm": 3, "2x2": 4,
+                          "m11": 5})
+        self.assertEqual(self.session.get(Card, "1").set_bits, 0b11111)
+        self.assertEqual(self.session.get(Card, "3").set_bits, 0b100000)
+
+    def decklists(self):
+        bolt, promo, unprinted = (self.session.get(Card, oracle_id)
+                                  for oracle_id in ("1", "2", "3"))
+        return [Decklist({bolt: 4}), Decklist({bolt: 4}, {promo: 1}),
+                Decklist({promo: 1}), Decklist({unprinted: 1}), Decklist()]
+
+    def test_legal_in(self):
+        self.assertEqual([deck.legal_in(["lea"], self.session)
+                          for deck in self.decklists()],
+                         [True, False, False, False, True])
+        self.assertEqual([deck.legal_in(["2xm", "sld"], self.session)
+                          for deck in self.decklists()],
+                         [True, True, True, False, True])
+
+    @unittest.skipIf(analytics is None, "requires NumPy")
+    def test_batch_legal_in(self):
+        decklists = self.decklists()
+        for set_codes in (["lea"], ["2xm", "sld"], [], ["xyz"]):
+            self.assertEqual(
+                analytics.legal_in(decklists, set_codes,
+                                   session=self.session).tolist(),
+                [deck.legal_in(set_codes, self.session)
+                 for deck in decklists])
+
+
+if __name__ == "__main__":
+    unittest.main()
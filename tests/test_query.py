@@ -0,0 +1,159 @@
+import unittest
+from datetime import date
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from database import Base
+from mtg import Card, Printing, Set
+import search
+
+
+def card(oracle_id, name, colors, cmc, type_line, oracle_text="",
+         power=None, identity=None):
+    return {"oracle_id": oracle_id, "name": name, "colors": colors,
+            "color_identity": colors if identity is None else identity,
+            "cmc": cmc, "type_line": type_line, "oracle_text": oracle_text,
+            "power": power}
+
+
+CARDS = [
+    card("1", "Izzet Charm", ["U", "R"], 2, "Instant",
+         "Choose one — Counter target noncreature spell; draw two cards"),
+    card("2", "Opt", ["U"], 1, "Instant", "Scry 1. Draw a card."),
+    card("3", "Lightning Bolt", ["R"], 1, "Instant",
+         "Lightning Bolt deals 3 damage to any target."),
+    card("4", "Grizzly Bears", ["G"], 2, "Creature — Bear", power="2"),
+    card("5", "Goblin Electromancer", ["U", "R"], 2,
+         "Creature — Goblin Wizard", power="2"),
+    card("6", "Sol Ring", [], 1, "Artifact", "{T}: Add {C}{C}."),
+    card("7", "Dismantling Blow", ["W"], 3, "Instant",
+         "Destroy target artifact or enchantment.", identity=["W", "U"]),
+    card("8", "Colossal Dreadmaw", ["G"], 6, "Creature — Dinosaur",
+         power="6"),
+]
+
+PRINTINGS = [("1", "rtr", "uncommon"), ("2", "xln", "common"),
+             ("3", "lea", "common"), ("3", "m11", "common"),
+             ("4", "lea", "common"), ("5", "grn", "common"),
+             ("6", "lea", "uncommon"), ("7", "lrw", "common"),
+             ("8", "xln", "common")]
+
+SETS = [("lea", "expansion", date(1993, 8, 5)),
+        ("lrw", "expansion", date(2007, 10, 12)),
+        ("m11", "core", date(2010, 7, 16)),
+        ("rtr", "expansion", date(2012, 10, 5)),
+        ("xln", "expansion", date(2017, 9, 29)),
+        ("grn", "expansion", date(2018, 10, 5))]
+
+
+class TestLocalSearch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine("sqlite://")
+        Base.metadata.create_all(cls.engine)
+        with cls.engine.begin() as connection:
+            connection.execute(Card.__table__.insert(), CARDS)
+            connection.execute(Set.__table__.insert(), [
+                {"id": code, "code": code, "name": code, "set_type": kind,
+                 "release_date": released} for code, kind, released in SETS])
+            connection.execute(Printing.__table__.insert(), [
+                {"id": f"{oracle_id}-{code}", "oracle_id": oracle_id,
+                 "set_code": code, "rarity": rarity,
+                 "collector_number": "1"}
+                for oracle_id, code, rarity in PRINTINGS])
+        Card.rebuild_search_index(cls.engine)
+        cls.session = Session(bind=cls.engine)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.session.close()
+
+    def assertFinds(self, query, names, fts=None):
+        result = [c.name for c in search.search(query, session=self.session,
+                                                fts=fts)]
+        self.assertEqual(result, sorted(names), query)
+
+    def test_colors(self):
+        self.assertFinds("c:ur", ["Izzet Charm", "Goblin Electromancer"])
+        self.assertFinds("c:u", ["Izzet Charm", "Goblin Electromancer",
+                                 "Opt"])
+        self.assertFinds("c=u", ["Opt"])
+        self.assertFinds("c<=ur", ["Izzet Charm", "Goblin Electromancer",
+                                   "Opt", "Lightning Bolt", "Sol Ring"])
+        self.assertFinds("c:c", ["Sol Ring"])
+        self.assertFinds("c:colorless", ["Sol Ring"])
+        self.assertFinds("c>=c", ["Sol Ring"])
+        self.assertFinds("c=c", ["Sol Ring"])
+        self.assertFinds("-c:c", [c["name"] for c in CARDS
+                                  if c["name"] != "Sol Ring"])
+
+    def test_identity(self):
+        self.assertFinds("id:wu", ["Opt", "Dismantling Blow", "Sol Ring"])
+        self.assertFinds("id:c", ["Sol Ring"])
+
+    def test_numbers(self):
+        self.assertFinds("cmc<=1", ["Opt", "Lightning Bolt", "Sol Ring"])
+        self.assertFinds("mv>=3", ["Dismantling Blow", "Colossal Dreadmaw"])
+        self.assertFinds("pow>2", ["Colossal Dreadmaw"])
+
+    def test_text(self):
+        self.assertTrue(search.fts_available(self.session))
+        for fts in (True, False):
+            self.assertFinds('t:instant o:"draw"', ["Izzet Charm", "Opt"],
+                             fts)
+            self.assertFinds("bolt", ["Lightning Bolt"], fts)
+            self.assertFinds('"grizzly bears"', ["Grizzly Bears"], fts)
+            self.assertFinds("o:{T}", ["Sol Ring"], fts)
+            self.assertFinds("-t:creature o:target", ["Izzet Charm",
+                                                      "Lightning Bolt",
+                                                      "Dismantling Blow"],
+                             fts)
+            # LIKE wildcards in values are matched literally.
+            self.assertFinds("o:%", [], fts)
+            self.assertFinds("name:_pt", [], fts)
+
+    def test_text_uses_index(self):
+        sql = str(search.compile_query("o:draw", fts=True))
+        self.assertIn("cards_fts MATCH", sql)
+        self.assertNotIn("LIKE", sql)
+
+    def test_fts_unavailable(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE cards_fts"))
+        with Session(bind=engine) as session:
+            self.assertFalse(search.fts_available(session))
+
+    def test_printings(self):
+        self.assertFinds("s:lea", ["Lightning Bolt", "Grizzly Bears",
+                                   "Sol Ring"])
+        self.assertFinds("r:u", ["Izzet Charm", "Sol Ring"])
+        self.assertFinds("st:core", ["Lightning Bolt"])
+        self.assertFinds("year<2000", ["Lightning Bolt", "Grizzly Bears",
+                                       "Sol Ring"])
+
+    def test_boolean(self):
+        self.assertFinds("c:ur cmc<=3 t:instant o:\"draw\"", ["Izzet Charm"])
+        self.assertFinds("t:creature -c:u", ["Grizzly Bears",
+                                             "Colossal Dreadmaw"])
+        self.assertFinds("s:xln or s:grn", ["Opt", "Colossal Dreadmaw",
+                                            "Goblin Electromancer"])
+        self.assertFinds("(s:xln or s:grn) t:creature",
+                         ["Colossal Dreadmaw", "Goblin Electromancer"])
+
+    def test_pagination(self):
+        pages = search.search("cmc>=0", page_size=3, session=self.session)
+        self.assertEqual(len(pages.data), 3)
+        self.assertTrue(pages.has_more)
+        self.assertEqual(len(list(pages)), len(CARDS))
+
+    def test_errors(self):
+        for query in ("", "foo:bar", "(t:instant", "t:instant)", "c:xyz",
+                      "t<3"):
+            with self.assertRaises(ValueError, msg=query):
+                search.compile_query(query)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from database import Base
+from mtg import Card, Printing
+
+
+class TestQueryPlans(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.session = Session(bind=self.engine)
+
+    def tearDown(self):
+        self.session.close()
+
+    def plan(self, query):
+        sql = str(query.statement.compile(
+            self.engine, compile_kwargs={"literal_binds": True}))
+        with self.engine.connect() as connection:
+            rows = connection.execute(text("EXPLAIN QUERY PLAN " + sql))
+            return " ".join(row[-1] for row in rows)
+
+    def assertUsesIndex(self, query, index):
+        plan = self.plan(query)
+        self.assertIn(f"INDEX {index}", plan)
+        self.assertNotIn("SCAN cards", plan)
+        self.assertNotIn("SCAN printings", plan)
+
+    def test_card_name(self):
+        q = self.session.query(Card).filter(Card.name == "Shatter")
+        self.assertUsesIndex(q, "ix_cards_name")
+
+    def test_card_cmc(self):
+        q = self.session.query(Card).filter(Card.cmc <= 2)
+        self.assertUsesIndex(q, "ix_cards_cmc")
+
+    def test_printing_set_and_number(self):
+        q = self.session.query(Printing)\
+                        .filter(Printing.set_code == "m20")\
+                        .filter(Printing.collector_number == "12")
+        self.assertUsesIndex(q, "ix_printings_set_code_collector_number")
+
+    def test_printings_of_card(self):
+        q = self.session.query(Printing)\
+                        .filter(Printing.oracle_id.in_(["a", "b"]))
+        self.assertUsesIndex(q, "ix_printings_oracle_id")
+
+
+if __name__ == "__main__":
+    unittest.main()
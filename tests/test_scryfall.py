@@ -0,0 +1,212 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import scryfall
+from mtg import Printing
+
+
+def reversible(id_, oracle_id, name, set_code):
+    face = {"object": "card_face", "oracle_id": oracle_id, "name": name,
+            "type_line": "Creature", "mana_cost": "{1}"}
+    return {"object": "card", "id": id_, "name": f"{name} // {name}",
+            "layout": "reversible_card", "set": set_code,
+            "collector_number": id_, "card_faces": [face, dict(face)]}
+
+
+# Card objects answered for identifiers with an id.
+CARDS = {card["id"]: card for card in [
+    reversible("r1", "o-bear", "Bear", "sld"),
+    reversible("r2", "o-elk", "Elk", "sld"),
+    reversible("r3", "o-bear", "Bear", "pls"),
+    {"object": "card", "id": "n1", "oracle_id": "o-opt", "name": "Opt",
+     "set": "xln", "collector_number": "65", "type_line": "Instant",
+     "mana_cost": "{U}"}]}
+
+
+class FlakyScryfall(BaseHTTPRequestHandler):
+    """Answers 429 to the first `failures` requests, then 200."""
+
+    failures = 0
+    count = 0
+    batch_sizes = []
+
+    def do_GET(self):
+        FlakyScryfall.count += 1
+        if self.path.startswith("/search"):
+            page = int(self.path.split("=")[-1])
+            host = f"http://127.0.0.1:{self.server.server_port}"
+            self.reply(200, {"object": "list", "has_more": page < 3,
+                             "next_page": f"{host}/search?page={page + 1}",
+                             "data": [page * 10, page * 10 + 1]})
+        elif self.path.startswith("/cards/"):
+            self.reply(200, {"object": "card", "id": self.path[7:]})
+        elif self.path == "/missing":
+            self.reply(404, {"object": "error", "details": "No card found"})
+        elif FlakyScryfall.count <= FlakyScryfall.failures:
+            self.reply(429, {"object": "error", "details": "Slow down"},
+                       {"Retry-After": "0"})
+        else:
+            self.reply(200, {"object": "card", "name": "Shatter"})
+
+    def do_POST(self):
+        FlakyScryfall.count += 1
+        length = int(self.headers['Content-Length'])
+        identifiers = json.loads(self.rfile.read(length))['identifiers']
+        FlakyScryfall.batch_sizes.append(len(identifiers))
+        found = [CARDS[i["id"]] if "id" in i
+                 else {"object": "card", "name": i["name"]}
+                 for i in identifiers if i.get("name") != "Missing"]
+        missing = [i for i in identifiers if i.get("name") == "Missing"]
+        self.reply(200, {"object": "list", "data": found,
+                         "not_found": missing})
+
+    def reply(self, status, data, headers={}):
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(json.dumps(data).encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_spacing(self):
+        limiter = scryfall.RateLimiter(rate=50, burst=1)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 5 / 50 - 0.01)
+
+    def test_shared_between_threads(self):
+        limiter = scryfall.RateLimiter(rate=50, burst=1)
+        times = []
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(3):
+                limiter.acquire()
+                with lock:
+                    times.append(time.monotonic())
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        times.sort()
+        self.assertGreaterEqual(times[-1] - times[0], 11 / 50 - 0.02)
+
+
+class TestClient(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyScryfall)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        FlakyScryfall.count = 0
+        self.client = scryfall.Client(rate=100, backoff=0)
+
+    def test_retry(self):
+        FlakyScryfall.failures = 2
+        response = self.client.get(self.url + "/named")
+        self.assertEqual(response.json()["name"], "Shatter")
+        self.assertEqual(FlakyScryfall.count, 3)
+
+    def test_gives_up(self):
+        FlakyScryfall.failures = 10
+        with self.assertRaisesRegex(Exception, "Slow down"):
+            self.client.get(self.url + "/named")
+        self.assertEqual(FlakyScryfall.count, self.client.retries + 1)
+
+    def test_error_details(self):
+        with self.assertRaisesRegex(Exception, "No card found"):
+            self.client.get(self.url + "/missing")
+        self.assertEqual(FlakyScryfall.count, 1)
+
+
+class TestPagination(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyScryfall)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.client = scryfall.Request.client
+        scryfall.Request.client = scryfall.Client(rate=100)
+
+    @classmethod
+    def tearDownClass(cls):
+        scryfall.Request.client = cls.client
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        FlakyScryfall.failures = 0
+
+    def test_paginated_list(self):
+        result = list(scryfall.Request(self.url + "/search?page=1").data)
+        self.assertEqual(result, [10, 11, 20, 21, 30, 31])
+
+    def test_async_paginated_list(self):
+        async def search():
+            pages = await scryfall.AsyncRequest(self.url + "/search?page=1")
+            first = await pages.__anext__()
+            self.assertIsNotNone(pages._next_page_task)
+            return [first] + await pages.to_list()
+
+        self.assertEqual(asyncio.run(search()), [10, 11, 20, 21, 30, 31])
+
+    def test_collection(self):
+        scryfall.API_URL = self.url
+        self.addCleanup(setattr, scryfall, "API_URL",
+                        "https://api.scryfall.com")
+        FlakyScryfall.batch_sizes = []
+        names = [f"Card {i}" for i in range(160)] + ["Missing"]
+        cards, not_found = scryfall.collection(names)
+        self.assertEqual([c["name"] for c in cards], names[:-1])
+        self.assertEqual(not_found, [{"name": "Missing"}])
+        self.assertEqual(FlakyScryfall.batch_sizes, [75, 75, 11])
+
+    def test_fetch_printings(self):
+        scryfall.API_URL = self.url
+        self.addCleanup(setattr, scryfall, "API_URL",
+                        "https://api.scryfall.com")
+        printings = Printing.fetch_many([{"id": id_} for id_ in CARDS])
+        self.assertEqual([p.id for p in printings], list(CARDS))
+        bear, elk, bear_again, opt = [p.card for p in printings]
+        # Reversible cards are told apart by the oracle_id of their faces.
+        self.assertIs(bear_again, bear)
+        self.assertIsNot(elk, bear)
+        self.assertEqual([card.oracle_id for card in (bear, elk, opt)],
+                         ["o-bear", "o-elk", "o-opt"])
+
+    def test_card_identifier(self):
+        self.assertEqual(scryfall.card_identifier("Shatter"),
+                         {"name": "Shatter"})
+        self.assertEqual(scryfall.card_identifier(("m20", "12")),
+                         {"set": "m20", "collector_number": "12"})
+        uuid = "56ebc372-aabd-4174-a943-c7bf59e5028d"
+        self.assertEqual(scryfall.card_identifier(uuid), {"id": uuid})
+
+    def test_fetch_many(self):
+        ids = [f"{self.url}/cards/{i}" for i in range(5)]
+        cards = asyncio.run(scryfall.fetch_many(ids, concurrency=3))
+        self.assertEqual([c["id"] for c in cards], [str(i) for i in range(5)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from database import Base
+from mtg import Card
+
+
+CARDS = [
+    {"oracle_id": "1", "name": "Divination", "type_line": "Sorcery",
+     "oracle_text": "Draw two cards."},
+    {"oracle_id": "2", "name": "Elvish Visionary",
+     "type_line": "Creature — Elf Shaman",
+     "oracle_text": "When Elvish Visionary enters the battlefield, "
+                    "draw a card."},
+    {"oracle_id": "3", "name": "Opt", "type_line": "Instant",
+     "oracle_text": "Scry 1.\nDraw a card."},
+    {"oracle_id": "4", "name": "Grizzly Bears",
+     "type_line": "Creature — Bear", "oracle_text": ""},
+    {"oracle_id": "5", "name": "Lim-Dûl's Vault", "type_line": "Instant",
+     "oracle_text": "Look at the top five cards of your library."},
+]
+
+
+class TestCardSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            connection.execute(Card.__table__.insert(),
+                               [dict(c, color_identity=[]) for c in CARDS])
+        Card.rebuild_search_index(self.engine)
+        self.session = Session(bind=self.engine)
+
+    def tearDown(self):
+        self.session.close()
+
+    def search(self, *args, **kwargs):
+        return [card.name for card in
+                Card.search(*args, session=self.session, **kwargs)]
+
+    def test_phrase(self):
+        self.assertEqual(sorted(self.search("draw a card")),
+                         ["Elvish Visionary", "Opt"])
+
+    def test_type_line(self):
+        self.assertEqual(self.search("draw a card", type_line="Creature"),
+                         ["Elvish Visionary"])
+
+    def test_name_ranked_first(self):
+        self.assertEqual(self.search("elvish visionary")[0],
+                         "Elvish Visionary")
+
+    def test_diacritics_and_quotes(self):
+        self.assertEqual(self.search("lim dul"), ["Lim-Dûl's Vault"])
+        self.assertEqual(self.search('"bears'), ["Grizzly Bears"])
+
+    def test_limit(self):
+        self.assertEqual(len(self.search("draw", limit=1)), 1)
+
+    def test_rebuild(self):
+        with self.engine.begin() as connection:
+            connection.execute(Card.__table__.delete()
+                               .where(Card.oracle_id == "3"))
+        Card.rebuild_search_index(self.engine)
+        self.assertEqual(self.search("draw a card"), ["Elvish Visionary"])
+
+    def test_rebuild_changed(self):
+        with self.engine.begin() as connection:
+            connection.execute(Card.__table__.delete()
+                               .where(Card.oracle_id == "3"))
+            connection.execute(Card.__table__.update()
+                               .where(Card.oracle_id == "4")
+                               .values(oracle_text="Draw a card."))
+            connection.execute(Card.__table__.insert(),
+                               {"oracle_id": "6", "name": "Preordain",
+                                "type_line": "Sorcery",
+                                "oracle_text": "Scry 2, then draw a card.",
+                                "color_identity": []})
+        Card.rebuild_search_index(self.engine, oracle_ids=["3", "4", "6"])
+        self.assertEqual(sorted(self.search("draw a card")),
+                         ["Elvish Visionary", "Grizzly Bears", "Preordain"])
+        self.assertEqual(self.search("divination"), ["Divination"])
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.execute(
+                text("SELECT count(*) FROM cards_fts")).scalar(), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import os.path
+import tempfile
+import unittest
+from datetime import date
+from sqlalchemy import create_engine
+from database import Base
+from manacost import ManaCost
+from mtg import Card, Color, Printing, Set
+
+try:
+    import numpy as np
+    import snapshot
+except ImportError:
+    snapshot = None
+
+
+CARDS = [
+    {"oracle_id": "1", "name": "Opt", "cmc": 1.0, "colors": ["U"],
+     "color_identity": ["U"], "type_line": "Instant",
+     "mana_symbols": ManaCost.parse("{U}")},
+    {"oracle_id": "2", "name": "Grizzly Bears", "cmc": 2.0, "colors": ["G"],
+     "color_identity": ["G"], "type_line": "Creature — Bear",
+     "mana_symbols": ManaCost.parse("{1}{G}")},
+    {"oracle_id": "3", "name": "Fusion Elemental", "cmc": 5.0,
+     "colors": ["W", "U", "B", "R", "G"],
+     "color_identity": ["W", "U", "B", "R", "G"],
+     "mana_symbols": ManaCost.parse("{W}{U}{B}{R}{G}"),
+     "type_line": "Creature — Elemental"},
+    {"oracle_id": "4", "name": "Island", "cmc": 0.0, "colors": [],
+     "color_identity": ["U"], "type_line": "Basic Land — Island",
+     "mana_symbols": None},
+]
+
+SETS = [
+    {"id": "1", "code": "lea", "name": "Limited Edition Alpha", "set_type": "core",
+     "release_date": date(1993, 8, 5)},
+    {"id": "2", "code": "ala", "name": "Shards of Alara", "set_type": "expansion",
+     "release_date": date(2008, 10, 3)},
+]
+
+PRINTINGS = [
+    {"id": "a", "oracle_id": "2", "set_code": "lea", "rarity": "common"},
+    {"id": "b", "oracle_id": "4", "set_code": "lea", "rarity": "common"},
+    {"id": "c", "oracle_id": "3", "set_code": "ala", "rarity": "uncommon"},
+    {"id": "d", "oracle_id": "1", "set_code": "ala", "rarity": "common"},
+    {"id": "e", "oracle_id": "4", "set_code": "ala", "rarity": "common"},
+]
+
+
+@unittest.skipIf(snapshot is None, "NumPy is not installed")
+class TestSnapshot(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(Card.__table__.insert(), CARDS)
+            connection.execute(Set.__table__.insert(), SETS)
+            connection.execute(Printing.__table__.insert(), PRINTINGS)
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, "snapshot")
+        snapshot.build(cls.path, bind=engine)
+        cls.snap = snapshot.Snapshot.load(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_rebuild(self):
+        path = os.path.join(self.directory.name, "rebuilt")
+        snapshot.build(path, bind=self.engine)
+        old = snapshot.Snapshot.load(path)
+        snapshot.build(path, bind=self.engine)
+        self.assertEqual(old.cards['cmc'].tolist(),
+                         snapshot.Snapshot.load(path).cards['cmc'].tolist())
+        self.assertEqual(sorted(os.listdir(self.directory.name)),
+                         ["rebuilt", "snapshot"])
+
+    def test_memory_mapped(self):
+        self.assertIsInstance(self.snap.cards['cmc'], np.memmap)
+        self.assertEqual(len(self.snap.cards), 4)
+        self.assertEqual(len(self.snap.printings), 5)
+
+    def test_strings(self):
+        self.assertEqual(list(self.snap.cards['name']),
+                         ["Opt", "Grizzly Bears", "Fusion Elemental",
+                          "Island"])
+        self.assertEqual(list(self.snap.sets['code']), ["lea", "ala"])
+        self.assertEqual(self.snap.cards.decode('type_line')[1],
+                         "Creature — Bear")
+
+    def test_filters(self):
+        creatures = self.snap.type_contains("Creature")
+        self.assertEqual(list(creatures), [False, True, True, False])
+        blue = self.snap.colors_within("U", identity=True)
+        self.assertEqual(list(blue), [True, False, False, True])
+
+    def test_cmc_curve(self):
+        self.assertEqual(list(self.snap.cmc_curve()), [1, 1, 1, 0, 0, 1])
+        creatures = self.snap.type_contains("Creature")
+        self.assertEqual(list(self.snap.cmc_curve(creatures)),
+                         [0, 0, 1, 0, 0, 1])
+
+    def test_color_counts(self):
+        counts = self.snap.color_counts()
+        self.assertEqual(counts[Color.BLUE], 2)
+        self.assertEqual(counts[Color.WHITE], 1)
+        self.assertEqual(self.snap.color_counts(identity=True)[Color.BLUE], 3)
+
+    def test_devotion(self):
+        self.assertEqual(self.snap.devotion(Color.BLUE).tolist(),
+                         [1, 0, 1, 0])
+
+    def test_rarity_by_set(self):
+        rarities = self.snap.printings.vocabularies['rarity']
+        self.assertEqual(rarities, ["common", "uncommon"])
+        self.assertEqual(self.snap.rarity_by_set().tolist(),
+                         [[2, 0], [2, 1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import os.path
+import unittest
+from datetime import date
+from sqlalchemy.orm import Session
+from mtg import Card, ColorSet, Decklist, Set
+from support import DatabaseTestCase
+from tracker import Draft, Game, WinRate
+
+
+def card(oracle_id, name, colors):
+    return Card(oracle_id=oracle_id, name=name, colors=colors,
+                color_identity=colors, type_line="Creature")
+
+
+class TrackerTestCase(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.session = Session(bind=self.engine)
+        self.session.add_all([
+            Set(id="dmu", code="dmu", name="Dominaria United"),
+            Set(id="bro", code="bro", name="The Brothers' War")])
+        self.knight = card("1", "Knight", "W")
+        self.drake = card("2", "Drake", "U")
+        self.goblin = card("3", "Goblin", "R")
+        self.session.add_all([self.knight, self.drake, self.goblin])
+        self.session.commit()
+        dmu, bro = self.session.get(Set, "dmu"), self.session.get(Set, "bro")
+        for deck, card_set, day, results in (
+                ({self.knight: 2, self.drake: 1}, dmu, date(2022, 9, 1),
+                 [(2, 0), (2, 1), (0, 2)]),
+                ({self.knight: 1, self.drake: 3}, dmu, date(2022, 9, 8),
+                 [(1, 2), (1, 1)]),
+                ({self.goblin: 5}, bro, date(2022, 11, 20),
+                 [(2, 0)])):
+            decklist = Decklist(deck, {self.goblin: 1})
+            draft = Draft(decklist, card_set, day)
+            for wins, losses in results:
+                draft.add_game(Game(decklist, day, wins, losses))
+            self.session.add(draft)
+        self.session.commit()
+        self.session.expunge_all()
+
+    def tearDown(self):
+        self.session.close()
+
+
+class TestTracker(TrackerTestCase):
+
+    def test_round_trip(self):
+        draft = self.session.query(Draft).order_by(Draft.date).first()
+        self.assertEqual(draft.record, "2-1")
+        self.assertEqual(draft.colors, ColorSet("WU"))
+        self.assertEqual({c.name: q for c, q in
+                          draft.decklist.mainboard.items()},
+                         {"Knight": 2, "Drake": 1})
+        self.assertEqual([c.name for c in draft.decklist.sideboard],
+                         ["Goblin"])
+        self.assertEqual([(g.wins, g.losses) for g in draft.games],
+                         [(2, 0), (2, 1), (0, 2)])
+        self.assertIs(draft.games[0].decklist, draft.decklist)
+
+    def test_win_rates_by_set(self):
+        rates = Draft.win_rates_by_set(session=self.session)
+        self.assertEqual(rates, {"dmu": WinRate(2, 2, 2, 1),
+                                 "bro": WinRate(1, 1, 0, 0)})
+        self.assertEqual(rates["dmu"].rate, 0.4)
+        self.assertEqual(
+            Draft.win_rates_by_set(since=date(2022, 9, 5),
+                                   until=date(2022, 10, 1),
+                                   session=self.session),
+            {"dmu": WinRate(1, 0, 1, 1)})
+
+    def test_win_rates_by_colors(self):
+        self.assertEqual(Draft.win_rates_by_colors(session=self.session),
+                         {ColorSet("WU"): WinRate(2, 2, 2, 1),
+                          ColorSet("R"): WinRate(1, 1, 0, 0)})
+
+    def test_win_rates_by_card(self):
+        self.assertEqual(Draft.win_rates_by_card(session=self.session),
+                         {"Knight": WinRate(2, 2, 2, 1),
+                          "Drake": WinRate(2, 2, 2, 1),
+                          "Goblin": WinRate(1, 1, 0, 0)})
+        self.assertEqual(Draft.win_rates_by_card("dmu", session=self.session)
+                         .keys(), {"Knight", "Drake"})
+
+    def test_no_set(self):
+        knight = self.session.get(Card, "1")
+        draft = Draft(Decklist({knight: 1}), None, date(2023, 1, 1))
+        self.session.add(draft)
+        self.session.commit()
+        self.assertIsNone(draft.set_code)
+        self.assertEqual(Draft.win_rates_by_set(session=self.session)[None],
+                         WinRate(1, 0, 0, 0))
+
+    def test_assign_set_and_decklist(self):
+        draft = self.session.query(Draft).order_by(Draft.date).first()
+        bro = self.session.get(Set, "bro")
+        draft.set = bro
+        self.assertEqual(draft.set_code, "bro")
+        draft.set = None
+        self.assertIsNone(draft.set_code)
+        game = draft.games[0]
+        self.assertIs(game.decklist, draft.decklist)
+        decklist = Decklist()
+        game.decklist = decklist
+        self.assertIs(game.decklist, decklist)
+
+
+class TestNdjson(TrackerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.use_database()
+
+    def test_decklists(self):
+        path = os.path.join(self.directory.name, "decks.ndjson.gz")
+        decklists = [draft.decklist for draft
+                     in self.session.query(Draft).order_by(Draft.id)]
+        self.assertEqual(Decklist.write_ndjson(path, iter(decklists)), 3)
+        loaded = Decklist.read_ndjson(path, batch_size=2)
+        self.assertEqual([d.as_dict() for d in loaded],
+                         [d.as_dict() for d in decklists])
+
+    def test_unknown_name(self):
+        with self.assertRaises(ValueError):
+            list(Decklist.from_dicts([{"mainboard": {"Knight": 1,
+                                                     "Dragon": 1}}]))
+
+    def test_unknown_set(self):
+        draft = {"set": "xyz", "date": "2023-01-01",
+                 "deck": {"mainboard": {"Knight": 1}}, "games": []}
+        with self.assertRaisesRegex(ValueError, "xyz"):
+            list(Draft.from_dicts([draft]))
+        draft["set"] = None
+        self.assertIsNone(next(Draft.from_dicts([draft])).set_code)
+
+    def test_drafts(self):
+        path = os.path.join(self.directory.name, "drafts.ndjson")
+        drafts = self.session.query(Draft).order_by(Draft.id).yield_per(2)
+        self.assertEqual(Draft.write_ndjson(path, drafts), 3)
+        expected = [draft.as_dict() for draft in
+                    self.session.query(Draft).order_by(Draft.id)]
+        loaded = list(Draft.read_ndjson(path, batch_size=2))
+        self.assertEqual([draft.as_dict() for draft in loaded], expected)
+        self.assertEqual(loaded[0].colors, ColorSet("WU"))
+
+
+if __name__ == "__main__":
+    unittest.main()
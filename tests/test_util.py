@@ -0,0 +1,174 @@
+import json
+import os
+import tempfile
+import unittest
+import util
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class TestIterJsonArray(unittest.TestCase):
+
+    def setUp(self):
+        self.objects = [{"object": "card", "name": "Fire // Ice",
+                         "oracle_text": "Fire deals 2 damage, divided as you choose.\n{1}{U}",
+                         "colors": ["R", "U"], "cmc": 4.0},
+                        {"object": "card", "name": "Æther Vial",
+                         "oracle_text": "[Brackets] and \"quotes\" }{",
+                         "colors": [], "cmc": 1.0},
+                        {"object": "card", "name": "Lim-Dûl's Vault",
+                         "colors": ["B"], "cmc": 2}]
+
+    def write(self, text):
+        fd, path = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def assertParses(self, text, expected, **kwargs):
+        path = self.write(text)
+        for chunk_size in (1, 3, 7, 64, 2 ** 20):
+            for use_mmap in (False, True):
+                result = list(util.iter_json_array(path,
+                                                   chunk_size=chunk_size,
+                                                   use_mmap=use_mmap,
+                                                   **kwargs))
+                self.assertEqual(result, expected)
+
+    def test_one_object_per_line(self):
+        text = "[\n" + ",\n".join(json.dumps(o) for o in self.objects) + "\n]\n"
+        self.assertParses(text, self.objects)
+
+    def test_single_line(self):
+        self.assertParses(json.dumps(self.objects), self.objects)
+
+    def test_pretty_printed(self):
+        self.assertParses(json.dumps(self.objects, indent=4), self.objects)
+
+    def test_numbers(self):
+        self.assertParses("[1, 22,333 ,4444]", [1, 22, 333, 4444])
+
+    def test_empty(self):
+        self.assertParses(" [ ] ", [])
+
+    def test_fields(self):
+        expected = [{"name": o["name"], "cmc": o["cmc"]} for o in self.objects]
+        self.assertParses(json.dumps(self.objects), expected,
+                          fields=["name", "cmc", "power"])
+
+    def test_truncated(self):
+        path = self.write(json.dumps(self.objects)[:-20])
+        with self.assertRaises(ValueError):
+            list(util.iter_json_array(path, chunk_size=16))
+
+    def test_split_tokens(self):
+        self.assertParses('[{"a": true, "b": null, "c": -1.5e3, '
+                          '"d": "\\u00e6", "e": -Infinity}]',
+                          [{"a": True, "b": None, "c": -1500.0, "d": "\u00e6",
+                            "e": float("-inf")}])
+
+    def test_malformed_fails_early(self):
+        valid = ",\n".join(json.dumps(o) for o in self.objects * 2000)
+        for malformed in ('{"name": x}', '{"name": "a" "b"}', '{"a": ]',
+                          '{"a": "\\q"}'):
+            path = self.write(f"[{malformed},\n{valid}]")
+            with self.assertRaises(json.JSONDecodeError) as raised:
+                list(util.iter_json_array(path, chunk_size=64))
+            # Raised from the first chunks, not after buffering the file.
+            self.assertLess(len(raised.exception.doc), 200, malformed)
+
+    def test_not_an_array(self):
+        path = self.write(json.dumps(self.objects[0]))
+        with self.assertRaises(ValueError):
+            list(util.iter_json_array(path))
+
+
+class TestJsonArrayRanges(unittest.TestCase):
+
+    def test_ranges_cover_array(self):
+        import re
+        objects = [{"object": "card", "name": f"Card {i}",
+                    "card_faces": [{"object": "card_face", "name": "x"}]}
+                   for i in range(50)]
+        boundary = re.compile(rb',\s*(?=\{\s*"object"\s*:\s*"card"\s*[,}])')
+        for indent in (None, 2):
+            fd, path = tempfile.mkstemp(suffix=".json")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(objects, f, indent=indent)
+            self.addCleanup(os.remove, path)
+            ranges = util.json_array_ranges(path, 200, boundary)
+            self.assertGreater(len(ranges), 1)
+            result = [o for start, end in ranges
+                      for o in util.iter_json_range(path, start, end)]
+            self.assertEqual(result, objects)
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_eviction(self):
+        cache = util.LRUCache(maxsize=2)
+        cache["a"] = 1
+        cache["b"] = 2
+        self.assertEqual(cache.get("a"), 1)
+        cache["c"] = 3
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    def test_ttl(self):
+        cache = util.LRUCache(ttl=0)
+        cache["a"] = 1
+        self.assertEqual(cache.get("a", "missing"), "missing")
+        self.assertEqual(len(cache), 0)
+
+
+class TestChunked(unittest.TestCase):
+
+    def test_chunked(self):
+        self.assertEqual(list(util.chunked(range(7), 3)),
+                         [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(list(util.chunked([], 3)), [])
+
+
+class TestNdjson(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.objects = [{"name": "Æther Vial", "cmc": 1},
+                        {"mainboard": {"Opt": 4}, "sideboard": {}}] * 3
+
+    def assertRoundTrips(self, filename):
+        path = os.path.join(self.directory.name, filename)
+        self.assertEqual(util.write_ndjson(path, iter(self.objects)), 6)
+        self.assertEqual(list(util.iter_ndjson(path)), self.objects)
+        return path
+
+    def test_plain(self):
+        path = self.assertRoundTrips("objects.ndjson")
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(len(f.read().splitlines()), 6)
+
+    def test_gzip(self):
+        path = self.assertRoundTrips("objects.ndjson.gz")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(2), b"\x1f\x8b")
+
+    @unittest.skipIf(zstandard is None, "requires zstandard")
+    def test_zstd(self):
+        self.assertRoundTrips("objects.ndjson.zst")
+
+    def test_blank_lines(self):
+        path = os.path.join(self.directory.name, "blank.ndjson")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"a": 1}\n\n{"a": 2}\n')
+        self.assertEqual(list(util.iter_ndjson(path)), [{"a": 1}, {"a": 2}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,18 +1,117 @@
-from mtg import Decklist, Set
+from mtg import Card, ColorSet, ColorSetType, Decklist, Set
+from collections import namedtuple
 from datetime import date
+from database import Base, ScopedSession
+from sqlalchemy import (Boolean, Column, Date, ForeignKey, Index, Integer,
+                        String, func)
+from sqlalchemy.orm import reconstructor, relationship
 import json
+import util
 
 
-class Draft(object):
+class WinRate(namedtuple('WinRate', ['drafts', 'wins', 'losses', 'draws'])):
+    """Match record summed over a group of drafts.
 
-    def __init__(self, decklist, card_set):
+    Attributes:
+        drafts (int): Number of drafts in the group.
+        wins (int): Number of matches won.
+        losses (int): Number of matches lost.
+        draws (int): Number of matches drawn.
+
+    """
+
+    @property
+    def matches(self):
+        return self.wins + self.losses + self.draws
+
+    @property
+    def rate(self):
+        """float: Fraction of the matches won, or None if none were
+        played."""
+        return self.wins / self.matches if self.matches else None
+
+
+class Draft(Base):
+    """A draft deck and the matches played with it.
+
+    Drafts are stored in the drafts table, with one deck_entries row per
+    card of the decklist and one games row per match, so that win rates
+    over many drafts can be computed in SQL (see win_rates_by_set,
+    win_rates_by_colors and win_rates_by_card). The match record is kept
+    in the wins, losses and draws columns by add_game.
+
+    Args:
+        decklist (Decklist): The drafted deck.
+        card_set (Set): The set that was drafted, or None if unknown.
+        day (date): Date of the draft. Defaults to today.
+
+    """
+
+    __tablename__ = 'drafts'
+    __table_args__ = (
+        Index('ix_drafts_set_code_date', 'set_code', 'date'),
+    )
+    session = ScopedSession
+    id = Column(Integer, primary_key=True)
+    set_code = Column(String, ForeignKey('sets.code'))
+    date = Column(Date, index=True)
+    # Colors of the mainboard, see win_rates_by_colors.
+    colors = Column(ColorSetType)
+    wins = Column(Integer, default=0)
+    losses = Column(Integer, default=0)
+    draws = Column(Integer, default=0)
+    entries = relationship('DeckEntry', lazy='selectin',
+                           cascade='all, delete-orphan')
+    games = relationship('Game', back_populates='draft', lazy='selectin',
+                         order_by='Game.id', cascade='all, delete-orphan')
+
+    def __init__(self, decklist, card_set, day=None):
         self.decklist = decklist
         self.set = card_set
-        self.games = []
+        self.date = day or date.today()
         self.wins = 0
         self.losses = 0
         self.draws = 0
 
+    @reconstructor
+    def _init_on_load(self):
+        self._decklist = None
+
+    @property
+    def decklist(self):
+        """Decklist: The drafted deck, rebuilt from the deck entries for
+        drafts loaded from the database."""
+        if self._decklist is None:
+            self._decklist = Decklist()
+            for entry in self.entries:
+                board = (self._decklist.sideboard if entry.sideboard
+                         else self._decklist.mainboard)
+                board[entry.card] += entry.quantity
+        return self._decklist
+
+    @decklist.setter
+    def decklist(self, decklist):
+        self._decklist = decklist
+        self.entries = [
+            DeckEntry(oracle_id=card.oracle_id, sideboard=sideboard,
+                      quantity=quantity)
+            for sideboard, board in ((False, decklist.mainboard),
+                                     (True, decklist.sideboard))
+            for card, quantity in board.items()]
+        colors = 0
+        for card in decklist.mainboard:
+            colors |= card.colors.mask
+        self.colors = ColorSet(colors)
+
+    @property
+    def set(self):
+        """Set: The set that was drafted, stored as set_code."""
+        return Set.from_code(self.set_code)
+
+    @set.setter
+    def set(self, card_set):
+        self.set_code = card_set.code if card_set is not None else None
+
     @property
     def record(self):
         rec = str(self.wins) + "-" + str(self.losses)
@@ -29,13 +128,208 @@ class Draft(object):
         else:
             self.draws += 1
 
+    def as_dict(self):
+        return {"set": self.set_code,
+                "date": str(self.date),
+                "deck": self.decklist.as_dict(),
+                "record": self.record,
+                "games": [g.as_dict() for g in self.games]}
+
     def export_json(self):
-        return json.dumps({"deck": self.decklist.as_dict(),
-                           "record": self.record,
-                           "games": [g.as_dict() for g in self.games]})
+        return json.dumps(self.as_dict())
+
+    @classmethod
+    def from_dicts(cls, dicts, batch_size=1000, profile='card'):
+        """Build drafts from dictionaries in the format of as_dict.
+
+        Works as a generator, looking the card names of batch_size drafts
+        up at a time (see Decklist.from_dicts). The record is recomputed
+        from the games.
+
+        Args:
+            dicts (Iterable[dict]): Dictionaries of drafts.
+            batch_size (int): Number of drafts to look up names for at once.
+            profile (str): Loading profile for the cards, see
+                Card.load_options.
+
+        Yields:
+            Draft: The draft of each dictionary, in order, not added to any
+                session.
+
+        Raises:
+            ValueError: If a draft's set code is not in the sets table.
+
+        """
+        for batch in util.chunked(dicts, batch_size):
+            decklists = Decklist.from_dicts([d["deck"] for d in batch],
+                                            len(batch), profile)
+            for d, decklist in zip(batch, decklists):
+                card_set = None
+                if d["set"] is not None:
+                    card_set = Set.from_code(d["set"])
+                    if card_set is None:
+                        raise ValueError(f"Unknown set code {d['set']!r}")
+                draft = cls(decklist, card_set, date.fromisoformat(d["date"]))
+                for game in d["games"]:
+                    draft.add_game(Game(decklist,
+                                        date.fromisoformat(game["date"]),
+                                        game["wins"], game["losses"]))
+                yield draft
+
+    @classmethod
+    def read_ndjson(cls, path, batch_size=1000, profile='card'):
+        """Read drafts from a newline-delimited JSON file.
+
+        The file is read lazily, so adding the drafts to a session and
+        committing them every few thousand drafts reloads an archive of any
+        size in bounded memory.
+
+        Args:
+            path (str): Path to the file, optionally compressed with gzip
+                (.gz) or Zstandard (.zst).
+            batch_size (int): Number of drafts to look up names for at once.
+            profile (str): Loading profile for the cards, see
+                Card.load_options.
+
+        Yields:
+            Draft: The drafts of the file, in order.
 
+        """
+        return cls.from_dicts(util.iter_ndjson(path), batch_size, profile)
 
-class Game(object):
+    @staticmethod
+    def write_ndjson(path, drafts):
+        """Write drafts to a newline-delimited JSON file, one per line.
+
+        To archive the drafts of a database, pass a query with yield_per,
+        e.g. session.query(Draft).yield_per(1000), so that they are loaded
+        a batch at a time.
+
+        Args:
+            path (str): Path to the file, compressed with gzip or Zstandard
+                if it ends in .gz or .zst.
+            drafts (Iterable[Draft]): Drafts to write, consumed one at a
+                time.
+
+        Returns:
+            int: Number of drafts written.
+
+        """
+        return util.write_ndjson(path, (draft.as_dict() for draft in drafts))
+
+    @classmethod
+    def win_rates_by_set(cls, since=None, until=None, session=None):
+        """Sums the match records of drafts by set.
+
+        Args:
+            since (date): Only count drafts from this date on.
+            until (date): Only count drafts up to this date.
+            session (Session): Session to query with. Defaults to
+                Draft.session.
+
+        Returns:
+            Dict[str, WinRate]: Record of the drafts of each set code.
+
+        """
+        q = cls._records(cls.set_code, None, since, until, session)
+        return cls._win_rates(q.group_by(cls.set_code))
+
+    @classmethod
+    def win_rates_by_colors(cls, set_code=None, since=None, until=None,
+                            session=None):
+        """Sums the match records of drafts by the colors of their decks.
+
+        Decks are grouped by their exact colors, so a two-color deck is
+        only counted towards its color pair, not towards either color.
+
+        Args:
+            set_code (str): Only count drafts of this set.
+            since (date): Only count drafts from this date on.
+            until (date): Only count drafts up to this date.
+            session (Session): Session to query with. Defaults to
+                Draft.session.
+
+        Returns:
+            Dict[ColorSet, WinRate]: Record of the decks of each colors.
+
+        """
+        q = cls._records(cls.colors, set_code, since, until, session)
+        return cls._win_rates(q.group_by(cls.colors))
+
+    @classmethod
+    def win_rates_by_card(cls, set_code=None, since=None, until=None,
+                          session=None):
+        """Sums the match records of drafts by the cards in their mainboard.
+
+        Args:
+            set_code (str): Only count drafts of this set.
+            since (date): Only count drafts from this date on.
+            until (date): Only count drafts up to this date.
+            session (Session): Session to query with. Defaults to
+                Draft.session.
+
+        Returns:
+            Dict[str, WinRate]: Record of the decks including each card,
+                by card name.
+
+        """
+        q = cls._records(Card.name, set_code, since, until, session)\
+                 .join(DeckEntry).join(Card)\
+                 .filter(DeckEntry.sideboard.is_(False))
+        return cls._win_rates(q.group_by(DeckEntry.oracle_id))
+
+    @classmethod
+    def _records(cls, key, set_code, since, until, session):
+        # Query of key and the summed records of the matching drafts, to be
+        # grouped by the caller.
+        session = session if session is not None else cls.session
+        q = session.query(key, func.count(cls.id), func.sum(cls.wins),
+                          func.sum(cls.losses), func.sum(cls.draws))\
+                   .select_from(cls)
+        if set_code is not None:
+            q = q.filter(cls.set_code == set_code)
+        if since is not None:
+            q = q.filter(cls.date >= since)
+        if until is not None:
+            q = q.filter(cls.date <= until)
+        return q
+
+    @staticmethod
+    def _win_rates(q):
+        return {key: WinRate(*counts) for key, *counts in q}
+
+
+class DeckEntry(Base):
+    """Quantity of a card in the mainboard or sideboard of a Draft."""
+
+    __tablename__ = 'deck_entries'
+    draft_id = Column(Integer, ForeignKey('drafts.id'), primary_key=True)
+    oracle_id = Column(String, ForeignKey('cards.oracle_id'),
+                       primary_key=True, index=True)
+    sideboard = Column(Boolean, primary_key=True, default=False)
+    quantity = Column(Integer)
+    card = relationship(Card, lazy='selectin', viewonly=True)
+
+
+class Game(Base):
+    """A match of a Draft, with the number of games won and lost.
+
+    Args:
+        decklist (Decklist): The deck played. Games loaded from the
+            database use the decklist of their draft.
+        day (date): Date of the match.
+        wins (int): Number of games won.
+        losses (int): Number of games lost.
+
+    """
+
+    __tablename__ = 'games'
+    id = Column(Integer, primary_key=True)
+    draft_id = Column(Integer, ForeignKey('drafts.id'), index=True)
+    date = Column(Date, index=True)
+    wins = Column(Integer)
+    losses = Column(Integer)
+    draft = relationship('Draft', back_populates='games')
 
     def __init__(self, decklist, day, wins, losses):
         self.decklist = decklist
@@ -43,6 +337,21 @@ class Game(object):
         self.wins = wins
         self.losses = losses
 
+    @reconstructor
+    def _init_on_load(self):
+        self._decklist = None
+
+    @property
+    def decklist(self):
+        """Decklist: The deck played, by default that of the draft."""
+        if self._decklist is None and self.draft is not None:
+            return self.draft.decklist
+        return self._decklist
+
+    @decklist.setter
+    def decklist(self, decklist):
+        self._decklist = decklist
+
     def as_dict(self):
         return {"date": str(self.date),
                 "wins": self.wins,
@@ -50,4 +359,3 @@ class Game(object):
 
     def export_json(self):
         return json.dumps(self.as_dict())
-
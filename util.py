@@ -1,6 +1,14 @@
+from collections import OrderedDict
+from itertools import islice
+import codecs
+import gzip
 import json
+import mmap
+import re
 import requests
 import os.path
+import threading
+import time
 
 
 def restriction(d, keys):
@@ -16,18 +24,301 @@ def convert(d, mapping):
     return d
 
 
-def bulk_data_generator(path):
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line[0] == '{':
-                if line[-1] == ',':
-                    line = line[:-1]
+def chunked(iterable, size):
+    """Yield successive lists of at most size elements from iterable."""
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+class LRUCache(object):
+    """Thread-safe mapping holding at most maxsize items.
+
+    When full, adding an item evicts the least recently used one. If ttl is
+    given, items older than ttl seconds are treated as missing.
+
+    Attributes:
+        hits (int): Number of lookups that found an item.
+        misses (int): Number of lookups that found nothing.
+
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, stored_at = self._items[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if self.ttl is not None and \
+                    time.monotonic() - stored_at > self.ttl:
+                del self._items[key]
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic())
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._items[key]
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def bulk_data_generator(path, fields=None):
+    """Yield the objects of a bulk data file, as iter_json_array does."""
+    return iter_json_array(path, fields=fields)
+
+
+def iter_json_array(path, fields=None, chunk_size=2 ** 20, use_mmap=False):
+    """Incrementally parse a file containing a single top-level JSON array.
+
+    The file is read in binary chunks of chunk_size bytes and elements are
+    yielded as soon as they have been read completely, so only about one
+    chunk of the file is held in memory at a time no matter how the file is
+    split into lines.
+
+    Args:
+        path (str): Path to the file.
+        fields (Iterable[str]): If given, the keys to keep from each element.
+            Other keys are dropped as soon as the element is decoded.
+        chunk_size (int): Number of bytes to read at a time.
+        use_mmap (bool): Read chunks from a memory map of the file rather
+            than with read calls.
+
+    Yields:
+        The decoded elements of the array.
+
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    if fields is not None:
+        fields = frozenset(fields)
+    buffer = ''
+    pos = 0
+    started = False
+    with open(path, 'rb') as f:
+        for chunk in _read_chunks(f, chunk_size, use_mmap):
+            buffer = buffer[pos:] + utf8.decode(chunk, final=not chunk)
+            pos = 0
+            while True:
+                pos = _JSON_SEPARATORS.match(buffer, pos).end()
+                if pos == len(buffer):
+                    break
+                if not started:
+                    if buffer[pos] != '[':
+                        raise ValueError(f"{path} is not a JSON array")
+                    started = True
+                    pos += 1
+                    continue
+                if buffer[pos] == ']':
+                    return
                 try:
-                    yield json.loads(line)
-                except json.decoder.JSONDecodeError:
-                    print(line)
-                    raise
+                    element, end = decoder.raw_decode(buffer, pos)
+                except json.decoder.JSONDecodeError as err:
+                    # Only an element cut off by the end of the buffer is
+                    # worth reading more for; malformed ones fail straight
+                    # away instead of buffering the rest of the file.
+                    if not chunk or not _incomplete(err):
+                        raise
+                    break
+                # A number at the very end of the buffer may continue in the
+                # next chunk, so wait until something follows it.
+                if end == len(buffer) and chunk:
+                    break
+                pos = end
+                if fields is not None:
+                    element = {k: v for k, v in element.items()
+                               if k in fields}
+                yield element
+    raise ValueError(f"{path} ended before the end of its JSON array")
+
+
+_JSON_SEPARATORS = re.compile(r'[\s,]*')
+
+# Text that more input could turn into a number, and literals that more
+# input could complete.
+_JSON_NUMBER_PART = re.compile(r'[-+.eE0-9]*')
+_JSON_LITERALS = ('true', 'false', 'null', 'NaN', 'Infinity', '-Infinity')
+
+
+def _incomplete(err):
+    """Returns whether a JSONDecodeError can be caused by the document
+    ending too early, rather than by malformed JSON."""
+    rest = err.doc[err.pos:]
+    if err.msg.startswith('Unterminated string'):
+        # The string runs to the end of the document.
+        return True
+    if err.msg.startswith('Invalid \\uXXXX escape'):
+        # The decoder also fails on a whole escape at the very end.
+        return len(rest) <= len("uXXXX")
+    return (_JSON_NUMBER_PART.fullmatch(rest) is not None
+            or any(literal.startswith(rest) for literal in _JSON_LITERALS))
+
+
+def json_array_ranges(path, size, boundary):
+    """Split a file containing a JSON array into byte ranges of elements.
+
+    Each range holds whole elements of the array, so the ranges can be parsed
+    independently with iter_json_range. Ranges are cut at the first match of
+    boundary after every multiple of size bytes, so boundary must only match
+    between two elements; scryfall.CARD_BOUNDARY is an example.
+
+    Args:
+        path (str): Path to the file.
+        size (int): Approximate number of bytes per range.
+        boundary (re.Pattern): Bytes pattern matching the separator between
+            two elements. Ranges are cut at the end of the match.
+
+    Returns:
+        List[Tuple[int, int]]: Start and end offsets of each range.
+
+    """
+    ranges = []
+    start = 0
+    with open(path, 'rb') as f:
+        length = os.fstat(f.fileno()).st_size
+        if length == 0:
+            return [(0, 0)]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            while start + size < length:
+                match = boundary.search(m, start + size)
+                if match is None:
+                    break
+                ranges.append((start, match.end()))
+                start = match.end()
+    ranges.append((start, length))
+    return ranges
+
+
+def iter_json_range(path, start, end, fields=None):
+    """Yield the JSON array elements in a range from json_array_ranges.
+
+    Args:
+        path (str): Path to the file.
+        start (int): Offset of the start of the range.
+        end (int): Offset of the end of the range.
+        fields (Iterable[str]): If given, the keys to keep from each element.
+
+    """
+    decoder = json.JSONDecoder()
+    if fields is not None:
+        fields = frozenset(fields)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    pos = _JSON_SEPARATORS.match(text).end()
+    if start == 0:
+        if not text.startswith('[', pos):
+            raise ValueError(f"{path} is not a JSON array")
+        pos += 1
+    while True:
+        pos = _JSON_SEPARATORS.match(text, pos).end()
+        if pos == len(text) or text[pos] == ']':
+            return
+        element, pos = decoder.raw_decode(text, pos)
+        if fields is not None:
+            element = {k: v for k, v in element.items() if k in fields}
+        yield element
+
+
+def _read_chunks(f, chunk_size, use_mmap):
+    """Yield chunks of an open binary file, ending with an empty chunk."""
+    if use_mmap and os.fstat(f.fileno()).st_size > 0:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            for offset in range(0, len(m), chunk_size):
+                yield m[offset:offset + chunk_size]
+    else:
+        chunk = f.read(chunk_size)
+        while chunk:
+            yield chunk
+            chunk = f.read(chunk_size)
+    yield b''
+
+
+def open_compressed(path, mode='rt'):
+    """Open a file, compressed or not according to its extension.
+
+    Files ending in .gz are read and written with gzip, and files ending in
+    .zst or .zstd with Zstandard, which requires the zstandard package.
+    Text modes use UTF-8.
+
+    Args:
+        path (str): Path to the file.
+        mode (str): Mode as for open, e.g. 'rt' or 'wt'.
+
+    Returns:
+        The open file object.
+
+    """
+    encoding = None if 'b' in mode else 'utf-8'
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, encoding=encoding)
+    if path.endswith(('.zst', '.zstd')):
+        import zstandard  # Only needed for .zst files
+        return zstandard.open(path, mode, encoding=encoding)
+    return open(path, mode, encoding=encoding)
+
+
+def iter_ndjson(path):
+    """Yield the objects of a newline-delimited JSON file, one per line.
+
+    Reads one line at a time, from a compressed file if path ends in .gz,
+    .zst or .zstd (see open_compressed). Blank lines are skipped.
+
+    """
+    with open_compressed(path, 'rt') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_ndjson(path, objects):
+    """Write objects to a newline-delimited JSON file, one per line.
+
+    Objects are written as they are produced, so objects may be a generator
+    of any length. The file is compressed if path ends in .gz, .zst or .zstd
+    (see open_compressed).
+
+    Returns:
+        int: Number of objects written.
+
+    """
+    count = 0
+    with open_compressed(path, 'wt') as f:
+        for obj in objects:
+            f.write(json.dumps(obj, separators=(',', ':')))
+            f.write('\n')
+            count += 1
+    return count
 
 
 def download(uri, filename='.'):